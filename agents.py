@@ -0,0 +1,697 @@
+"""
+Definição dos agentes, tarefas e equipe (Crew) de geração de questões
+
+Dois motores executam as tarefas: "crew" (padrão), com Agent/Task/Crew da CrewAI, e
+"direct", em que cada tarefa é uma única chamada ao LLM com os mesmos textos (papel,
+objetivo e história no system prompt; a tarefa na mensagem do usuário), sem o roteiro
+ReAct nem a orquestração da CrewAI. O motor é escolhido por PIPELINE_ENGINE.
+
+Com QUESTIONS_PER_CALL > 1, o gerador escreve várias questões da mesma combinação numa
+única chamada, sobre a mesma análise do especialista; cada uma é validada e só as que
+faltarem (inválidas ou duplicadas) são pedidas de novo.
+"""
+
+import importlib.util
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from llm_config import LLMFactory
+from prompt_budget import PromptTemplate, Tokenizer, fit_context
+from question_dedup import DuplicateQuestionError
+from question_model import Questao, QuestionValidationError, parse_question, parse_questions, parse_review
+
+# A CrewAI só é importada nos caminhos do motor "crew": o motor direto roda sem ela instalada
+if TYPE_CHECKING:
+    from crewai import Agent, Crew, Task
+
+# Novas execuções do gerador quando a questão sai inválida ou quase duplicada
+MAX_GENERATOR_RETRIES = 2
+
+# Questões pedidas ao gerador por chamada (QUESTIONS_PER_CALL)
+DEFAULT_QUESTIONS_PER_CALL = 1
+
+ENGINES = ("crew", "direct")
+DEFAULT_ENGINE = "crew"
+
+# Textos dos agentes e tarefas, compactados (sem indentação) uma vez na carga do módulo
+ESPECIALISTA_ROLE = "Especialista em Conteúdo Educacional"
+GERADOR_ROLE = "Criador de Questões de Múltipla Escolha"
+REVISOR_ROLE = "Revisor Pedagógico"
+ESPECIALISTA_GOAL = PromptTemplate(
+    "Identificar e estruturar os conceitos fundamentais sobre '{tema}' adequados ao nível {nivel}")
+ESPECIALISTA_BACKSTORY = PromptTemplate("""Você é um professor experiente com doutorado na área de '{area}'.
+    Tem mais de 20 anos de experiência em concurso da area de '{area}' e é especialista em adaptar conteúdos
+    complexos para diferentes níveis de aprendizado.""")
+TAREFA_ESPECIALISTA = PromptTemplate("""
+    Analise o tema '{tema}' e identifique os 5 pontos principais que devem ser abordados
+    em uma questão de nível {nivel}.
+
+    Forneça:
+    1. Lista dos conceitos fundamentais
+    2. Aspectos mais importantes para avaliação
+    3. Possíveis conexões com outros temas
+    4. Sugestões de enfoque adequado ao nível
+
+    Seja específico e educacionalmente relevante.
+    """)
+TRECHOS_EDITAL = PromptTemplate("""
+    Trechos do conteúdo programático do edital:
+    {contexto}
+
+    Baseie os pontos principais no que o edital cobra.
+    """)
+
+GERADOR_GOAL = PromptTemplate(
+    "Criar uma questão de múltipla escolha clara, objetiva e pedagogicamente adequada baseada no edital do {prova}")
+GERADOR_BACKSTORY = PromptTemplate("""Você é um especialista em avaliação educacional com formação em Pedagogia.
+    Tem experiência em criar questões para vestibulares e concursos.
+    Conhece as melhores práticas para formulação de questões de múltipla escolha.""")
+ANALISE_ESPECIALISTA = PromptTemplate("""
+    Análise do especialista:
+    {analise}
+    """)
+ENUNCIADOS_EVITAR = PromptTemplate("""
+    Evite estes enunciados, já usados em questões anteriores (crie uma questão diferente):
+{enunciados}
+    """)
+PROBLEMAS_ANTERIORES = PromptTemplate("""
+    A tentativa anterior foi rejeitada ({correcao}). Siga exatamente o formato abaixo.
+    """)
+REPROVACAO = PromptTemplate("""
+    O revisor pedagógico reprovou esta questão:
+{questao}
+    Motivo: {motivo}
+    Crie uma nova versão corrigindo esses pontos.
+    """)
+TAREFA_GERADOR = PromptTemplate("""
+    Com base na análise do especialista, crie uma questão de múltipla escolha seguindo este formato:
+
+    QUESTÃO: [Enunciado claro e objetivo]
+
+    A) [Alternativa 1]
+    B) [Alternativa 2]
+    C) [Alternativa 3]
+    D) [Alternativa 4]
+
+    RESPOSTA CORRETA: [Letra e justificativa]
+
+    Requisitos:
+    - Questão clara e sem ambiguidades
+    - 4 alternativas plausíveis
+    - Apenas uma resposta correta
+    - Distratores bem elaborados
+    - Linguagem adequada ao nível
+    """)
+TAREFA_GERADOR_LOTE = PromptTemplate("""
+    Com base na análise do especialista, crie {quantidade} questões de múltipla escolha diferentes
+    entre si (cada uma cobrando um ponto distinto da análise), numeradas e seguindo este formato:
+
+    QUESTÃO 1: [Enunciado claro e objetivo]
+
+    A) [Alternativa 1]
+    B) [Alternativa 2]
+    C) [Alternativa 3]
+    D) [Alternativa 4]
+
+    RESPOSTA CORRETA: [Letra e justificativa]
+
+    QUESTÃO 2: [...]
+
+    Requisitos para cada questão:
+    - Questão clara e sem ambiguidades
+    - 4 alternativas plausíveis
+    - Apenas uma resposta correta
+    - Distratores bem elaborados
+    - Linguagem adequada ao nível
+    """)
+
+REVISOR_GOAL = PromptTemplate(
+    "Garantir a qualidade, clareza e adequação pedagógica da questão finalizada baseada no edital do {prova}")
+REVISOR_BACKSTORY = PromptTemplate("""Você é um pedagogo com especialização em avaliação educacional.
+    Tem experiência em revisar materiais editais de concursos.
+    Seu trabalho é garantir que a questão esteja perfeita antes da aplicação.""")
+# System prompt do motor direto
+DIRECT_SYSTEM = PromptTemplate("""Você é {role}.
+    {backstory}
+    Seu objetivo: {goal}""")
+
+class DirectAgent(NamedTuple):
+    """Agente do motor direto: os textos do Agent da CrewAI e o LLM que executa as tarefas"""
+    role: str
+    goal: str
+    backstory: str
+    llm: Any
+
+def pipeline_engine(engine: Optional[str] = None) -> str:
+    """
+    Motor de execução das tarefas: o informado, PIPELINE_ENGINE ou "crew"
+
+    Raises:
+        ValueError: Se o motor não existir
+    """
+    engine = (engine or os.getenv("PIPELINE_ENGINE") or DEFAULT_ENGINE).lower()
+    if engine not in ENGINES:
+        raise ValueError(f"Motor '{engine}' não suportado. Opções: {', '.join(ENGINES)}")
+    return engine
+
+def questions_per_call(value: Optional[int] = None) -> int:
+    """Questões por chamada ao gerador: o valor informado, QUESTIONS_PER_CALL ou 1"""
+    value = value or int(os.getenv("QUESTIONS_PER_CALL", DEFAULT_QUESTIONS_PER_CALL))
+    return max(1, value)
+
+def is_direct(agentes: Dict[str, Any]) -> bool:
+    """Indica se os agentes foram criados para o motor direto"""
+    return isinstance(agentes["especialista"], DirectAgent)
+
+def direct_messages(agente: DirectAgent, description: str) -> List[BaseMessage]:
+    """Mensagens de uma tarefa do motor direto: papel, objetivo e história no system prompt"""
+    return [
+        SystemMessage(content=DIRECT_SYSTEM.format(LLMFactory.describe_llm(agente.llm), role=agente.role,
+                                                   backstory=agente.backstory, goal=agente.goal)),
+        HumanMessage(content=description),
+    ]
+
+def run_direct(agente: DirectAgent, description: str, verbose: bool = True) -> str:
+    """Executa uma tarefa do motor direto: uma chamada ao LLM, sem CrewAI"""
+    if verbose:
+        print(f"⚡ {agente.role}: chamada direta ao LLM")
+    content = agente.llm.invoke(direct_messages(agente, description)).content
+    if isinstance(content, str):
+        return content
+    # Alguns providers devolvem blocos de conteúdo em vez de texto
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+TAREFA_REVISOR = PromptTemplate("""
+    Revise a questão abaixo, destinada ao nível {nivel}:
+
+{questao}
+
+    Verifique:
+    - Se o enunciado é claro e sem ambiguidades
+    - Se existe exatamente uma alternativa correta e se o gabarito está certo
+    - Se os distratores são plausíveis e a linguagem é adequada ao nível
+    - Se o conteúdo está correto e de acordo com o edital
+
+    Responda na primeira linha apenas APROVADA ou REPROVADA: [motivo objetivo, em uma frase]
+    """)
+
+def get_syllabus_retriever():
+    """
+    Busca nos editais ingeridos (rag_ingest.py)
+
+    Returns:
+        SyllabusRetriever, ou None se não houver índice de editais (ou numpy não estiver instalado)
+    """
+    if importlib.util.find_spec("numpy") is None:
+        return None
+    from rag_retrieval import get_retriever
+    return get_retriever()
+
+def syllabus_context(prova: str, tema: str) -> str:
+    """Trechos do conteúdo programático do edital sobre o tema (vazio sem índice)"""
+    retriever = get_syllabus_retriever()
+    if retriever is None:
+        return ""
+    from rag_retrieval import format_context
+    return format_context(retriever.search(tema, prova=prova))
+
+def specialist_prompt(tema: str, nivel: str, area: str, contexto: str = "",
+                      tokenizer: Tokenizer = None, record: bool = True) -> Dict[str, str]:
+    """
+    Textos do agente especialista e da sua tarefa
+
+    Args:
+        contexto: Trechos do edital sobre o tema (syllabus_context), incluídos na tarefa
+        tokenizer: (provider, modelo) usado para contar os tokens economizados
+        record: False quando os textos não vão ser enviados (ex: chave do cache)
+
+    Returns:
+        Dict com role, goal, backstory e description
+    """
+    trechos_edital = TRECHOS_EDITAL.format(tokenizer, record, contexto=contexto) if contexto else ""
+    return {
+        "role": ESPECIALISTA_ROLE,
+        # Objetivo e história vão no agente (build_agents), que registra a economia deles
+        "goal": ESPECIALISTA_GOAL.format(tokenizer, False, tema=tema, nivel=nivel),
+        "backstory": ESPECIALISTA_BACKSTORY.format(tokenizer, False, area=area),
+        "description": TAREFA_ESPECIALISTA.format(tokenizer, record, tema=tema, nivel=nivel)
+                       + ("\n\n" + trechos_edital if trechos_edital else ""),
+    }
+
+def build_agents(llm, prova: str, tema: str, nivel: str, area: str, verbose: bool = True,
+                 llms: Optional[Dict[str, Any]] = None, engine: Optional[str] = None) -> Dict[str, "Agent"]:
+    """
+    Cria os agentes da equipe para uma combinação de prova/tema/nível/área
+
+    Args:
+        llm: Instância de LLM criada pelo LLMFactory
+        prova: Nome da prova (ex: CPA-20)
+        tema: Tema da questão
+        nivel: Nível de dificuldade
+        area: Área de conhecimento
+        verbose: Se os agentes devem imprimir o passo a passo
+        llms: LLM específico por papel ('especialista', 'gerador', 'revisor'), ex: cópias
+            instrumentadas. Papéis ausentes usam `llm`
+        engine: "crew" ou "direct" (padrão: PIPELINE_ENGINE). No motor direto os agentes são
+            DirectAgent e as funções deste módulo executam as tarefas sem CrewAI
+
+    Returns:
+        Dict com os agentes 'especialista', 'gerador' e 'revisor'
+    """
+    llms = llms or {}
+    tokenizer = LLMFactory.describe_llm(llm)
+    textos = {
+        "especialista": (ESPECIALISTA_ROLE, ESPECIALISTA_GOAL.format(tokenizer, tema=tema, nivel=nivel),
+                         ESPECIALISTA_BACKSTORY.format(tokenizer, area=area)),
+        "gerador": (GERADOR_ROLE, GERADOR_GOAL.format(tokenizer, prova=prova), GERADOR_BACKSTORY.format(tokenizer)),
+        "revisor": (REVISOR_ROLE, REVISOR_GOAL.format(tokenizer, prova=prova), REVISOR_BACKSTORY.format(tokenizer)),
+    }
+
+    if pipeline_engine(engine) == "direct":
+        # Sem a ferramenta de busca no edital: os trechos do edital já vão na tarefa do especialista
+        return {papel: DirectAgent(role, goal, backstory, llms.get(papel, llm))
+                for papel, (role, goal, backstory) in textos.items()}
+
+    from crewai import Agent
+
+    # O especialista pode consultar o edital da prova, se houver editais ingeridos
+    tools = []
+    retriever = get_syllabus_retriever()
+    if retriever is not None:
+        from syllabus_tool import SyllabusSearchTool
+        tools.append(SyllabusSearchTool(retriever=retriever, prova=prova))
+
+    agentes = {}
+    for papel, (role, goal, backstory) in textos.items():
+        agentes[papel] = Agent(
+            role=role,
+            goal=goal,
+            backstory=backstory,
+            tools=tools if papel == "especialista" else [],
+            verbose=verbose,
+            llm=llms.get(papel, llm)
+        )
+    return agentes
+
+def generator_description(analise: Optional[str] = None, evitar: Optional[List[str]] = None,
+                          correcao: Optional[str] = None, revisao: Optional[Tuple[str, str]] = None,
+                          tokenizer: Tokenizer = None, record: bool = True, quantidade: int = 1) -> str:
+    """
+    Descrição da tarefa do gerador (a análise entra reduzida ao orçamento de contexto)
+
+    Args:
+        quantidade: Questões pedidas nesta chamada
+    """
+    partes = []
+    if analise:
+        partes.append(ANALISE_ESPECIALISTA.format(tokenizer, record, analise=fit_context(analise, tokenizer=tokenizer)))
+    if evitar:
+        enunciados = "\n".join(f"- {enunciado}" for enunciado in evitar)
+        partes.append(ENUNCIADOS_EVITAR.format(tokenizer, record, enunciados=enunciados))
+    if correcao:
+        partes.append(PROBLEMAS_ANTERIORES.format(tokenizer, record, correcao=correcao))
+    if revisao:
+        questao_reprovada, motivo = revisao
+        partes.append(REPROVACAO.format(tokenizer, record, questao=questao_reprovada, motivo=motivo))
+    if quantidade > 1:
+        partes.append(TAREFA_GERADOR_LOTE.format(tokenizer, record, quantidade=quantidade))
+    else:
+        partes.append(TAREFA_GERADOR.format(tokenizer, record))
+    return "\n\n".join(partes)
+
+def build_tasks(agentes: Dict[str, "Agent"], tema: str, nivel: str, area: str,
+                analise: Optional[str] = None, contexto: str = "",
+                evitar: Optional[List[str]] = None, correcao: Optional[str] = None,
+                revisao: Optional[Tuple[str, str]] = None, tokenizer: Tokenizer = None,
+                quantidade: int = 1) -> Dict[str, "Task"]:
+    """
+    Cria as tarefas estruturadas do especialista e do gerador
+
+    Args:
+        agentes: Dict retornado por build_agents
+        tema: Tema da questão
+        nivel: Nível de dificuldade
+        area: Área de conhecimento
+        analise: Análise do especialista já pronta (ex: vinda do cache). Quando informada,
+            é reduzida ao orçamento de contexto (PROMPT_CONTEXT_BUDGET) e incluída na descrição
+            da tarefa do gerador
+        contexto: Trechos do edital sobre o tema, incluídos na tarefa do especialista
+        evitar: Enunciados já usados que o gerador não deve repetir
+        correcao: Problemas da tentativa anterior do gerador, a corrigir
+        revisao: (questão reprovada, motivo) quando o revisor reprovou a questão anterior
+        tokenizer: (provider, modelo) para contar tokens no orçamento e na economia
+        quantidade: Questões que o gerador deve escrever na mesma resposta
+
+    Returns:
+        Dict com as tarefas 'especialista' e 'gerador'
+    """
+    from crewai import Task
+
+    # Só a tarefa que vai ser executada conta na economia: com análise pronta, a do gerador
+    gerador = analise is not None
+    tarefa_especialista = Task(
+        description=specialist_prompt(tema, nivel, area, contexto, tokenizer, record=not gerador)["description"],
+        agent=agentes["especialista"],
+        expected_output="Lista estruturada com os pontos principais e orientações pedagógicas"
+    )
+
+    tarefa_gerador = Task(
+        description=generator_description(analise, evitar, correcao, revisao, tokenizer, record=gerador,
+                                          quantidade=quantidade),
+        agent=agentes["gerador"],
+        expected_output="Questão de múltipla escolha completa com 4 alternativas e resposta correta identificada"
+        if quantidade == 1 else
+        f"{quantidade} questões de múltipla escolha numeradas, cada uma com 4 alternativas e resposta correta"
+    )
+
+    return {"especialista": tarefa_especialista, "gerador": tarefa_gerador}
+
+def build_review_task(agentes: Dict[str, "Agent"], questao: Questao, nivel: str,
+                      tokenizer: Tokenizer = None) -> "Task":
+    """Cria a tarefa do revisor pedagógico para uma questão já validada"""
+    from crewai import Task
+
+    return Task(
+        description=TAREFA_REVISOR.format(tokenizer, nivel=nivel, questao=questao.to_text()),
+        agent=agentes["revisor"],
+        expected_output="APROVADA, ou REPROVADA seguida do motivo"
+    )
+
+def build_crew(llm, prova: str, tema: str, nivel: str, area: str, verbose: bool = True,
+               agentes: Optional[Dict[str, "Agent"]] = None) -> "Crew":
+    """
+    Monta a equipe especialista → gerador para uma combinação de prova/tema/nível/área
+
+    Returns:
+        Crew pronta para kickoff()
+    """
+    from crewai import Crew
+
+    agentes = agentes or build_agents(llm, prova, tema, nivel, area, verbose=verbose, engine="crew")
+    tarefas = build_tasks(agentes, tema, nivel, area, contexto=syllabus_context(prova, tema),
+                          tokenizer=LLMFactory.describe_llm(llm))
+
+    # Equipe de Criação de Questões
+    return Crew(
+        agents=[agentes["especialista"], agentes["gerador"]],
+        tasks=[tarefas["especialista"], tarefas["gerador"]],
+        verbose=verbose,
+        process="sequential"  # Processamento sequencial para dependências
+    )
+
+def analyze_topic(llm, prova: str, tema: str, nivel: str, area: str, verbose: bool = True,
+                  agentes: Optional[Dict[str, "Agent"]] = None) -> str:
+    """
+    Executa apenas a tarefa do especialista
+
+    Args:
+        agentes: Agentes já construídos para esta combinação (ex: reaproveitados pelo serviço)
+
+    Returns:
+        Texto da análise do especialista
+    """
+    agentes = agentes or build_agents(llm, prova, tema, nivel, area, verbose=verbose)
+    contexto = syllabus_context(prova, tema)
+    tokenizer = LLMFactory.describe_llm(llm)
+    if is_direct(agentes):
+        return run_direct(agentes["especialista"],
+                          specialist_prompt(tema, nivel, area, contexto, tokenizer)["description"], verbose)
+
+    from crewai import Crew
+
+    tarefas = build_tasks(agentes, tema, nivel, area, contexto=contexto, tokenizer=tokenizer)
+    equipe = Crew(
+        agents=[agentes["especialista"]],
+        tasks=[tarefas["especialista"]],
+        verbose=verbose,
+        process="sequential"
+    )
+    return str(equipe.kickoff())
+
+def generate_from_analysis(llm, prova: str, tema: str, nivel: str, area: str, analise: str,
+                           verbose: bool = True, agentes: Optional[Dict[str, "Agent"]] = None,
+                           evitar: Optional[List[str]] = None, correcao: Optional[str] = None,
+                           revisao: Optional[Tuple[str, str]] = None, quantidade: int = 1):
+    """
+    Executa apenas a tarefa do gerador, usando uma análise do especialista já pronta
+
+    Args:
+        agentes: Agentes já construídos para esta combinação (ex: reaproveitados pelo serviço)
+        evitar: Enunciados que o gerador não deve repetir
+        correcao: Problemas da tentativa anterior, a corrigir
+        revisao: (questão reprovada, motivo) do revisor, a corrigir
+        quantidade: Questões pedidas na mesma resposta
+
+    Returns:
+        Resultado do kickoff() da Crew do gerador
+    """
+    agentes = agentes or build_agents(llm, prova, tema, nivel, area, verbose=verbose)
+    tokenizer = LLMFactory.describe_llm(llm)
+    if is_direct(agentes):
+        description = generator_description(analise, evitar, correcao, revisao, tokenizer, quantidade=quantidade)
+        return run_direct(agentes["gerador"], description, verbose)
+
+    from crewai import Crew
+
+    tarefas = build_tasks(agentes, tema, nivel, area, analise=analise, evitar=evitar, correcao=correcao,
+                          revisao=revisao, tokenizer=tokenizer, quantidade=quantidade)
+    equipe = Crew(
+        agents=[agentes["gerador"]],
+        tasks=[tarefas["gerador"]],
+        verbose=verbose,
+        process="sequential"
+    )
+    return equipe.kickoff()
+
+def get_specialist_analysis(llm, prova: str, tema: str, nivel: str, area: str, cache,
+                            verbose: bool = True, agentes: Optional[Dict[str, "Agent"]] = None) -> str:
+    """
+    Obtém a análise do especialista do cache ou, em caso de miss, do LLM
+
+    Args:
+        cache: Instância de SpecialistCache
+
+    Returns:
+        Texto da análise do especialista
+    """
+    provider, model = LLMFactory.describe_llm(llm)
+    # Os trechos do edital entram na chave: reingerir o edital invalida a análise
+    prompt = specialist_prompt(tema, nivel, area, syllabus_context(prova, tema), record=False)
+    key = cache.make_key(prova, tema, nivel, area, provider, model, "\n".join(prompt.values()))
+
+    with cache.lock_for(key):
+        analise = cache.get(key)
+        if analise is None:
+            analise = analyze_topic(llm, prova, tema, nivel, area, verbose=verbose, agentes=agentes)
+            cache.set(key, analise, prova=prova, tema=tema, nivel=nivel, area=area,
+                      provider=provider, model=model)
+        elif verbose:
+            print(f"♻️ Reutilizando análise do especialista em cache ({tema} / {nivel})")
+
+    return analise
+
+def generate_validated(llm, prova: str, tema: str, nivel: str, area: str, analise: str, dedup=None,
+                       verbose: bool = True, agentes: Optional[Dict[str, "Agent"]] = None,
+                       revisao: Optional[Tuple[str, str]] = None) -> Questao:
+    """
+    Executa a tarefa do gerador até obter uma questão válida e, com dedup, inédita
+
+    Quando a saída não passa na validação (4 alternativas, uma resposta de A a D e
+    justificativa) ou é quase duplicada, só o gerador é executado de novo, com os problemas
+    encontrados ou os enunciados repetidos no prompt.
+
+    Args:
+        dedup: QuestionDedupIndex opcional
+        revisao: (questão reprovada, motivo) quando esta geração refaz uma questão reprovada
+            pelo revisor
+
+    Returns:
+        Questao validada
+
+    Raises:
+        QuestionValidationError: Se a última tentativa ainda for inválida
+        DuplicateQuestionError: Se a última tentativa ainda for quase duplicada
+    """
+    evitar: List[str] = []
+    correcao = None
+    error: Exception = QuestionValidationError(["nenhuma tentativa"])
+    for _ in range(MAX_GENERATOR_RETRIES + 1):
+        resultado = generate_from_analysis(llm, prova, tema, nivel, area, analise, verbose=verbose,
+                                           agentes=agentes, evitar=evitar, correcao=correcao, revisao=revisao)
+        try:
+            questao = parse_question(str(resultado), prova=prova, tema=tema, nivel=nivel, area=area)
+        except QuestionValidationError as e:
+            error, correcao = e, str(e)
+            if verbose:
+                print(f"⚠️ Questão fora do formato ({e}); gerando de novo...")
+            continue
+
+        correcao = None
+        duplicada = dedup.check_and_add(questao.enunciado, list(questao.alternativas.values()), prova, tema) \
+            if dedup is not None else None
+        if duplicada is None:
+            return questao
+
+        error = DuplicateQuestionError(f"Questão duplicada de '{duplicada['enunciado'][:80]}' ({prova} / {tema})")
+        if duplicada["enunciado"] not in evitar:
+            evitar.append(duplicada["enunciado"])
+        if verbose:
+            print(f"🔁 Questão quase duplicada (similaridade {duplicada['similaridade']}); regenerando...")
+
+    raise error
+
+def generate_validated_many(llm, prova: str, tema: str, nivel: str, area: str, analise: str,
+                            quantidade: int, dedup=None, verbose: bool = True,
+                            agentes: Optional[Dict[str, "Agent"]] = None) -> Tuple[List[Questao], List[str]]:
+    """
+    Pede várias questões ao gerador na mesma chamada e valida cada uma
+
+    A análise do especialista é enviada uma vez para todas. As questões inválidas ou quase
+    duplicadas são descartadas individualmente e só as que faltam são pedidas de novo, com
+    os problemas e os enunciados já usados no prompt.
+
+    Args:
+        quantidade: Questões a gerar
+        dedup: QuestionDedupIndex opcional
+
+    Returns:
+        Tupla (questões aceitas, problemas da última tentativa); menos questões que o pedido
+        quando as novas tentativas se esgotam
+    """
+    questoes: List[Questao] = []
+    evitar: List[str] = []
+    correcao = None
+    problems: List[str] = []
+    for _ in range(MAX_GENERATOR_RETRIES + 1):
+        faltam = quantidade - len(questoes)
+        if faltam <= 0:
+            break
+        resultado = generate_from_analysis(llm, prova, tema, nivel, area, analise, verbose=verbose, agentes=agentes,
+                                           evitar=evitar, correcao=correcao, quantidade=faltam)
+        validas, problems = parse_questions(str(resultado), prova=prova, tema=tema, nivel=nivel, area=area)
+        if len(validas) + len(problems) < faltam:
+            problems.append(f"{len(validas) + len(problems)} questões de {faltam} pedidas")
+
+        for questao in validas[:faltam]:
+            if questao.enunciado in evitar:
+                problems.append(f"enunciado repetido: '{questao.enunciado[:80]}'")
+                continue
+            duplicada = dedup.check_and_add(questao.enunciado, list(questao.alternativas.values()), prova, tema) \
+                if dedup is not None else None
+            if duplicada is not None:
+                problems.append(f"questão duplicada de '{duplicada['enunciado'][:80]}'")
+                if duplicada["enunciado"] not in evitar:
+                    evitar.append(duplicada["enunciado"])
+                continue
+            # As aceitas também entram na lista a evitar, para a próxima chamada não repeti-las
+            questoes.append(questao)
+            evitar.append(questao.enunciado)
+
+        correcao = "; ".join(problems) or None
+        if verbose and problems and len(questoes) < quantidade:
+            print(f"⚠️ {len(questoes)}/{quantidade} questões aceitas ({correcao}); pedindo as que faltam...")
+
+    return questoes, problems
+
+def review_question(llm, questao: Questao, verbose: bool = True,
+                    agentes: Optional[Dict[str, "Agent"]] = None) -> Tuple[bool, str]:
+    """
+    Executa a tarefa do revisor pedagógico sobre uma questão validada
+
+    Args:
+        agentes: Agentes já construídos para a combinação da questão
+
+    Returns:
+        Tupla (aprovada, motivo); o motivo é vazio quando a questão é aprovada
+    """
+    agentes = agentes or build_agents(llm, questao.prova, questao.tema, questao.nivel, questao.area, verbose=verbose)
+    if is_direct(agentes):
+        description = TAREFA_REVISOR.format(LLMFactory.describe_llm(llm), nivel=questao.nivel,
+                                            questao=questao.to_text())
+        return parse_review(run_direct(agentes["revisor"], description, verbose))
+
+    from crewai import Crew
+
+    equipe = Crew(
+        agents=[agentes["revisor"]],
+        tasks=[build_review_task(agentes, questao, questao.nivel, LLMFactory.describe_llm(llm))],
+        verbose=verbose,
+        process="sequential"
+    )
+    return parse_review(str(equipe.kickoff()))
+
+def generate_question(llm, prova: str, tema: str, nivel: str, area: str, verbose: bool = True,
+                      cache=None, tracker=None, dedup=None) -> Questao:
+    """
+    Executa a equipe e retorna a questão gerada, validada
+
+    O especialista e o gerador rodam em etapas separadas, para que uma saída inválida ou
+    duplicada repita apenas a tarefa do gerador.
+
+    Args:
+        cache: SpecialistCache opcional. Com cache, a análise do especialista é reutilizada
+            entre questões do mesmo tema e apenas a tarefa do gerador é executada
+        tracker: UsageTracker opcional; registra tokens, latência e custo de cada agente
+        dedup: QuestionDedupIndex opcional; questões quase duplicadas são regeneradas
+
+    Returns:
+        Questao validada (str(questao) devolve o texto no formato original)
+    """
+    agentes = None
+    if tracker is not None:
+        agentes = build_agents(llm, prova, tema, nivel, area, verbose=verbose, llms=tracker.instrument(llm))
+
+    if cache is not None:
+        analise = get_specialist_analysis(llm, prova, tema, nivel, area, cache, verbose=verbose, agentes=agentes)
+    else:
+        analise = analyze_topic(llm, prova, tema, nivel, area, verbose=verbose, agentes=agentes)
+
+    return generate_validated(llm, prova, tema, nivel, area, analise, dedup, verbose=verbose, agentes=agentes)
+
+def generate_questions(llm, prova: str, tema: str, nivel: str, area: str, quantidade: int,
+                       verbose: bool = True, cache=None, tracker=None, dedup=None,
+                       por_chamada: Optional[int] = None,
+                       agentes: Optional[Dict[str, "Agent"]] = None) -> Tuple[List[Questao], List[str]]:
+    """
+    Gera várias questões da mesma combinação, com uma única análise do especialista
+
+    O gerador recebe até `por_chamada` questões por chamada (padrão: QUESTIONS_PER_CALL), de
+    modo que a análise do especialista é enviada uma vez por grupo e não uma vez por questão.
+
+    Args:
+        quantidade: Questões a gerar
+        por_chamada: Questões por chamada ao gerador
+        agentes: Agentes já construídos (ex: aquecidos pelo serviço); com tracker, são
+            criados com os LLMs instrumentados
+
+    Returns:
+        Tupla (questões aceitas, problemas das que faltaram)
+    """
+    por_chamada = questions_per_call(por_chamada)
+    if tracker is not None:
+        agentes = build_agents(llm, prova, tema, nivel, area, verbose=verbose, llms=tracker.instrument(llm))
+
+    if cache is not None:
+        analise = get_specialist_analysis(llm, prova, tema, nivel, area, cache, verbose=verbose, agentes=agentes)
+    else:
+        analise = analyze_topic(llm, prova, tema, nivel, area, verbose=verbose, agentes=agentes)
+
+    questoes: List[Questao] = []
+    problems: List[str] = []
+    while len(questoes) < quantidade:
+        grupo = min(por_chamada, quantidade - len(questoes))
+        if grupo == 1:
+            try:
+                aceitas = [generate_validated(llm, prova, tema, nivel, area, analise, dedup, verbose=verbose,
+                                              agentes=agentes)]
+            except (QuestionValidationError, DuplicateQuestionError) as e:
+                aceitas, problems = [], [str(e)]
+        else:
+            aceitas, problems = generate_validated_many(llm, prova, tema, nivel, area, analise, grupo, dedup,
+                                                        verbose=verbose, agentes=agentes)
+        questoes.extend(aceitas)
+        if len(aceitas) < grupo:
+            # Novas tentativas esgotadas: as demais ficam para o chamador decidir
+            break
+    return questoes, problems
@@ -0,0 +1,364 @@
+"""
+Geração de questões em lote a partir de um arquivo de especificação
+
+O arquivo (CSV, JSON ou YAML) contém linhas com prova, tema, nivel, area e count
+(e opcionalmente provider). Cada questão roda sua própria equipe especialista → gerador,
+em paralelo, com um limite de concorrência por provider. Com QUESTIONS_PER_CALL > 1, as
+questões da mesma combinação são agrupadas e cada grupo é pedido ao gerador numa única
+chamada. Os resultados são entregues à medida que ficam prontos e registrados num journal
+de progresso (progress_journal.py), para que --resume refaça só o que ficou pendente.
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Iterator
+
+from llm_config import LLMFactory
+from agents import generate_question, generate_questions, questions_per_call
+from specialist_cache import SpecialistCache
+from instrumentation import UsageTracker
+from question_dedup import QuestionDedupIndex
+from question_bank import QuestionBank
+from prompt_budget import print_prompt_savings
+from progress_journal import ProgressJournal, journal_path
+from rate_limiter import rate_limiter_stats
+
+REQUIRED_FIELDS = ("prova", "tema", "nivel", "area")
+
+# Concorrência padrão por provider (pode ser sobrescrita por BATCH_CONCURRENCY_<PROVIDER>)
+DEFAULT_CONCURRENCY = 4
+
+def load_batch_spec(path: str) -> List[Dict[str, Any]]:
+    """
+    Lê o arquivo de especificação do lote
+
+    Args:
+        path: Caminho para um arquivo .csv, .json, .yaml ou .yml
+
+    Returns:
+        Lista de linhas normalizadas (prova, tema, nivel, area, count, provider)
+
+    Raises:
+        ValueError: Se o formato não for suportado ou se faltarem campos obrigatórios
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    with open(path, encoding="utf-8") as f:
+        if extension == ".csv":
+            rows = list(csv.DictReader(f))
+        elif extension == ".json":
+            rows = json.load(f)
+        elif extension in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML não está instalado. Execute: pip install pyyaml")
+            rows = yaml.safe_load(f)
+        else:
+            raise ValueError(f"Formato '{extension}' não suportado. Use CSV, JSON ou YAML")
+
+    # JSON/YAML podem vir como {"itens": [...]} ou como lista direta
+    if isinstance(rows, dict):
+        rows = rows.get("itens") or rows.get("items") or []
+
+    spec = []
+    for line_number, row in enumerate(rows, 1):
+        missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()]
+        if missing:
+            raise ValueError(f"Linha {line_number} do lote sem os campos obrigatórios: {', '.join(missing)}")
+
+        spec.append({
+            "prova": str(row["prova"]).strip(),
+            "tema": str(row["tema"]).strip(),
+            "nivel": str(row["nivel"]).strip(),
+            "area": str(row["area"]).strip(),
+            "count": int(row.get("count") or 1),
+            "provider": str(row.get("provider") or "").strip().lower() or None,
+        })
+
+    return spec
+
+def expand_jobs(spec: List[Dict[str, Any]], default_provider: str) -> List[Dict[str, Any]]:
+    """
+    Expande as linhas do lote em um job por questão
+
+    Returns:
+        Lista de jobs com índice sequencial, linha do lote, campos da linha e provider resolvido
+    """
+    jobs = []
+    for linha, row in enumerate(spec):
+        for item in range(row["count"]):
+            jobs.append({
+                "indice": len(jobs),
+                "linha": linha,
+                "item": item,
+                "prova": row["prova"],
+                "tema": row["tema"],
+                "nivel": row["nivel"],
+                "area": row["area"],
+                "provider": row["provider"] or default_provider,
+            })
+    return jobs
+
+def group_jobs(jobs: List[Dict[str, Any]], per_call: int) -> List[List[Dict[str, Any]]]:
+    """
+    Agrupa os jobs da mesma combinação (prova, tema, nível, área e provider) em grupos de até
+    per_call questões, geradas numa única chamada ao gerador
+
+    Returns:
+        Lista de grupos, na ordem do primeiro job de cada um
+    """
+    groups: List[List[Dict[str, Any]]] = []
+    open_groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for job in jobs:
+        key = (job["prova"], job["tema"], job["nivel"], job["area"], job["provider"])
+        group = open_groups.get(key)
+        if group is None or len(group) >= per_call:
+            group = open_groups[key] = []
+            groups.append(group)
+        group.append(job)
+    return groups
+
+def get_concurrency_limits(providers: List[str], default: int = DEFAULT_CONCURRENCY) -> Dict[str, int]:
+    """
+    Resolve o limite de concorrência de cada provider
+
+    A variável BATCH_CONCURRENCY_<PROVIDER> (ex: BATCH_CONCURRENCY_GROQ=2) sobrescreve o padrão.
+    """
+    limits = {}
+    for provider in providers:
+        value = os.getenv(f"BATCH_CONCURRENCY_{provider.upper()}")
+        limits[provider] = max(1, int(value)) if value else max(1, default)
+    return limits
+
+def _run_job(llm, job: Dict[str, Any], cache: Optional[SpecialistCache] = None,
+             tracker: Optional[UsageTracker] = None, dedup: Optional[QuestionDedupIndex] = None,
+             bank: Optional[QuestionBank] = None) -> Dict[str, Any]:
+    """Executa um job do lote, guarda a questão no banco e monta o registro de resultado"""
+    record = dict(job)
+    # Com banco, cada job tem seu tracker (repassando ao do lote) para saber os tokens da questão
+    job_tracker = UsageTracker(parent=tracker) if bank is not None else tracker
+    start = time.perf_counter()
+    try:
+        questao = generate_question(llm, job["prova"], job["tema"], job["nivel"], job["area"],
+                                    verbose=False, cache=cache, tracker=job_tracker, dedup=dedup)
+        record["status"] = "ok"
+        record["questao"] = questao.model_dump(include={"enunciado", "alternativas", "resposta_correta", "justificativa"})
+        record["resultado"] = str(questao)
+    except Exception as e:
+        record["status"] = "erro"
+        record["erro"] = str(e)
+    record["duracao_s"] = round(time.perf_counter() - start, 3)
+
+    if bank is not None and record["status"] == "ok":
+        usage = job_tracker.totals()
+        provider, model = LLMFactory.describe_llm(llm)
+        bank.add(questao, provider=usage["provider"] or provider, modelo=usage["modelo"] or model,
+                 prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"],
+                 custo_usd=usage["custo_usd"], latencia_s=record["duracao_s"])
+    return record
+
+def _run_group(llm, group: List[Dict[str, Any]], cache: Optional[SpecialistCache] = None,
+               tracker: Optional[UsageTracker] = None, dedup: Optional[QuestionDedupIndex] = None,
+               bank: Optional[QuestionBank] = None) -> List[Dict[str, Any]]:
+    """Executa um grupo de jobs da mesma combinação com chamadas de várias questões ao gerador"""
+    if len(group) == 1:
+        return [_run_job(llm, group[0], cache, tracker, dedup, bank)]
+
+    first = group[0]
+    # Tracker próprio do grupo: tokens e custo são divididos entre as questões aceitas
+    group_tracker = UsageTracker(parent=tracker) if bank is not None else tracker
+    start = time.perf_counter()
+    try:
+        questoes, problems = generate_questions(llm, first["prova"], first["tema"], first["nivel"], first["area"],
+                                                len(group), verbose=False, cache=cache, tracker=group_tracker,
+                                                dedup=dedup, por_chamada=len(group))
+        erro = f"Questão não gerada: {'; '.join(problems) or 'novas tentativas esgotadas'}"
+    except Exception as e:
+        questoes, erro = [], str(e)
+    elapsed = time.perf_counter() - start
+
+    records = []
+    for job, questao in zip(group, questoes + [None] * (len(group) - len(questoes))):
+        record = dict(job)
+        if questao is None:
+            record["status"] = "erro"
+            record["erro"] = erro
+        else:
+            record["status"] = "ok"
+            record["questao"] = questao.model_dump(include={"enunciado", "alternativas", "resposta_correta", "justificativa"})
+            record["resultado"] = str(questao)
+        # Todas as questões do grupo ficam prontas juntas
+        record["duracao_s"] = round(elapsed, 3)
+        records.append(record)
+
+    if bank is not None and questoes:
+        usage = group_tracker.totals()
+        provider, model = LLMFactory.describe_llm(llm)
+        share = len(questoes)
+        for questao in questoes:
+            bank.add(questao, provider=usage["provider"] or provider, modelo=usage["modelo"] or model,
+                     prompt_tokens=usage["prompt_tokens"] // share, completion_tokens=usage["completion_tokens"] // share,
+                     custo_usd=usage["custo_usd"] / share if usage["custo_usd"] is not None else None,
+                     latencia_s=round(elapsed / share, 3))
+    return records
+
+def iter_batch_results(jobs: List[Dict[str, Any]], concurrency: int = DEFAULT_CONCURRENCY,
+                       cache: Optional[SpecialistCache] = None,
+                       tracker: Optional[UsageTracker] = None,
+                       dedup: Optional[QuestionDedupIndex] = None,
+                       bank: Optional[QuestionBank] = None,
+                       per_call: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Executa os jobs em paralelo e entrega cada resultado assim que termina
+
+    Cada provider tem seu próprio pool de threads, limitado pela sua concorrência,
+    para que um provider lento não ocupe os workers dos demais.
+
+    Args:
+        jobs: Lista retornada por expand_jobs
+        concurrency: Concorrência padrão por provider
+        cache: Cache da análise do especialista, compartilhado entre os jobs
+        tracker: Instrumentação de tokens/custo, compartilhada entre os jobs
+        dedup: Índice de questões já aceitas, para regenerar as quase duplicadas
+        bank: Banco onde cada questão aceita é guardada com seus metadados
+        per_call: Questões da mesma combinação por chamada ao gerador (padrão: QUESTIONS_PER_CALL)
+
+    Yields:
+        Registros de resultado na ordem de conclusão
+    """
+    providers = sorted({job["provider"] for job in jobs})
+    limits = get_concurrency_limits(providers, concurrency)
+
+    # Um LLM por provider, compartilhado entre as threads
+    llms = {provider: LLMFactory.create_llm(provider) for provider in providers}
+    executors = {
+        provider: ThreadPoolExecutor(max_workers=limits[provider], thread_name_prefix=f"batch-{provider}")
+        for provider in providers
+    }
+
+    try:
+        futures = [executors[group[0]["provider"]].submit(_run_group, llms[group[0]["provider"]], group, cache,
+                                                          tracker, dedup, bank)
+                   for group in group_jobs(jobs, questions_per_call(per_call))]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        for llm in llms.values():
+            LLMFactory.close_llm(llm)
+
+def run_batch(spec_path: str, default_provider: str, concurrency: int = DEFAULT_CONCURRENCY,
+              output_path: Optional[str] = None, trace_path: Optional[str] = None,
+              review: bool = False, review_concurrency: Optional[int] = None,
+              per_call: Optional[int] = None, resume: bool = False,
+              journal_file: Optional[str] = None) -> Dict[str, int]:
+    """
+    Roda um lote completo, imprimindo e gravando (JSONL) os resultados à medida que chegam
+
+    Args:
+        spec_path: Arquivo de especificação do lote
+        default_provider: Provider usado nas linhas sem provider
+        concurrency: Concorrência padrão por provider
+        output_path: Arquivo JSONL de saída (opcional)
+        trace_path: Trace JSONL de tokens/custo por chamada (padrão: LLM_TRACE_PATH)
+        review: Passa cada questão pelo revisor pedagógico, num estágio paralelo à geração
+        review_concurrency: Revisões simultâneas (padrão: REVIEW_CONCURRENCY ou 2)
+        per_call: Questões da mesma combinação por chamada ao gerador (padrão: QUESTIONS_PER_CALL;
+            não se aplica com review)
+        resume: Retoma pelo journal: pula as questões concluídas e reaproveita as análises prontas
+        journal_file: Journal de progresso (padrão: .cache/progresso/<nome do lote>.jsonl)
+
+    Returns:
+        Dict com contagem de questões 'ok' e com 'erro'
+    """
+    spec = load_batch_spec(spec_path)
+    jobs = expand_jobs(spec, default_provider)
+    summary = {"ok": 0, "erro": 0}
+    cache = SpecialistCache.from_env()
+    tracker = UsageTracker(trace_path) if trace_path else UsageTracker.from_env()
+    dedup = QuestionDedupIndex.from_env()
+    bank = QuestionBank.from_env()
+    journal = ProgressJournal(journal_file or journal_path(spec_path), resume=resume)
+    total = len(jobs)
+    jobs, finished = journal.pending(jobs)
+    # Análises já pagas antes da queda são servidas pelo journal
+    worker_cache = journal.wrap(cache)
+
+    print(f"📦 Lote com {total} questões ({len(spec)} combinações)")
+    if resume:
+        print(f"⏭️ Retomando: {finished} questões já concluídas, {len(jobs)} pendentes ou com erro")
+    start = time.perf_counter()
+
+    pipeline = None
+    if review:
+        from review_pipeline import DEFAULT_REVIEW_CONCURRENCY, ReviewPipeline
+
+        review_concurrency = review_concurrency or int(os.getenv("REVIEW_CONCURRENCY", DEFAULT_REVIEW_CONCURRENCY))
+        pipeline = ReviewPipeline(concurrency, review_concurrency, cache=worker_cache, tracker=tracker, dedup=dedup,
+                                  bank=bank)
+        results = pipeline.run(jobs)
+    else:
+        results = iter_batch_results(jobs, concurrency, worker_cache, tracker, dedup, bank, per_call)
+
+    output = open(output_path, "a", encoding="utf-8") if output_path else None
+    try:
+        for done, record in enumerate(results, 1):
+            journal.record_result(record)
+            summary[record["status"]] += 1
+            status = "✅" if record["status"] == "ok" else "❌"
+            print(f"{status} [{done}/{len(jobs)}] {record['prova']} | {record['tema']} | {record['nivel']} "
+                  f"({record['provider']}, {record['duracao_s']}s)")
+
+            if record["status"] == "ok":
+                if not output:
+                    print(record["resultado"])
+                    print("-" * 50)
+            else:
+                print(f"   Erro: {record['erro']}")
+
+            if output:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+    finally:
+        journal.close()
+        if output:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print("=" * 60)
+    print(f"🏁 Lote finalizado em {elapsed:.1f}s: {summary['ok']} ok, {summary['erro']} com erro")
+    if resume and journal.reused_analyses:
+        print(f"📓 Journal: {journal.reused_analyses} análises do especialista reaproveitadas da execução anterior")
+    if summary["erro"]:
+        print(f"💡 Para refazer só as questões com erro: --batch {spec_path} --resume (journal em {journal.path})")
+    if pipeline:
+        pipeline.print_summary()
+    if cache:
+        stats = cache.stats()
+        print(f"♻️ Cache do especialista: {stats['hits']} hits, {stats['misses']} misses")
+        cache.close()
+    if dedup:
+        stats = dedup.stats()
+        print(f"🧬 Duplicatas: {stats['duplicadas']} regeneradas, {stats['entries']} questões no índice")
+        dedup.close()
+    if bank:
+        bank.flush()
+        stats = bank.stats()
+        print(f"🗄️ Banco de questões: {stats['gravadas']} gravadas, {stats['questoes']} no total ({bank.path})")
+        bank.close()
+    if os.getenv("LLM_CACHE_PATH"):
+        from llm_cache import response_cache_stats
+        stats = response_cache_stats()
+        print(f"💾 Cache de respostas: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entradas")
+    print_prompt_savings()
+    for name, stats in rate_limiter_stats().items():
+        print(f"🚦 Rate limiter {name}: {stats['chamadas']} chamadas, {stats['throttled']} respostas 429, "
+              f"concorrência {stats['concorrencia']}, {stats['espera_total_s']}s de espera")
+    if tracker:
+        tracker.print_summary()
+    return summary
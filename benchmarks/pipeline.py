@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline do pipeline de geração de questões com o provider fake
+
+Executa a equipe do index.py (especialista → gerador) sem rede, com latência, velocidade
+e erros simulados, e mede questões/minuto, latência p50/p99 por questão, tokens de entrada por questão e pico
+de memória. Serve para detectar regressões no overhead de orquestração e para comparar os
+motores do pipeline (CrewAI e chamadas diretas ao LLM) lado a lado.
+
+Uso:
+    python benchmarks/pipeline.py --mode all --questions 20 --latency 0.05
+    python benchmarks/pipeline.py --engine both --mode single
+    python benchmarks/pipeline.py --output bench.json
+    python benchmarks/pipeline.py --baseline bench.json   # falha se houver regressão
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_config import LLMConfig, LLMFactory, LLMProvider  # noqa: E402
+from agents import ENGINES, generate_question  # noqa: E402
+from instrumentation import UsageTracker  # noqa: E402
+from question_dedup import QuestionDedupIndex  # noqa: E402
+
+PROVA, TEMA, NIVEL, AREA = "CPA-20", "Mercado Financeiro", "Dificil", "Finanças"
+
+# Regressão tolerada em relação ao baseline antes de falhar
+DEFAULT_TOLERANCE = 0.15
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por vizinho mais próximo"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def measure(run: Callable[[], List[Optional[float]]], tracker: Optional[UsageTracker] = None) -> Dict[str, Any]:
+    """
+    Executa um cenário medindo tempo total, latências e pico de memória
+
+    Args:
+        run: Função que executa o cenário e retorna a latência de cada questão
+        tracker: UsageTracker que o cenário alimenta, para os tokens por questão (opcional)
+
+    Returns:
+        Métricas do cenário
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    latencies = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ok = [latency for latency in latencies if latency is not None]
+    totals = tracker.totals() if tracker is not None else {}
+    return {
+        "questoes": len(latencies),
+        "falhas": len(latencies) - len(ok),
+        "tempo_total_s": round(elapsed, 3),
+        "questoes_por_min": round(len(ok) / elapsed * 60, 2) if elapsed else 0.0,
+        "p50_s": round(percentile(ok, 50), 4) if ok else None,
+        "p99_s": round(percentile(ok, 99), 4) if ok else None,
+        "media_s": round(statistics.mean(ok), 4) if ok else None,
+        "tokens_entrada_por_questao": round(totals["prompt_tokens"] / len(latencies), 1)
+        if totals and latencies else None,
+        "pico_memoria_python_mb": round(peak / 1024 / 1024, 2),
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        "pico_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss /
+                             (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+    }
+
+def fresh_dedup() -> QuestionDedupIndex:
+    """Índice de duplicatas vazio por cenário, como no uso real, sem tocar o índice do usuário"""
+    return QuestionDedupIndex(os.path.join(tempfile.mkdtemp(prefix="bench-dedup-"), "dedup.sqlite"))
+
+def timed_question(llm, cache=None, tracker: Optional[UsageTracker] = None, dedup=None) -> Optional[float]:
+    """Gera uma questão e retorna sua latência (None em caso de erro)"""
+    start = time.perf_counter()
+    try:
+        generate_question(llm, PROVA, TEMA, NIVEL, AREA, verbose=False, cache=cache, tracker=tracker, dedup=dedup)
+    except Exception:
+        return None
+    return time.perf_counter() - start
+
+def scenario_single(llm, questions: int, tracker: Optional[UsageTracker] = None) -> List[Optional[float]]:
+    """Questões em sequência, uma equipe por vez"""
+    dedup = fresh_dedup()
+    return [timed_question(llm, tracker=tracker, dedup=dedup) for _ in range(questions)]
+
+def scenario_concurrent(llm, questions: int, workers: int,
+                        tracker: Optional[UsageTracker] = None) -> List[Optional[float]]:
+    """Questões em paralelo num pool de threads compartilhando o mesmo LLM"""
+    dedup = fresh_dedup()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda _: timed_question(llm, tracker=tracker, dedup=dedup), range(questions)))
+
+def scenario_batch(questions: int, workers: int) -> List[Optional[float]]:
+    """Modo lote do index.py (batch.iter_batch_results) com o provider fake"""
+    from batch import iter_batch_results
+
+    jobs = [{"indice": i, "item": i, "prova": PROVA, "tema": TEMA, "nivel": NIVEL, "area": AREA,
+             "provider": LLMProvider.FAKE} for i in range(questions)]
+    return [record["duracao_s"] if record["status"] == "ok" else None
+            for record in iter_batch_results(jobs, concurrency=workers, dedup=fresh_dedup())]
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Lista as regressões de throughput e latência em relação ao baseline"""
+    regressions = []
+    for mode, metrics in results.items():
+        base = baseline.get(mode)
+        if not base:
+            continue
+        if metrics["questoes_por_min"] < base["questoes_por_min"] * (1 - tolerance):
+            regressions.append(f"{mode}: questões/min {base['questoes_por_min']} → {metrics['questoes_por_min']}")
+        for field in ("p50_s", "p99_s"):
+            if metrics[field] and base.get(field) and metrics[field] > base[field] * (1 + tolerance):
+                regressions.append(f"{mode}: {field} {base[field]} → {metrics[field]}")
+    return regressions
+
+def print_engine_comparison(results: Dict[str, Dict[str, Any]]):
+    """Compara, por cenário, o motor crew com o direct"""
+    print("\n⚖️ crew x direct")
+    print(f"{'cenário':<12}{'questões/min':>24}{'p50 (s)':>22}{'tokens entrada/questão':>30}")
+    for mode, crew in results.items():
+        direct = results.get(f"{mode}-direct")
+        if direct is None:
+            continue
+        cells = []
+        for field in ("questoes_por_min", "p50_s", "tokens_entrada_por_questao"):
+            cells.append(f"{crew[field]} → {direct[field]}")
+        speedup = f"  ({direct['questoes_por_min'] / crew['questoes_por_min']:.2f}x)" if crew["questoes_por_min"] else ""
+        print(f"{mode:<12}{cells[0]:>24}{cells[1]:>22}{cells[2]:>30}{speedup}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline com o provider fake")
+    parser.add_argument("--mode", choices=["single", "batch", "concurrent", "all"], default="all")
+    parser.add_argument("--engine", choices=list(ENGINES) + ["both"], default="crew",
+                        help="Motor do pipeline; 'both' roda os dois e compara (padrão: crew)")
+    parser.add_argument("--questions", type=int, default=10, help="Questões por cenário (padrão: 10)")
+    parser.add_argument("--workers", type=int, default=4, help="Concorrência dos cenários paralelos")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência simulada por chamada (s)")
+    parser.add_argument("--tokens-per-s", type=float, default=2000, help="Velocidade simulada de geração")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de chamadas com erro simulado")
+    parser.add_argument("--output", help="Grava o relatório em JSON")
+    parser.add_argument("--baseline", help="Relatório JSON anterior para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    # O modo lote cria seus LLMs pelo factory, a partir da configuração padrão do fake
+    config = {"latency_s": args.latency, "tokens_per_s": args.tokens_per_s, "error_rate": args.error_rate}
+    LLMConfig.DEFAULT_CONFIGS[LLMProvider.FAKE].update(config)
+    # O benchmark mede o pipeline completo: sem reaproveitar a análise do especialista
+    os.environ["SPECIALIST_CACHE"] = "0"
+    os.environ.pop("LLM_CACHE_PATH", None)
+
+    llm = LLMFactory.create_llm(LLMProvider.FAKE)
+
+    scenarios = {
+        "single": lambda tracker: scenario_single(llm, args.questions, tracker),
+        "concurrent": lambda tracker: scenario_concurrent(llm, args.questions, args.workers, tracker),
+        "batch": lambda tracker: scenario_batch(args.questions, args.workers),
+    }
+    modes = list(scenarios) if args.mode == "all" else [args.mode]
+    engines = list(ENGINES) if args.engine == "both" else [args.engine]
+
+    print(f"🧪 Benchmark offline (fake: latência {args.latency}s, {args.tokens_per_s:.0f} tokens/s, "
+          f"erros {args.error_rate:.0%})")
+    results = {}
+    for engine in engines:
+        os.environ["PIPELINE_ENGINE"] = engine
+        for mode in modes:
+            # O modo lote instrumenta seus próprios LLMs: sem contagem de tokens por questão
+            tracker = UsageTracker() if mode != "batch" else None
+            name = mode if engine == "crew" else f"{mode}-{engine}"
+            results[name] = measure(lambda: scenarios[mode](tracker), tracker)
+            metrics = results[name]
+            print(f"\n📊 {name}: {metrics['questoes_por_min']} questões/min | p50 {metrics['p50_s']}s | "
+                  f"p99 {metrics['p99_s']}s | falhas {metrics['falhas']}/{metrics['questoes']} | "
+                  f"tokens de entrada/questão {metrics['tokens_entrada_por_questao']} | "
+                  f"pico Python {metrics['pico_memoria_python_mb']} MB | RSS {metrics['pico_rss_mb']} MB")
+    if len(engines) > 1:
+        print_engine_comparison(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n📝 Relatório gravado em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Regressões detectadas:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\n✅ Nenhuma regressão em relação ao baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark de cold-start do llm_config.py no estilo `python -X importtime`
+
+Mede, em processos novos, o tempo de importar llm_config e listar os providers
+disponíveis (o que index.py e setup_providers.py fazem ao iniciar). Opcionalmente
+compara com a versão do llm_config.py de uma referência git (ex: antes dos imports
+preguiçosos).
+
+Uso:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --baseline-ref HEAD~1 --runs 10
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SNIPPET = "import llm_config; llm_config.LLMFactory.list_available_providers()"
+
+def run_importtime(module_dir: str) -> Tuple[float, List[Tuple[int, str]]]:
+    """
+    Executa o snippet de inicialização com -X importtime em um processo novo
+
+    Args:
+        module_dir: Diretório que contém o llm_config.py a ser medido
+
+    Returns:
+        Tupla (tempo total em ms, lista de (cumulativo em us, módulo) de nível superior)
+    """
+    env = os.environ.copy()
+    env["PYTHONPATH"] = module_dir + os.pathsep + env.get("PYTHONPATH", "")
+    # Evitar que bytecode em cache de uma versão contamine a outra
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SNIPPET],
+        capture_output=True,
+        text=True,
+        cwd=module_dir,
+        env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar llm_config em {module_dir}:\n{result.stderr[-2000:]}")
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # cabeçalho
+        name = parts[2]
+        # Módulos de nível superior têm exatamente um espaço antes do nome
+        if name.startswith(" ") and not name.startswith("  "):
+            top_level.append((int(parts[1].strip()), name.strip()))
+
+    total_ms = sum(cumulative for cumulative, _ in top_level) / 1000
+    return total_ms, top_level
+
+def measure(module_dir: str, runs: int) -> Dict[str, object]:
+    """Mede o cold-start várias vezes e agrega os resultados"""
+    totals = []
+    heaviest: Dict[str, List[int]] = {}
+    for _ in range(runs):
+        total_ms, top_level = run_importtime(module_dir)
+        totals.append(total_ms)
+        for cumulative, name in top_level:
+            heaviest.setdefault(name, []).append(cumulative)
+
+    ranking = sorted(
+        ((statistics.median(values) / 1000, name) for name, values in heaviest.items()),
+        reverse=True
+    )
+    return {
+        "median_ms": statistics.median(totals),
+        "min_ms": min(totals),
+        "max_ms": max(totals),
+        "top_imports": ranking[:10],
+    }
+
+def checkout_baseline(ref: str) -> str:
+    """Extrai o llm_config.py de uma referência git para um diretório temporário"""
+    content = subprocess.run(
+        ["git", "show", f"{ref}:llm_config.py"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT_DIR
+    ).stdout
+    tmp_dir = tempfile.mkdtemp(prefix="startup-baseline-")
+    with open(os.path.join(tmp_dir, "llm_config.py"), "w", encoding="utf-8") as f:
+        f.write(content)
+    # O .env faz parte do cold-start real (load_dotenv)
+    env_file = os.path.join(ROOT_DIR, ".env")
+    if os.path.exists(env_file):
+        shutil.copy(env_file, tmp_dir)
+    return tmp_dir
+
+def print_report(label: str, stats: Dict[str, object]):
+    """Imprime o relatório de uma medição"""
+    print(f"\n📊 {label}")
+    print("-" * 60)
+    print(f"  Mediana: {stats['median_ms']:.1f} ms "
+          f"(mín {stats['min_ms']:.1f} ms / máx {stats['max_ms']:.1f} ms)")
+    print("  Imports mais pesados (cumulativo, mediana):")
+    for cumulative_ms, name in stats["top_imports"]:
+        print(f"    {cumulative_ms:9.1f} ms  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cold-start do llm_config")
+    parser.add_argument("--runs", type=int, default=5, help="Número de processos medidos (padrão: 5)")
+    parser.add_argument("--baseline-ref", help="Referência git para comparar (ex: HEAD~1)")
+    args = parser.parse_args()
+
+    print("⏱️  Benchmark de inicialização (python -X importtime)")
+    print(f"   Snippet: {STARTUP_SNIPPET}")
+
+    current = measure(ROOT_DIR, args.runs)
+    print_report("Versão atual", current)
+
+    if args.baseline_ref:
+        baseline_dir = checkout_baseline(args.baseline_ref)
+        try:
+            baseline = measure(baseline_dir, args.runs)
+        finally:
+            shutil.rmtree(baseline_dir, ignore_errors=True)
+        print_report(f"Baseline ({args.baseline_ref})", baseline)
+
+        saved = baseline["median_ms"] - current["median_ms"]
+        ratio = baseline["median_ms"] / current["median_ms"] if current["median_ms"] else float("inf")
+        print("\n" + "=" * 60)
+        print(f"🚀 Antes: {baseline['median_ms']:.1f} ms | Depois: {current['median_ms']:.1f} ms "
+              f"| Economia: {saved:.1f} ms ({ratio:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,568 @@
+"""
+Provider local e determinístico ("fake") para testes e benchmarks sem rede
+
+O FakeChatModel responde no formato esperado pelos agentes (análise do especialista,
+questão de múltipla escolha ou parecer do revisor), simulando latência até o primeiro
+token, taxa de geração de tokens e erros (429, timeout, 500) com uma semente fixa. Com
+max_concurrency, chamadas acima desse número simultâneo recebem 429, como num provider real.
+O FakeEmbeddings gera vetores por hashing de palavras, para exercitar o RAG sem rede.
+
+O mesmo modelo pode ser servido por HTTP numa API compatível com a da OpenAI
+(/v1/chat/completions, com e sem streaming), para exercitar o caminho real do SDK:
+    python fake_llm.py --serve --port 8010
+    OPENAI_BASE_URL=http://127.0.0.1:8010/v1 OPENAI_API_KEY=local python index.py --provider openai
+
+O servidor também faz as vezes das APIs de lote (OpenAI /v1/files + /v1/batches e Anthropic
+/v1/messages/batches), processando cada lote em segundo plano após batch_delay_s, para
+testar o provider_batch.py sem rede.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage, convert_to_messages
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+class FakeProviderError(RuntimeError):
+    """Erro simulado, com status HTTP e Retry-After como os dos SDKs reais"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = _FakeResponse(status_code, retry_after)
+
+class _FakeResponse:
+    def __init__(self, status_code: int, retry_after: Optional[float]):
+        self.status_code = status_code
+        self.headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+
+ANALISE_TEMPLATE = """Pontos principais do tema '{tema}':
+1. Conceitos fundamentais: {tema} — definições, participantes e regulação.
+2. Aspectos para avaliação: aplicação prática de {tema} em situações de prova.
+3. Conexões: relação de {tema} com temas correlatos do edital.
+4. Enfoque: cobrar interpretação e cálculo, evitando memorização pura.
+5. Pegadinhas comuns: termos parecidos e exceções à regra geral."""
+
+# Peças sorteadas pelo rng de cada chamada para montar questões distintas (o índice de
+# duplicatas, ativo por padrão, rejeitaria questões que só mudassem um número)
+PERSONAGENS = ["Um investidor pessoa física", "Uma gestora de recursos", "Um fundo de pensão", "Uma corretora",
+               "Um assessor de investimentos", "Uma seguradora", "Um investidor qualificado",
+               "Uma companhia aberta", "Um family office", "Um banco de varejo", "Uma tesouraria bancária",
+               "Um clube de investimento"]
+SITUACOES = ["avalia uma aplicação de R$ {valor} mil por {prazo} meses", "revisa uma carteira com {pct}% em renda variável",
+             "compara duas alternativas com taxas de {taxa}% e {taxa2}% ao ano",
+             "recebe uma proposta com carência de {prazo} meses", "precisa reenquadrar {pct}% do patrimônio",
+             "analisa um título com duration de {anos} anos", "estuda um resgate de R$ {valor} mil",
+             "negocia uma operação com liquidez em D+{dias}"]
+COMANDOS = ["assinale a alternativa correta", "indique a afirmação verdadeira",
+            "aponte a conclusão adequada", "identifique a análise correta"]
+SUJEITOS = ["o risco de mercado", "a marcação a mercado", "o prazo médio", "a tributação", "o custo de oportunidade",
+            "a volatilidade", "o spread de crédito", "a liquidez", "a taxa de administração", "o benchmark",
+            "a diversificação", "a inflação esperada", "o suitability", "a taxa real", "o come-cotas", "a alavancagem"]
+VERBOS = ["aumenta", "reduz", "não altera", "inverte", "antecipa", "posterga", "neutraliza", "amplia"]
+OBJETOS = ["o retorno líquido", "a exposição da carteira", "o valor presente", "a perda potencial",
+           "o preço unitário", "o resultado do cotista", "a rentabilidade esperada", "o prêmio exigido",
+           "o fluxo de caixa", "a sensibilidade a juros", "o enquadramento regulatório", "a base de cálculo"]
+COMPLEMENTOS = ["no curto prazo", "quando os juros sobem", "em cenário de estresse", "para o investidor final",
+                "após o vencimento", "se o emissor for rebaixado", "em prazos acima de {anos} anos",
+                "com aporte de R$ {valor} mil", "na janela de {dias} dias", "independentemente do indexador",
+                "sob a regulação vigente", "quando a inflação supera {pct}%"]
+
+def fake_question(tema: str, rng: random.Random, numero: Optional[int] = None) -> str:
+    """Questão de múltipla escolha válida, com enunciado e alternativas sorteados pelo rng"""
+    valores = {"valor": rng.randint(10, 990), "prazo": rng.randint(3, 60), "pct": rng.randint(5, 95),
+               "taxa": rng.randint(4, 15), "taxa2": rng.randint(4, 15), "anos": rng.randint(1, 12),
+               "dias": rng.randint(1, 90)}
+    enunciado = (f"{rng.choice(PERSONAGENS)} {rng.choice(SITUACOES).format(**valores)}. "
+                 f"Considerando {tema}, {rng.choice(COMANDOS)}.")
+    frases = set()
+    while len(frases) < 4:
+        frases.add(f"{rng.choice(SUJEITOS).capitalize()} {rng.choice(VERBOS)} {rng.choice(OBJETOS)} "
+                   f"{rng.choice(COMPLEMENTOS).format(**valores)}.")
+    alternativas = list(frases)
+    correta = rng.choice("ABCD")
+    cabecalho = "QUESTÃO:" if numero is None else f"QUESTÃO {numero}:"
+    linhas = [f"{cabecalho} {enunciado}", ""]
+    linhas += [f"{letra}) {texto}" for letra, texto in zip("ABCD", alternativas)]
+    linhas += ["", f"RESPOSTA CORRETA: {correta}) A alternativa {correta} descreve corretamente o efeito "
+                   f"em {tema}; as demais contêm erros conceituais."]
+    return "\n".join(linhas)
+
+REVISAO_TEMPLATE = """APROVADA
+Justificativa: enunciado claro, 4 alternativas plausíveis e apenas uma correta."""
+
+class FakeChatModel(BaseChatModel):
+    """Chat model local com latência, velocidade e erros configuráveis"""
+
+    model_name: str = "fake-questoes"
+    temperature: float = 0.0
+    max_tokens: int = 2000
+    latency_s: float = 0.2
+    tokens_per_s: float = 200.0
+    error_rate: float = 0.0
+    error_kind: str = "429"
+    seed: int = 42
+    streaming: bool = False
+    # Teto de chamadas simultâneas do "provider" (0 = sem teto)
+    max_concurrency: int = 0
+
+    # Contador compartilhado com as cópias (model_copy, ex: UsageTracker.instrument), para que
+    # elas não repitam a sequência de respostas do original
+    _calls: Any = PrivateAttr(default_factory=lambda: itertools.count(1))
+    _in_flight: int = PrivateAttr(default=0)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name, "seed": self.seed}
+
+    def _rng(self, messages: List[BaseMessage]) -> random.Random:
+        """
+        Gerador aleatório determinístico por semente e conteúdo do prompt
+
+        Com temperature > 0, o número da chamada também entra na semente: prompts iguais
+        geram respostas diferentes, mas a sequência se repete a cada execução.
+        """
+        with self._lock:
+            call = next(self._calls) if self.temperature > 0 else 0
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = hashlib.sha256(f"{self.seed}:{call}:{prompt}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _respond(self, messages: List[BaseMessage], rng: random.Random) -> str:
+        """Monta a resposta conforme a tarefa presente no prompt"""
+        prompt = "\n".join(str(message.content) for message in messages)
+        lowered = prompt.lower()
+
+        # O tema aparece entre aspas na tarefa do especialista e na análise repassada ao gerador
+        tema = "o tema"
+        marker = "tema '"
+        if marker in lowered:
+            start = lowered.index(marker) + len(marker)
+            end = prompt.find("'", start)
+            tema = prompt[start:end] if end > start else tema
+
+        if "5 pontos principais" in lowered:
+            content = ANALISE_TEMPLATE.format(tema=tema)
+        elif "aprovada ou reprovada" in lowered:
+            # Tarefa do revisor (a regeneração de uma reprovada cita o revisor, mas é do gerador)
+            content = REVISAO_TEMPLATE
+        else:
+            # Tarefa com várias questões: "crie N questões" → QUESTÃO 1, QUESTÃO 2, ...
+            match = re.search(r"crie (\d+) questões", lowered)
+            quantidade = int(match.group(1)) if match else 1
+            content = "\n\n".join(fake_question(tema, rng, numero if quantidade > 1 else None)
+                                    for numero in range(1, quantidade + 1))
+
+        # O formato ReAct só é usado quando o prompt o pede (prompts da CrewAI); chamadas diretas recebem o texto puro
+        if "final answer" in lowered:
+            return f"Thought: I now can give a great answer\nFinal Answer: {content}"
+        return content
+
+    def _maybe_fail(self, rng: random.Random):
+        """Injeta um erro simulado conforme error_rate"""
+        if self.error_rate <= 0 or rng.random() >= self.error_rate:
+            return
+        if self.error_kind == "timeout":
+            raise TimeoutError("Fake provider: timeout simulado")
+        if self.error_kind == "500":
+            raise FakeProviderError("Fake provider: erro interno simulado", 500)
+        raise FakeProviderError("Fake provider: rate limit simulado (429)", 429, retry_after=1.0)
+
+    @contextmanager
+    def _slot(self):
+        """Ocupa uma vaga de concorrência; acima do teto, responde 429 como um provider real"""
+        with self._lock:
+            if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                raise FakeProviderError("Fake provider: limite de concorrência (429)", 429, retry_after=0.5)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> dict:
+        prompt_tokens = sum(len(str(message.content).split()) for message in messages)
+        completion_tokens = len(text.split())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    @staticmethod
+    def _apply_stop(text: str, stop: Optional[List[str]]) -> str:
+        for sequence in stop or []:
+            index = text.find(sequence)
+            if index >= 0:
+                text = text[:index]
+        return text
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.streaming:
+            chunks = list(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+            text = "".join(chunk.text for chunk in chunks)
+        else:
+            rng = self._rng(messages)
+            with self._slot():
+                time.sleep(self.latency_s)
+                self._maybe_fail(rng)
+                text = self._apply_stop(self._respond(messages, rng), stop)
+                time.sleep(len(text.split()) / self.tokens_per_s if self.tokens_per_s > 0 else 0)
+
+        usage = self._usage(messages, text)
+        message = AIMessage(content=text, usage_metadata={
+            "input_tokens": usage["prompt_tokens"],
+            "output_tokens": usage["completion_tokens"],
+            "total_tokens": usage["total_tokens"],
+        })
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={"token_usage": usage, "model_name": self.model_name},
+        )
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        rng = self._rng(messages)
+        with self._slot():
+            time.sleep(self.latency_s)
+            self._maybe_fail(rng)
+            text = self._apply_stop(self._respond(messages, rng), stop)
+            delay = 1 / self.tokens_per_s if self.tokens_per_s > 0 else 0
+
+            for index, word in enumerate(text.split(" ")):
+                token = word if index == 0 else " " + word
+                time.sleep(delay)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+                if run_manager:
+                    run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+
+class FakeEmbeddings(Embeddings):
+    """Embeddings locais por hashing de palavras: textos com palavras em comum ficam próximos"""
+
+    def __init__(self, model: str = "fake-hash-256", size: int = 256):
+        self.model = model
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+# Rotas das APIs de lote servidas pelo stand-in
+_FILE_CONTENT = re.compile(r"/files/([\w-]+)/content$")
+_OPENAI_BATCH = re.compile(r"/batches/([\w-]+)$")
+_ANTHROPIC_BATCH = re.compile(r"/messages/batches/([\w-]+)(/results)?$")
+
+def _parse_multipart(body: bytes, content_type: str) -> Dict[str, bytes]:
+    """Campos de um corpo multipart/form-data (upload do arquivo de entrada do lote)"""
+    message = BytesParser(policy=default_policy).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body)
+    return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+def _batch_completion(model: "FakeChatModel", messages: List[BaseMessage]) -> Dict[str, Any]:
+    """Executa um pedido do lote: {"texto", "usage"} ou {"status", "erro"} em caso de erro simulado"""
+    try:
+        text = model._generate(messages).generations[0].message.content
+    except FakeProviderError as e:
+        return {"status": e.status_code, "erro": str(e)}
+    except TimeoutError as e:
+        return {"status": 504, "erro": str(e)}
+    return {"texto": text, "usage": model._usage(messages, text)}
+
+def _process_batch(server: ThreadingHTTPServer, batch_id: str):
+    """Processa um lote do stand-in em segundo plano e grava o resultado no formato do provider"""
+    time.sleep(server.batch_delay_s)
+    batch = server.batches[batch_id]
+    lines = []
+    if batch["type"] == "openai":
+        for request in batch["pedidos"]:
+            body = request["body"]
+            outcome = _batch_completion(server.model, convert_to_messages(body.get("messages", [])))
+            if "erro" in outcome:
+                response = {"status_code": outcome["status"], "body": {"error": {"message": outcome["erro"]}}}
+            else:
+                response = {"status_code": 200, "body": {
+                    "id": f"chatcmpl-{batch_id}", "object": "chat.completion", "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": outcome["texto"]},
+                                 "finish_reason": "stop"}],
+                    "usage": outcome["usage"],
+                }}
+            lines.append({"id": f"batch_req_{len(lines)}", "custom_id": request["custom_id"],
+                          "response": response, "error": None})
+        with server.batch_lock:
+            output_id = f"file-{len(server.files)}"
+            server.files[output_id] = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+            failed = sum(line["response"]["status_code"] != 200 for line in lines)
+            batch["info"].update(status="completed", output_file_id=output_id, completed_at=int(time.time()),
+                                 request_counts={"total": len(lines), "completed": len(lines) - failed,
+                                                 "failed": failed})
+    else:
+        for request in batch["pedidos"]:
+            params = request["params"]
+            system = [SystemMessage(content=params["system"])] if params.get("system") else []
+            outcome = _batch_completion(server.model, system + convert_to_messages(params.get("messages", [])))
+            if "erro" in outcome:
+                result = {"type": "errored", "error": {"type": "error", "error": {"type": "api_error",
+                                                                                 "message": outcome["erro"]}}}
+            else:
+                usage = outcome["usage"]
+                result = {"type": "succeeded", "message": {
+                    "id": f"msg_{batch_id}", "type": "message", "role": "assistant", "model": params.get("model"),
+                    "content": [{"type": "text", "text": outcome["texto"]}], "stop_reason": "end_turn",
+                    "usage": {"input_tokens": usage["prompt_tokens"], "output_tokens": usage["completion_tokens"]},
+                }}
+            lines.append({"custom_id": request["custom_id"], "result": result})
+        with server.batch_lock:
+            batch["resultados"] = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+            succeeded = sum(line["result"]["type"] == "succeeded" for line in lines)
+            batch["info"].update(processing_status="ended",
+                                 request_counts={"processing": 0, "succeeded": succeeded, "errored": len(lines) - succeeded}, ended_at=time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                                 results_url=f"{batch['origem']}/v1/messages/batches/{batch_id}/results")
+
+class _OpenAICompatibleHandler(BaseHTTPRequestHandler):
+    """Atende /v1/models, /v1/chat/completions e as APIs de lote com o FakeChatModel do servidor"""
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, payload: Any):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_bytes(self, body: bytes, content_type: str = "application/jsonl"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _batch_get(self, path: str) -> bool:
+        """GET das APIs de lote; False se a rota não for de lote"""
+        server = self.server
+        match = _FILE_CONTENT.search(path)
+        if match:
+            with server.batch_lock:
+                content = server.files.get(match.group(1))
+            if content is None:
+                self._send_json(404, {"error": {"message": "Arquivo não encontrado"}})
+            else:
+                self._send_bytes(content)
+            return True
+        match = _ANTHROPIC_BATCH.search(path) or _OPENAI_BATCH.search(path)
+        if not match:
+            return False
+        with server.batch_lock:
+            batch = server.batches.get(match.group(1))
+            if batch is None:
+                self._send_json(404, {"error": {"message": "Lote não encontrado"}})
+            elif match.re is _ANTHROPIC_BATCH and match.group(2):
+                self._send_bytes(batch.get("resultados", b""))
+            else:
+                self._send_json(200, batch["info"])
+        return True
+
+    def _batch_post(self, path: str) -> bool:
+        """POST das APIs de lote (upload de arquivo, criação de lote); False se a rota não for de lote"""
+        server = self.server
+        if path.endswith("/files"):
+            fields = _parse_multipart(self._read_body(), self.headers.get("Content-Type", ""))
+            with server.batch_lock:
+                file_id = f"file-{len(server.files)}"
+                server.files[file_id] = fields.get("file") or b""
+            self._send_json(200, {"id": file_id, "object": "file", "purpose": fields.get("purpose", b"").decode(),
+                                  "bytes": len(server.files[file_id]), "created_at": int(time.time())})
+            return True
+        if path.endswith("/messages/batches"):
+            request = json.loads(self._read_body() or b"{}")
+            with server.batch_lock:
+                batch_id = f"msgbatch_{len(server.batches)}"
+                pedidos = request.get("requests", [])
+                info = {"id": batch_id, "type": "message_batch", "processing_status": "in_progress",
+                        "request_counts": {"processing": len(pedidos), "succeeded": 0, "errored": 0},
+                        "results_url": None}
+                server.batches[batch_id] = {"type": "anthropic", "pedidos": pedidos, "info": info,
+                                            "origem": f"http://{self.headers.get('Host')}"}
+        elif path.endswith("/batches"):
+            request = json.loads(self._read_body() or b"{}")
+            with server.batch_lock:
+                content = server.files.get(request.get("input_file_id"))
+                if content is None:
+                    self._send_json(400, {"error": {"message": "input_file_id inválido"}})
+                    return True
+                batch_id = f"batch_{len(server.batches)}"
+                pedidos = [json.loads(line) for line in content.decode("utf-8").splitlines() if line.strip()]
+                info = {"id": batch_id, "object": "batch", "endpoint": request.get("endpoint"),
+                        "input_file_id": request["input_file_id"], "status": "in_progress",
+                        "created_at": int(time.time()), "output_file_id": None, "error_file_id": None,
+                        "request_counts": {"total": len(pedidos), "completed": 0, "failed": 0}}
+                server.batches[batch_id] = {"type": "openai", "pedidos": pedidos, "info": info}
+        else:
+            return False
+        threading.Thread(target=_process_batch, args=(server, batch_id), daemon=True).start()
+        self._send_json(200, info)
+        return True
+
+    def do_GET(self):
+        if self._batch_get(self.path.split("?")[0].rstrip("/")):
+            return
+        if self.path.rstrip("/").endswith("/models"):
+            model = self.server.model
+            self._send_json(200, {"object": "list", "data": [{"id": model.model_name, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Rota não encontrada"}})
+
+    def do_POST(self):
+        if self._batch_post(self.path.split("?")[0].rstrip("/")):
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Rota não encontrada"}})
+            return
+
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = self.server.model
+        messages = convert_to_messages(request.get("messages", []))
+        stop = request.get("stop")
+        stop = [stop] if isinstance(stop, str) else stop
+        name = request.get("model") or model.model_name
+        created = int(time.time())
+
+        # O erro simulado sai antes do primeiro token: pegar o primeiro pedaço antes de responder
+        chunks = model._stream(messages, stop=stop)
+        try:
+            first = next(chunks, None)
+        except FakeProviderError as e:
+            self._send_json(e.status_code, {"error": {"message": str(e), "type": "rate_limit_error"
+                                                      if e.status_code == 429 else "server_error"}},
+                            headers=e.response.headers)
+            return
+        except TimeoutError as e:
+            self._send_json(504, {"error": {"message": str(e), "type": "timeout"}})
+            return
+
+        if not request.get("stream"):
+            text = "".join(chunk.text for chunk in ([first] if first else []) + list(chunks))
+            self._send_json(200, {
+                "id": f"chatcmpl-fake-{created}", "object": "chat.completion", "created": created, "model": name,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": model._usage(messages, text),
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        base = {"id": f"chatcmpl-fake-{created}", "object": "chat.completion.chunk", "created": created, "model": name}
+        parts = []
+        for chunk in ([first] if first else []):
+            parts.append(chunk.text)
+            self._send_event({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": chunk.text},
+                                                   "finish_reason": None}]})
+        for chunk in chunks:
+            parts.append(chunk.text)
+            self._send_event({**base, "choices": [{"index": 0, "delta": {"content": chunk.text}, "finish_reason": None}]})
+        self._send_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._send_event({**base, "choices": [], "usage": model._usage(messages, "".join(parts))})
+        self._send_event("[DONE]")
+
+def serve_openai_compatible(model: FakeChatModel, host: str = "127.0.0.1", port: int = 8010,
+                            batch_delay_s: float = 0.5) -> ThreadingHTTPServer:
+    """
+    Cria o servidor HTTP compatível com a API da OpenAI (chame serve_forever() para atender)
+
+    Args:
+        batch_delay_s: Tempo até um lote enviado às APIs de lote começar a ser processado
+
+    Returns:
+        Servidor já vinculado à porta (port=0 escolhe uma porta livre)
+    """
+    server = ThreadingHTTPServer((host, port), _OpenAICompatibleHandler)
+    server.daemon_threads = True
+    server.model = model
+    server.batch_delay_s = batch_delay_s
+    server.files = {}
+    server.batches = {}
+    server.batch_lock = threading.Lock()
+    return server
+
+def main():
+    from llm_config import LLMConfig, LLMProvider
+
+    config = LLMConfig.DEFAULT_CONFIGS[LLMProvider.FAKE]
+    parser = argparse.ArgumentParser(description="Provider fake servido numa API compatível com a da OpenAI")
+    parser.add_argument("--serve", action="store_true", help="Inicia o servidor")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency", type=float, default=config["latency_s"], help="Latência até o primeiro token (s)")
+    parser.add_argument("--tokens-per-s", type=float, default=config["tokens_per_s"], help="Velocidade de geração")
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"], help="Fração de chamadas com erro")
+    parser.add_argument("--max-concurrency", type=int, default=config["max_concurrency"],
+                        help="Chamadas simultâneas acima das quais o servidor responde 429 (0 = sem teto)")
+    args = parser.parse_args()
+    if not args.serve:
+        parser.print_help()
+        return
+
+    model = FakeChatModel(model_name=config["model"], temperature=config["temperature"], latency_s=args.latency,
+                          tokens_per_s=args.tokens_per_s, error_rate=args.error_rate, error_kind=config["error_kind"],
+                          seed=config["seed"], max_concurrency=args.max_concurrency)
+    server = serve_openai_compatible(model, args.host, args.port)
+    print(f"🧪 Provider fake em http://{args.host}:{server.server_port}/v1 (compatível com a API da OpenAI)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor encerrado.")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
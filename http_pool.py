@@ -0,0 +1,90 @@
+"""
+Clientes HTTP compartilhados pelo processo, usados pelos SDKs dos providers
+
+Sem isso, cada LLM criado pelo LLMFactory abre o seu próprio pool de conexões (e refaz o
+handshake TLS). Aqui há um httpx.Client para o processo e um httpx.AsyncClient por event
+loop (conexões assíncronas ficam presas ao loop que as abriu), com limites de pool
+ajustáveis, keep-alive e HTTP/2 quando o pacote h2 está instalado. HTTP_POOL=0 desativa o
+compartilhamento: cada SDK volta a criar o seu cliente.
+"""
+
+import importlib.util
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    import asyncio
+
+# Limites do pool: conexões simultâneas, conexões ociosas mantidas e segundos de keep-alive.
+# Ajuste com HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE e HTTP_KEEPALIVE_EXPIRY
+DEFAULT_POOL_LIMITS = {"max_connections": 100, "max_keepalive_connections": 20, "keepalive_expiry": 60.0}
+# Timeout de leitura (s) das chamadas aos providers (HTTP_TIMEOUT) e de conexão
+DEFAULT_TIMEOUT_S = 120.0
+DEFAULT_CONNECT_TIMEOUT_S = 10.0
+
+_client: Optional[httpx.Client] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+def http_pool_enabled() -> bool:
+    """Indica se os SDKs devem usar os clientes compartilhados (HTTP_POOL=0 desativa)"""
+    return os.getenv("HTTP_POOL", "1") != "0"
+
+def http2_enabled() -> bool:
+    """HTTP/2 quando o pacote h2 está instalado (HTTP2=0 força HTTP/1.1)"""
+    return os.getenv("HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+def pool_config() -> Dict[str, Any]:
+    """Parâmetros comuns dos clientes compartilhados (limites, timeout e HTTP/2)"""
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", DEFAULT_POOL_LIMITS["max_connections"])),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", DEFAULT_POOL_LIMITS["max_keepalive_connections"])),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", DEFAULT_POOL_LIMITS["keepalive_expiry"])),
+    )
+    timeout = httpx.Timeout(float(os.getenv("HTTP_TIMEOUT", DEFAULT_TIMEOUT_S)), connect=DEFAULT_CONNECT_TIMEOUT_S)
+    return {"limits": limits, "timeout": timeout, "http2": http2_enabled()}
+
+def get_http_client() -> httpx.Client:
+    """Cliente síncrono compartilhado pelo processo (criado no primeiro uso)"""
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(**pool_config())
+        return _client
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Cliente assíncrono compartilhado pelas chamadas do event loop atual
+
+    Raises:
+        RuntimeError: Se chamado fora de um event loop
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = _async_clients[loop] = httpx.AsyncClient(**pool_config())
+        return client
+
+def close_http_client():
+    """Fecha o cliente síncrono compartilhado (um novo é criado se voltar a ser usado)"""
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+async def aclose_http_client():
+    """Fecha o cliente assíncrono do event loop atual (chamar antes de encerrar o loop)"""
+    import asyncio
+
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -1,7 +1,18 @@
-from crewai import Agent, Task, Crew
+import argparse
 import os
+import sys
+import time
+from typing import Optional
 from dotenv import load_dotenv
 from llm_config import LLMFactory, LLMProvider
+from agents import ENGINES, generate_question
+from specialist_cache import SpecialistCache
+from instrumentation import UsageTracker
+from question_dedup import QuestionDedupIndex
+from question_bank import QuestionBank
+from llm_router import get_status_code
+from prompt_budget import print_prompt_savings
+from progress_journal import ProgressJournal, single_run_journal_path
 
 # Carregar variáveis do arquivo .env
 load_dotenv()
@@ -80,141 +91,224 @@ def get_llm_from_config():
     """
     Obtém o LLM baseado na configuração do ambiente ou seleção interativa
     
+    Sem terminal interativo (jobs automáticos), nunca pede input: usa o roteamento
+    automático entre os providers configurados.
+    
     Returns:
         LLM instance
     """
+    # Fallback automático explícito entre providers
+    if os.getenv("LLM_FALLBACK_PROVIDERS"):
+        print(f"🔀 Usando roteamento automático entre: {os.getenv('LLM_FALLBACK_PROVIDERS')}")
+        return LLMFactory.create_router()
+    
     # Verificar se há uma configuração específica no .env
     preferred_provider = os.getenv("PREFERRED_LLM_PROVIDER", "").lower()
     
-    if preferred_provider and preferred_provider in LLMFactory.list_available_providers():
+    if preferred_provider and (preferred_provider in LLMFactory.list_available_providers()
+                               or preferred_provider in (LLMProvider.ROUTER, LLMProvider.FAKE)):
         try:
             print(f"🎯 Usando provider configurado: {preferred_provider}")
             return LLMFactory.create_llm(preferred_provider)
         except Exception as e:
             print(f"⚠️ Erro ao usar provider configurado ({preferred_provider}): {e}")
-            print("🔄 Caindo para seleção interativa...")
+            if sys.stdin.isatty():
+                print("🔄 Caindo para seleção interativa...")
+    
+    if not sys.stdin.isatty():
+        print("🔀 Execução não interativa: usando roteamento automático entre os providers configurados")
+        return LLMFactory.create_router()
     
     # Seleção interativa
     _, llm = select_llm_provider()
     return llm
 
-# Configurar o modelo LLM
-print("🚀 Configurando modelo de LLM...")
-try:
-    llm = get_llm_from_config()
-    print("✅ LLM configurado com sucesso!")
-except Exception as e:
-    print(f"❌ Erro na configuração do LLM: {e}")
-    exit(1)
-
 # Configurações da questão
 prova = "CPA-2O"
 tema = "Mercado Financeiro"
 nivel = "Dificil"
 area = "Finanças"
 
-# Especialista em Conteúdo
-especialista = Agent(
-    role="Especialista em Conteúdo Educacional",
-    goal=f"Identificar e estruturar os conceitos fundamentais sobre '{tema}' adequados ao nível {nivel}",
-    backstory=f"""Você é um professor experiente com doutorado na área de '{area}'. 
-    Tem mais de 20 anos de experiência em concurso da area de '{area}' e é especialista em adaptar conteúdos 
-    complexos para diferentes níveis de aprendizado.""",
-    verbose=True,
-    llm=llm
-)
+def parse_args():
+    """Argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Gerador de questões de concurso com agentes de IA")
+    parser.add_argument("--batch", metavar="ARQUIVO",
+                        help="Arquivo de lote (CSV/JSON/YAML) com prova, tema, nivel, area e count")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Equipes simultâneas por provider no modo lote (padrão: 4)")
+    parser.add_argument("--output", metavar="ARQUIVO",
+                        help="Arquivo JSONL onde gravar os resultados do lote")
+    parser.add_argument("--trace", metavar="ARQUIVO",
+                        help="Grava tokens, latência e custo de cada chamada em JSONL (padrão: LLM_TRACE_PATH)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Exibe a questão à medida que o gerador a escreve")
+    parser.add_argument("--review", action="store_true",
+                        help="Passa cada questão pelo revisor pedagógico; reprovadas são refeitas pelo gerador")
+    parser.add_argument("--review-concurrency", type=int,
+                        help="Revisões simultâneas no modo lote (padrão: REVIEW_CONCURRENCY ou 2)")
+    parser.add_argument("--from-bank", action="store_true",
+                        help="Serve uma questão guardada no banco, se houver, antes de chamar o LLM")
+    parser.add_argument("--provider",
+                        help="Provider padrão do lote, ou 'router' para fallback automático (padrão: PREFERRED_LLM_PROVIDER)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retoma pelo journal de progresso: pula o que já foi concluído e refaz só o pendente ou com erro")
+    parser.add_argument("--journal", metavar="ARQUIVO",
+                        help="Journal de progresso (padrão: .cache/progresso/<nome do lote>.jsonl; "
+                             "execuções avulsas ficam em .cache/progresso/avulsas/)")
+    parser.add_argument("--questions-per-call", type=int,
+                        help="Questões da mesma combinação por chamada ao gerador no modo lote (padrão: QUESTIONS_PER_CALL ou 1)")
+    parser.add_argument("--engine", choices=ENGINES,
+                        help="crew (CrewAI) ou direct (uma chamada ao LLM por tarefa, sem CrewAI) (padrão: PIPELINE_ENGINE ou crew)")
+    return parser.parse_args()
 
-# Gerador de Questões
-gerador = Agent(
-    role="Criador de Questões de Múltipla Escolha",
-    goal=f"Criar uma questão de múltipla escolha clara, objetiva e pedagogicamente adequada baseada no edital do {prova}",
-    backstory="""Você é um especialista em avaliação educacional com formação em Pedagogia. 
-    Tem experiência em criar questões para vestibulares e concursos. 
-    Conhece as melhores práticas para formulação de questões de múltipla escolha.""",
-    verbose=True,
-    llm=llm
-)
+def run_single(stream: bool = False, trace_path: Optional[str] = None, from_bank: bool = False,
+               review: bool = False, resume: bool = False, journal_file: Optional[str] = None):
+    """Gera uma única questão com a configuração padrão"""
+    bank = QuestionBank.from_env()
+    if from_bank and bank is not None:
+        questao = bank.take(prova, tema, nivel, area)
+        if questao is not None:
+            bank.close()
+            print("\n" + "="*60)
+            print("📦 QUESTÃO DO BANCO")
+            print("="*60)
+            print(questao)
+            return
+        print("📦 Nenhuma questão disponível no banco; gerando uma nova")
 
-# Revisor Pedagógico
-revisor = Agent(
-    role="Revisor Pedagógico",
-    goal=f"Garantir a qualidade, clareza e adequação pedagógica da questão finalizada baseada no edital do {prova}",
-    backstory="""Você é um pedagogo com especialização em avaliação educacional. 
-    Tem experiência em revisar materiais editais de concursos. 
-    Seu trabalho é garantir que a questão esteja perfeita antes da aplicação.""",
-    verbose=True,
-    llm=llm
-)
+    # Journal da execução avulsa (um por combinação, fora dos journais de lote): com --resume, a
+    # análise do especialista de uma execução que falhou no gerador é reaproveitada, e uma
+    # questão já concluída é reexibida. Aberto depois do banco: uma questão servida pelo banco
+    # não gera nada a registrar, e o journal da combinação não é recriado
+    journal = ProgressJournal(journal_file or single_run_journal_path(prova, tema, nivel, area), resume=resume)
+    try:
+        job = {"indice": 0, "item": 0, "prova": prova, "tema": tema, "nivel": nivel, "area": area}
+        concluida = journal.completed(job)
+        if concluida is not None:
+            print("\n" + "="*60)
+            print("📓 QUESTÃO JÁ CONCLUÍDA (journal)")
+            print("="*60)
+            print(concluida["resultado"])
+            return
+        cache = journal.wrap(SpecialistCache.from_env())
 
-# Tarefas Estruturadas
-tarefa_especialista = Task(
-    description=f"""
-    Analise o tema '{tema}' e identifique os 5 pontos principais que devem ser abordados 
-    em uma questão de nível {nivel}. 
-    
-    Forneça:
-    1. Lista dos conceitos fundamentais
-    2. Aspectos mais importantes para avaliação
-    3. Possíveis conexões com outros temas
-    4. Sugestões de enfoque adequado ao nível
-    
-    Seja específico e educacionalmente relevante.
-    """,
-    agent=especialista,
-    expected_output="Lista estruturada com os pontos principais e orientações pedagógicas"
-)
+        # Configurar o modelo LLM
+        print("🚀 Configurando modelo de LLM...")
+        try:
+            llm = get_llm_from_config()
+            print("✅ LLM configurado com sucesso!")
+        except Exception as e:
+            print(f"❌ Erro na configuração do LLM: {e}")
+            exit(1)
 
-tarefa_gerador = Task(
-    description="""
-    Com base na análise do especialista, crie uma questão de múltipla escolha seguindo este formato:
-    
-    QUESTÃO: [Enunciado claro e objetivo]
-    
-    A) [Alternativa 1]
-    B) [Alternativa 2] 
-    C) [Alternativa 3]
-    D) [Alternativa 4]
-    
-    RESPOSTA CORRETA: [Letra e justificativa]
+        print("\n" + "="*60)
+        print("🎯 Iniciando geração de questão...")
+        print(f"📚 Tema: {tema}")
+        print(f"📚 Prova: {prova}")
+        print(f"📚 Area: {area}")
+        print(f"📊 Nível: {nivel}")
+        print("-" * 50)
     
-    Requisitos:
-    - Questão clara e sem ambiguidades
-    - 4 alternativas plausíveis
-    - Apenas uma resposta correta
-    - Distratores bem elaborados
-    - Linguagem adequada ao nível
-    """,
-    agent=gerador,
-    expected_output="Questão de múltipla escolha completa com 4 alternativas e resposta correta identificada"
-)
+        tracker = UsageTracker(trace_path) if trace_path else UsageTracker.from_env()
+        if stream:
+            from streaming import stream_question
 
-# Equipe de Criação de Questões
-equipe = Crew(
-    agents=[especialista, gerador],
-    tasks=[tarefa_especialista, tarefa_gerador],
-    verbose=True,
-    process="sequential"  # Processamento sequencial para dependências
-)
+            print("\n" + "="*60)
+            print("✍️ QUESTÃO (em tempo real)")
+            print("="*60)
+            # A questão transmitida passa pela validação e pelo índice de duplicatas ao final;
+            # a validada é o valor de retorno do gerador
+            usage = UsageTracker(parent=tracker) if bank is not None else tracker
+            inicio = time.perf_counter()
+            trechos = stream_question(llm, prova, tema, nivel, area, cache=cache,
+                                      dedup=QuestionDedupIndex.from_env(), tracker=usage)
+            while True:
+                try:
+                    print(next(trechos), end="", flush=True)
+                except StopIteration as fim:
+                    resultado = fim.value
+                    break
+            print()
+            if bank is not None:
+                bank.add(resultado, servida=True, latencia_s=round(time.perf_counter() - inicio, 3), **usage.totals())
+        elif review:
+            from review_pipeline import ReviewPipeline
 
-# Execução
-if __name__ == "__main__":
-    print("\n" + "="*60)
-    print("🎯 Iniciando geração de questão...")
-    print(f"📚 Tema: {tema}")
-    print(f"📚 Prova: {prova}")
-    print(f"📚 Area: {area}")
-    print(f"📊 Nível: {nivel}")
-    print("-" * 50)
-    
-    try:
-        resultado = equipe.kickoff()
-        print("\n" + "="*60)
-        print("✅ QUESTÃO FINALIZADA")
-        print("="*60)
-        print(resultado)
+            # Pipeline de um job só: reprovações voltam ao gerador com o motivo do revisor
+            pipeline = ReviewPipeline(cache=cache, tracker=tracker, dedup=QuestionDedupIndex.from_env(), bank=bank,
+                                      servida=True)
+            record = next(pipeline.run([{**job, "provider": "configurado"}], llms={"configurado": llm}))
+            for motivo in record["revisao"]["motivos"]:
+                print(f"🧑‍🏫 Reprovada pelo revisor: {motivo}")
+            if record["status"] != "ok":
+                raise RuntimeError(record["erro"])
+            resultado = record["resultado"]
+        else:
+            # Tracker próprio da questão, para guardar tokens e custo junto com ela no banco
+            usage = UsageTracker(parent=tracker) if bank is not None else tracker
+            inicio = time.perf_counter()
+            resultado = generate_question(llm, prova, tema, nivel, area, cache=cache,
+                                          tracker=usage, dedup=QuestionDedupIndex.from_env())
+            if bank is not None:
+                bank.add(resultado, servida=True, latencia_s=round(time.perf_counter() - inicio, 3), **usage.totals())
+        journal.record_result({**job, "status": "ok", "resultado": str(resultado)})
+        if not stream:
+            print("\n" + "="*60)
+            print("✅ QUESTÃO FINALIZADA")
+            print("="*60)
+            print(resultado)
+        if bank is not None:
+            bank.close()
+            print(f"🗄️ Questão guardada em {bank.path}")
+        if tracker:
+            tracker.print_summary()
+        if os.getenv("LLM_CACHE_PATH"):
+            from llm_cache import response_cache_stats
+            stats = response_cache_stats()
+            print(f"💾 Cache de respostas: {stats['hits']} hits, {stats['misses']} misses")
+        print_prompt_savings()
     except Exception as e:
         print(f"❌ Erro durante a execução: {e}")
+        if journal.has_analysis(prova, tema, nivel, area):
+            print("📓 A análise do especialista já concluída ficou no journal; rode de novo com --resume para aproveitá-la")
+        if get_status_code(e) == 429 or "429" in str(e):
+            provider = getattr(llm, "llm_provider", None) or "provider"
+            print("💡 O provider continuou limitando a taxa (429) mesmo após as pausas do rate limiter:")
+            print(f"- Reduza RATE_LIMIT_{provider.upper()}_RPM / RATE_LIMIT_{provider.upper()}_TPM para o limite do seu plano")
+            print("- Ou use o roteamento (--provider router) para cair em outro provider")
+            return
         print("💡 Dicas para resolver:")
         print("- Verifique se a API key está correta")
         print("- Verifique se há créditos disponíveis na sua conta")
         print("- Tente usar um provider diferente")
+    finally:
+        journal.close()
+
+def run_batch_mode(args):
+    """Gera as questões descritas em um arquivo de lote"""
+    from batch import run_batch
+
+    provider = (args.provider or os.getenv("PREFERRED_LLM_PROVIDER", "")).lower()
+    if not provider and (os.getenv("LLM_FALLBACK_PROVIDERS") or not sys.stdin.isatty()):
+        provider = LLMProvider.ROUTER
+    if not provider:
+        provider, _ = select_llm_provider()
+
+    try:
+        run_batch(args.batch, provider, concurrency=args.concurrency, output_path=args.output,
+                  trace_path=args.trace, review=args.review, review_concurrency=args.review_concurrency,
+                  per_call=args.questions_per_call, resume=args.resume, journal_file=args.journal)
+    except Exception as e:
+        print(f"❌ Erro durante o lote: {e}")
+        exit(1)
+
+# Execução
+if __name__ == "__main__":
+    args = parse_args()
+    if args.engine:
+        os.environ["PIPELINE_ENGINE"] = args.engine
+    if args.batch:
+        run_batch_mode(args)
+    else:
+        run_single(stream=args.stream, trace_path=args.trace, from_bank=args.from_bank, review=args.review,
+                   resume=args.resume, journal_file=args.journal)
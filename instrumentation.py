@@ -0,0 +1,278 @@
+"""
+Instrumentação de tokens, latência, retries e custo por agente, tarefa e provider
+
+Cada agente recebe uma cópia do LLM com um callback que registra as chamadas, marcadas
+com o papel do agente, a tarefa, o provider e o modelo. Os registros vão para um trace
+JSONL e são agregados numa tabela de resumo ao final da execução.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from llm_config import LLMConfig, LLMFactory, LLMProvider
+
+# Tarefa executada por cada agente da equipe
+AGENT_TASKS = {
+    "especialista": "tarefa_especialista",
+    "gerador": "tarefa_gerador",
+    "revisor": "tarefa_revisor",
+}
+
+def estimate_cost(provider: str, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """
+    Estima o custo de uma chamada em USD a partir de LLMConfig.PRICING
+
+    Returns:
+        Custo estimado, ou None se o modelo não tiver preço cadastrado
+    """
+    if provider in (LLMProvider.OLLAMA, LLMProvider.FAKE):
+        return 0.0
+    price = LLMConfig.PRICING.get(model)
+    if price is None:
+        # Nomes com data/versão (ex: gpt-4o-mini-2024-07-18) usam o preço do modelo base
+        prefixes = [name for name in LLMConfig.PRICING if model.startswith(name)]
+        if not prefixes:
+            return None
+        price = LLMConfig.PRICING[max(prefixes, key=len)]
+    input_price, output_price = price
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+def extract_token_usage(response: Any) -> Tuple[int, int, bool]:
+    """
+    Extrai tokens de entrada/saída de um LLMResult, para qualquer provider
+
+    Returns:
+        Tupla (prompt_tokens, completion_tokens, estimado). Quando o provider não informa
+        uso, os tokens são estimados pelo tamanho do texto (~4 caracteres por token)
+    """
+    llm_output = getattr(response, "llm_output", None) or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    if isinstance(usage, dict):
+        prompt = usage.get("prompt_tokens", usage.get("input_tokens"))
+        completion = usage.get("completion_tokens", usage.get("output_tokens"))
+        if prompt is not None or completion is not None:
+            return int(prompt or 0), int(completion or 0), False
+
+    prompt_total = completion_total = 0
+    found = False
+    text_length = 0
+    for generations in getattr(response, "generations", []) or []:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            metadata = getattr(message, "usage_metadata", None)
+            if metadata:
+                prompt_total += int(metadata.get("input_tokens", 0))
+                completion_total += int(metadata.get("output_tokens", 0))
+                found = True
+            text_length += len(getattr(generation, "text", "") or "")
+
+    if found:
+        return prompt_total, completion_total, False
+    return 0, text_length // 4, True
+
+class UsageTracker:
+    """Acumula os registros de uso e grava o trace JSONL"""
+
+    def __init__(self, trace_path: Optional[str] = None, parent: Optional["UsageTracker"] = None):
+        """
+        Args:
+            trace_path: Arquivo JSONL onde cada chamada é gravada (opcional)
+            parent: Tracker que também recebe cada registro (ex: o tracker do lote, quando
+                este mede uma única questão)
+        """
+        self.trace_path = trace_path
+        self.parent = parent
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if trace_path and os.path.dirname(trace_path):
+            os.makedirs(os.path.dirname(trace_path), exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["UsageTracker"]:
+        """Cria o tracker se LLM_TRACE_PATH estiver definido"""
+        trace_path = os.getenv("LLM_TRACE_PATH")
+        return cls(trace_path) if trace_path else None
+
+    def record(self, entry: Dict[str, Any]):
+        """Guarda um registro de chamada e o anexa ao trace"""
+        with self._lock:
+            self.records.append(entry)
+            if self.trace_path:
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        if self.parent is not None:
+            self.parent.record(entry)
+
+    def handler(self, agente: str, tarefa: str, provider: str, model: str) -> "UsageCallbackHandler":
+        """Cria um callback com as marcações de agente, tarefa, provider e modelo"""
+        return UsageCallbackHandler(self, {"agente": agente, "tarefa": tarefa, "provider": provider, "modelo": model})
+
+    def instrument(self, llm, roles: Tuple[str, ...] = tuple(AGENT_TASKS)) -> Dict[str, Any]:
+        """
+        Cria uma cópia instrumentada do LLM para cada agente
+
+        As cópias compartilham o cliente HTTP do LLM original; só os callbacks mudam.
+
+        Returns:
+            Dict papel → LLM, para passar a build_agents(llms=...)
+        """
+        provider, model = LLMFactory.describe_llm(llm)
+        llms = {}
+        for role in roles:
+            handler = self.handler(role, AGENT_TASKS.get(role, role), provider, model)
+            callbacks = list(getattr(llm, "callbacks", None) or []) + [handler]
+            llms[role] = llm.model_copy(update={"callbacks": callbacks})
+        return llms
+
+    def totals(self) -> Dict[str, Any]:
+        """
+        Soma tokens e custo de todos os registros
+
+        Returns:
+            Dict com provider e modelo da última chamada do gerador (ou da última chamada),
+            prompt_tokens, completion_tokens e custo_usd (None se algum modelo não tiver preço)
+        """
+        with self._lock:
+            records = list(self.records)
+        last = next((entry for entry in reversed(records) if entry["agente"] == "gerador"),
+                    records[-1] if records else {})
+        costs = [entry["custo_usd"] for entry in records]
+        return {
+            "provider": last.get("provider"),
+            "modelo": last.get("modelo"),
+            "prompt_tokens": sum(entry["prompt_tokens"] for entry in records),
+            "completion_tokens": sum(entry["completion_tokens"] for entry in records),
+            "custo_usd": None if None in costs else round(sum(costs), 6),
+        }
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Agrega os registros por agente, tarefa, provider e modelo
+
+        Returns:
+            Linhas do resumo, da mais cara para a mais barata
+        """
+        groups: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+        with self._lock:
+            records = list(self.records)
+
+        for entry in records:
+            key = (entry["agente"], entry["tarefa"], entry["provider"], entry["modelo"])
+            row = groups.setdefault(key, {
+                "agente": key[0], "tarefa": key[1], "provider": key[2], "modelo": key[3],
+                "chamadas": 0, "erros": 0, "retries": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "latencia_total_s": 0.0, "custo_usd": 0.0, "custo_conhecido": True,
+            })
+            row["chamadas"] += 1
+            row["erros"] += 0 if entry["status"] == "ok" else 1
+            row["retries"] += entry["retries"]
+            row["prompt_tokens"] += entry["prompt_tokens"]
+            row["completion_tokens"] += entry["completion_tokens"]
+            row["latencia_total_s"] += entry["latencia_s"]
+            if entry["custo_usd"] is None:
+                row["custo_conhecido"] = False
+            else:
+                row["custo_usd"] += entry["custo_usd"]
+
+        return sorted(groups.values(), key=lambda row: (row["custo_usd"], row["prompt_tokens"]), reverse=True)
+
+    def print_summary(self):
+        """Imprime a tabela de resumo de tokens, latência e custo"""
+        rows = self.summary()
+        if not rows:
+            return
+
+        print("\n" + "=" * 112)
+        print("📊 USO DE TOKENS E CUSTO")
+        print("=" * 112)
+        print(f"{'Agente':<14}{'Tarefa':<22}{'Provider/Modelo':<32}{'Cham.':>6}{'Erros':>6}{'Retr.':>6}"
+              f"{'Entrada':>9}{'Saída':>8}{'Lat.méd':>9}{'Custo US$':>11}")
+        print("-" * 112)
+        totals = {"chamadas": 0, "prompt_tokens": 0, "completion_tokens": 0, "custo_usd": 0.0}
+        for row in rows:
+            average = row["latencia_total_s"] / row["chamadas"]
+            cost = f"{row['custo_usd']:.5f}" + ("" if row["custo_conhecido"] else "*")
+            model = f"{row['provider']}/{row['modelo']}"[:31]
+            print(f"{row['agente']:<14}{row['tarefa']:<22}{model:<32}{row['chamadas']:>6}"
+                  f"{row['erros']:>6}{row['retries']:>6}{row['prompt_tokens']:>9}{row['completion_tokens']:>8}{average:>8.2f}s{cost:>11}")
+            for field in totals:
+                totals[field] += row[field]
+        print("-" * 112)
+        print(f"{'TOTAL':<68}{totals['chamadas']:>6}{'':>12}{totals['prompt_tokens']:>9}"
+              f"{totals['completion_tokens']:>8}{'':>9}{totals['custo_usd']:>11.5f}")
+        if any(not row["custo_conhecido"] for row in rows):
+            print("* modelo sem preço em LLMConfig.PRICING; custo parcial")
+        if self.trace_path:
+            print(f"📝 Trace completo em {self.trace_path}")
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Callback do LangChain que mede cada chamada do LLM de um agente"""
+
+    def __init__(self, tracker: UsageTracker, tags: Dict[str, str]):
+        self.tracker = tracker
+        self.tags = tags
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID):
+        with self._lock:
+            self._runs[run_id] = {"inicio": time.perf_counter(), "retries": 0}
+
+    def _finish(self, run_id: UUID) -> Dict[str, Any]:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        return run or {"inicio": time.perf_counter(), "retries": 0}
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id)
+
+    def on_retry(self, retry_state: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            if run_id in self._runs:
+                self._runs[run_id]["retries"] += 1
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._finish(run_id)
+        prompt_tokens, completion_tokens, estimated = extract_token_usage(response)
+        # O roteador informa qual provider atendeu a chamada
+        llm_output = getattr(response, "llm_output", None) or {}
+        provider = llm_output.get("provider", self.tags["provider"])
+        model = llm_output.get("model_name") or llm_output.get("model") or self.tags["modelo"]
+
+        self.tracker.record({
+            **self.tags,
+            "provider": provider,
+            "modelo": model,
+            "timestamp": time.time(),
+            "status": "ok",
+            "latencia_s": round(time.perf_counter() - run["inicio"], 4),
+            "retries": run["retries"],
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_estimados": estimated,
+            "custo_usd": estimate_cost(provider, model, prompt_tokens, completion_tokens),
+        })
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._finish(run_id)
+        self.tracker.record({
+            **self.tags,
+            "timestamp": time.time(),
+            "status": "erro",
+            "erro": f"{type(error).__name__}: {error}",
+            "latencia_s": round(time.perf_counter() - run["inicio"], 4),
+            "retries": run["retries"],
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "tokens_estimados": False,
+            "custo_usd": 0.0,
+        })
@@ -0,0 +1,218 @@
+"""
+Cache persistente de respostas de LLM, endereçado pelo conteúdo
+
+Ativado pela variável LLM_CACHE_PATH. A chave é o hash de provider, modelo, temperature,
+max_tokens e da lista de mensagens normalizada; o valor são as gerações serializadas
+pelo LangChain. Funciona para todos os providers do LLMFactory, via parâmetro `cache`
+dos modelos do LangChain.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_MB = 200
+
+class ResponseStore:
+    """Armazenamento SQLite das respostas, com evicção LRU por entradas e por tamanho"""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        """
+        Args:
+            path: Arquivo SQLite do cache
+            max_entries: Número máximo de respostas guardadas
+            max_bytes: Tamanho máximo somado das respostas guardadas
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                provider TEXT,
+                modelo TEXT,
+                valor TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (ultimo_acesso)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Busca uma resposta e atualiza seu último acesso"""
+        with self._lock:
+            row = self._conn.execute("SELECT valor FROM respostas WHERE chave = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE respostas SET ultimo_acesso = ? WHERE chave = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str, provider: str = "", model: str = ""):
+        """Guarda uma resposta e aplica a evicção"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respostas (chave, provider, modelo, valor, tamanho, ultimo_acesso) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, provider, model, value, len(value.encode("utf-8")), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Remove as respostas menos usadas até respeitar os limites de entradas e de tamanho"""
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        excess_entries = max(0, count - self.max_entries)
+        excess_bytes = max(0, total - self.max_bytes)
+        to_delete = []
+        freed = 0
+        for key, size in self._conn.execute("SELECT chave, tamanho FROM respostas ORDER BY ultimo_acesso ASC"):
+            if len(to_delete) >= excess_entries and freed >= excess_bytes:
+                break
+            to_delete.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM respostas WHERE chave = ?", to_delete)
+
+    def clear(self, provider: Optional[str] = None, model: Optional[str] = None):
+        """Remove todas as respostas (ou apenas as de um provider/modelo)"""
+        with self._lock:
+            if provider is None:
+                self._conn.execute("DELETE FROM respostas")
+            else:
+                self._conn.execute(
+                    "DELETE FROM respostas WHERE provider = ? AND (? IS NULL OR modelo = ?)",
+                    (provider, model, model)
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna hits, misses, entradas e bytes ocupados"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": total}
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normaliza o prompt recebido do LangChain
+
+    Para chat models o prompt é a lista de mensagens serializada; ela é reduzida a
+    pares (tipo, conteúdo) sem espaços nas pontas das linhas, para que diferenças de
+    indentação ou de metadados não gerem misses.
+    """
+    try:
+        messages = json.loads(prompt)
+    except (TypeError, ValueError):
+        messages = None
+
+    if isinstance(messages, list):
+        normalized = []
+        for message in messages:
+            kwargs = message.get("kwargs", {}) if isinstance(message, dict) else {}
+            content = kwargs.get("content", "")
+            if isinstance(content, str):
+                content = "\n".join(line.strip() for line in content.strip().splitlines())
+            message_type = kwargs.get("type") or (message.get("id") or ["?"])[-1]
+            normalized.append([message_type, content])
+        return json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+
+    return "\n".join(line.strip() for line in str(prompt).strip().splitlines())
+
+class ProviderResponseCache(BaseCache):
+    """Visão do ResponseStore para um provider/modelo/configuração específicos"""
+
+    def __init__(self, store: ResponseStore, provider: str, config: Dict[str, Any]):
+        self.store = store
+        self.provider = provider
+        self.model = str(config.get("model") or config.get("repo_id") or "")
+        max_tokens = config.get("max_tokens", config.get("max_output_tokens", config.get("max_length")))
+        self._namespace = [provider, self.model, config.get("temperature"), max_tokens]
+
+    def _key(self, prompt: str) -> str:
+        payload = json.dumps(self._namespace + [normalize_prompt(prompt)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Any]]:
+        value = self.store.get(self._key(prompt))
+        if value is None:
+            return None
+        try:
+            return loads(value)
+        except Exception:
+            # Entrada de uma versão incompatível do LangChain: tratar como miss
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Any]) -> None:
+        self.store.set(self._key(prompt), dumps(list(return_val)), self.provider, self.model)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear(self.provider, self.model)
+
+_stores: Dict[str, ResponseStore] = {}
+_stores_lock = threading.Lock()
+
+def get_store(path: Optional[str] = None) -> Optional[ResponseStore]:
+    """
+    Retorna o ResponseStore do processo para o caminho configurado
+
+    Args:
+        path: Arquivo do cache (padrão: LLM_CACHE_PATH)
+
+    Returns:
+        ResponseStore compartilhado, ou None se o cache estiver desativado
+    """
+    path = path or os.getenv("LLM_CACHE_PATH")
+    if not path:
+        return None
+
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ResponseStore(
+                path,
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+            )
+        return _stores[path]
+
+def create_response_cache(provider: str, config: Dict[str, Any]) -> Optional[ProviderResponseCache]:
+    """
+    Cria o cache de respostas para um LLM do factory, se LLM_CACHE_PATH estiver definido
+
+    Returns:
+        Instância de BaseCache para passar ao modelo, ou None
+    """
+    store = get_store()
+    if store is None:
+        return None
+    return ProviderResponseCache(store, provider, config)
+
+def response_cache_stats() -> Optional[Dict[str, int]]:
+    """Estatísticas do cache de respostas, ou None se estiver desativado"""
+    store = get_store()
+    return store.stats() if store else None
@@ -1,39 +1,13 @@
+import importlib
+import importlib.util
 import os
-from typing import Dict, Any, Optional
+import threading
+import weakref
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 
-# Importações condicionais para diferentes providers
-try:
-    from langchain_openai import ChatOpenAI
-except ImportError:
-    ChatOpenAI = None
-
-try:
-    from langchain_anthropic import ChatAnthropic
-except ImportError:
-    ChatAnthropic = None
-
-try:
-    from langchain_google_genai import ChatGoogleGenerativeAI
-except ImportError:
-    ChatGoogleGenerativeAI = None
-
-try:
-    from langchain_groq import ChatGroq
-except ImportError:
-    ChatGroq = None
-
-try:
-    from langchain_community.llms import Ollama
-    from langchain_community.chat_models import ChatOllama
-except ImportError:
-    Ollama = None
-    ChatOllama = None
-
-try:
-    from langchain_huggingface import HuggingFaceEndpoint
-except ImportError:
-    HuggingFaceEndpoint = None
+if TYPE_CHECKING:
+    import asyncio
 
 # Carregar variáveis do arquivo .env
 load_dotenv()
@@ -46,6 +20,10 @@ class LLMProvider:
     GROQ = "groq"
     OLLAMA = "ollama"
     HUGGINGFACE = "huggingface"
+    # Roteador com fallback automático entre os providers acima
+    ROUTER = "router"
+    # Provider local determinístico, para testes e benchmarks sem rede
+    FAKE = "fake"
 
 class LLMConfig:
     """Configurações padrão para diferentes providers"""
@@ -79,12 +57,162 @@ class LLMConfig:
             "repo_id": "microsoft/DialoGPT-large",
             "temperature": 0.7,
             "max_length": 2000,
+        },
+        LLMProvider.FAKE: {
+            "model": "fake-questoes",
+            "temperature": 0.7,
+            "max_tokens": 2000,
+            "latency_s": float(os.getenv("FAKE_LLM_LATENCY", "0.2")),
+            "tokens_per_s": float(os.getenv("FAKE_LLM_TOKENS_PER_S", "200")),
+            "error_rate": float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+            "error_kind": os.getenv("FAKE_LLM_ERROR_KIND", "429"),
+            "seed": int(os.getenv("FAKE_LLM_SEED", "42")),
+            "max_concurrency": int(os.getenv("FAKE_LLM_MAX_CONCURRENCY", "0")),
         }
     }
+    
+    # Limites por provider aplicados pelo rate_limiter (requisições/min, tokens/min e teto
+    # de chamadas simultâneas). Valores dos planos de entrada; ajuste com
+    # RATE_LIMIT_<PROVIDER>_RPM, RATE_LIMIT_<PROVIDER>_TPM e RATE_LIMIT_<PROVIDER>_CONCURRENCY
+    RATE_LIMITS = {
+        LLMProvider.OPENAI: {"rpm": 500, "tpm": 200000, "max_concurrency": 16},
+        LLMProvider.ANTHROPIC: {"rpm": 50, "tpm": 50000, "max_concurrency": 8},
+        LLMProvider.GOOGLE: {"rpm": 15, "tpm": 1000000, "max_concurrency": 4},
+        LLMProvider.GROQ: {"rpm": 30, "tpm": 30000, "max_concurrency": 4},
+    }
+    
+    # Roteamento/fallback automático entre providers (LLMFactory.create_router)
+    ROUTER_CONFIG = {
+        "timeout_s": float(os.getenv("LLM_ROUTER_TIMEOUT", "60")),
+        "failure_threshold": 3,
+        "cooldown_s": float(os.getenv("LLM_ROUTER_COOLDOWN", "30")),
+        "window": 50,
+        # Chamadas simultâneas por provider no roteador (inclui as que passaram do timeout)
+        "max_concurrency": int(os.getenv("LLM_ROUTER_CONCURRENCY", "16")),
+    }
+    
+    # Modelos de embedding do RAG (LLMFactory.create_embeddings)
+    EMBEDDING_CONFIGS = {
+        LLMProvider.OPENAI: {
+            "model": "text-embedding-3-small",
+        },
+        LLMProvider.OLLAMA: {
+            "model": "nomic-embed-text",
+        },
+        LLMProvider.HUGGINGFACE: {
+            "model": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+        },
+        LLMProvider.FAKE: {
+            "model": "fake-hash-256",
+            "size": 256,
+        },
+    }
+    
+    # Preço estimado em USD por 1M de tokens: (entrada, saída). Modelos locais custam zero.
+    PRICING = {
+        "gpt-4o": (2.50, 10.00),
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4-turbo": (10.00, 30.00),
+        "gpt-3.5-turbo": (0.50, 1.50),
+        "claude-3-opus-20240229": (15.00, 75.00),
+        "claude-3-sonnet-20240229": (3.00, 15.00),
+        "claude-3-haiku-20240307": (0.25, 1.25),
+        "gemini-1.5-pro": (1.25, 5.00),
+        "gemini-1.5-flash": (0.075, 0.30),
+        "gemini-pro": (0.50, 1.50),
+        "llama3-70b-8192": (0.59, 0.79),
+        "llama3-8b-8192": (0.05, 0.08),
+        "mixtral-8x7b-32768": (0.24, 0.24),
+    }
+
+# Registro preguiçoso dos providers: (módulo, classe, pacote pip).
+# Os SDKs só são importados dentro de LLMFactory.create_llm, para o provider escolhido.
+PROVIDER_REGISTRY = {
+    LLMProvider.OPENAI: ("langchain_openai", "ChatOpenAI", "langchain-openai"),
+    LLMProvider.ANTHROPIC: ("langchain_anthropic", "ChatAnthropic", "langchain-anthropic"),
+    LLMProvider.GOOGLE: ("langchain_google_genai", "ChatGoogleGenerativeAI", "langchain-google-genai"),
+    LLMProvider.GROQ: ("langchain_groq", "ChatGroq", "langchain-groq"),
+    LLMProvider.OLLAMA: ("langchain_community.chat_models", "ChatOllama", "langchain-community"),
+    LLMProvider.HUGGINGFACE: ("langchain_huggingface", "HuggingFaceEndpoint", "langchain-huggingface"),
+    LLMProvider.FAKE: ("fake_llm", "FakeChatModel", "langchain-core"),
+}
+
+# Mesmo esquema para os modelos de embedding, importados só por create_embeddings
+EMBEDDING_REGISTRY = {
+    LLMProvider.OPENAI: ("langchain_openai", "OpenAIEmbeddings", "langchain-openai"),
+    LLMProvider.OLLAMA: ("langchain_community.embeddings", "OllamaEmbeddings", "langchain-community"),
+    LLMProvider.HUGGINGFACE: ("langchain_huggingface", "HuggingFaceEmbeddings", "langchain-huggingface sentence-transformers"),
+    LLMProvider.FAKE: ("fake_llm", "FakeEmbeddings", "langchain-core"),
+}
+
+# Providers que não aparecem na listagem/seleção (só por nome explícito)
+HIDDEN_PROVIDERS = {LLMProvider.FAKE}
+
+# Parâmetros aceitos por todos os modelos do LangChain, repassados quando presentes no config
+OPTIONAL_LLM_KWARGS = ("cache", "callbacks", "streaming")
+
+# Providers cujos modelos aceitam streaming=True (tokens via callback on_llm_new_token)
+STREAMING_PROVIDERS = {LLMProvider.OPENAI, LLMProvider.ANTHROPIC, LLMProvider.GROQ, LLMProvider.HUGGINGFACE,
+                       LLMProvider.FAKE}
+
+# Providers cujos modelos aceitam clientes httpx externos (http_client / http_async_client),
+# que recebem os clientes compartilhados do http_pool
+HTTP_CLIENT_PROVIDERS = {LLMProvider.OPENAI, LLMProvider.GROQ}
+
+# Classes já carregadas, para não repetir o import a cada create_llm
+_loaded_classes: Dict[str, Any] = {}
+
+# LLMs criados por acreate_llm, por event loop e depois por (provider, configuração).
+# asyncio só é importado dentro de acreate_llm, para não pesar na importação do llm_config
+_async_llms: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], Any]]" = weakref.WeakKeyDictionary()
+_async_llms_lock = threading.Lock()
 
 class LLMFactory:
     """Factory class para criar instâncias de diferentes LLMs"""
     
+    @staticmethod
+    def is_provider_installed(provider: str) -> bool:
+        """
+        Verifica se o pacote do provider está instalado, sem importá-lo
+        
+        Args:
+            provider: Nome do provider
+            
+        Returns:
+            True se o módulo do provider pode ser encontrado
+        """
+        module_name = PROVIDER_REGISTRY[provider][0]
+        # find_spec de um submódulo importaria o pacote pai; basta o pacote raiz
+        root_module = module_name.split(".")[0]
+        try:
+            return importlib.util.find_spec(root_module) is not None
+        except (ImportError, ValueError):
+            return False
+    
+    @staticmethod
+    def _load_provider_class(provider: str):
+        """
+        Importa (uma única vez) a classe do LLM do provider
+        
+        Raises:
+            ImportError: Se o pacote do provider não estiver instalado
+        """
+        if provider in _loaded_classes:
+            return _loaded_classes[provider]
+        
+        llm_class = LLMFactory._import_class(*PROVIDER_REGISTRY[provider])
+        _loaded_classes[provider] = llm_class
+        return llm_class
+    
+    @staticmethod
+    def _import_class(module_name: str, class_name: str, package: str):
+        """Importa uma classe de um SDK opcional, com mensagem de instalação se faltar"""
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            raise ImportError(f"{package} não está instalado. Execute: pip install {package}")
+        return getattr(module, class_name)
+    
     @staticmethod
     def create_llm(provider: str, custom_config: Optional[Dict[str, Any]] = None):
         """
@@ -93,6 +221,7 @@ class LLMFactory:
         Args:
             provider: Nome do provider (openai, anthropic, google, etc.)
             custom_config: Configurações customizadas para sobrescrever as padrões
+                (aceita também "streaming", "callbacks" e "cache")
             
         Returns:
             Instância do LLM configurado
@@ -100,55 +229,181 @@ class LLMFactory:
         Raises:
             ValueError: Se o provider não for suportado ou se dependências estão faltando
         """
-        # Obter configurações padrão
-        if provider not in LLMConfig.DEFAULT_CONFIGS:
-            raise ValueError(f"Provider '{provider}' não é suportado. "
-                           f"Providers disponíveis: {list(LLMConfig.DEFAULT_CONFIGS.keys())}")
+        if provider == LLMProvider.ROUTER:
+            return LLMFactory.create_router(router_config=custom_config)
         
-        config = LLMConfig.DEFAULT_CONFIGS[provider].copy()
+        config = LLMFactory.resolve_config(provider, custom_config)
         
-        # Aplicar configurações customizadas se fornecidas
-        if custom_config:
-            config.update(custom_config)
+        # Streaming só é repassado para os providers que o suportam
+        if config.get("streaming") and provider not in STREAMING_PROVIDERS:
+            config.pop("streaming")
+        
+        # Cache de respostas em disco (opcional, ativado por LLM_CACHE_PATH)
+        if "cache" not in config and os.getenv("LLM_CACHE_PATH"):
+            from llm_cache import create_response_cache
+            config["cache"] = create_response_cache(provider, config)
+        
+        # Pool de conexões HTTP compartilhado entre todos os LLMs do processo
+        if provider in HTTP_CLIENT_PROVIDERS and "http_client" not in config:
+            from http_pool import get_http_client, http_pool_enabled
+            if http_pool_enabled():
+                config["http_client"] = get_http_client()
+        
+        # Com rate limiter, o cache de respostas fica no modelo externo: hits não passam pelo
+        # limiter, não gastam RPM/TPM e não distorcem a latência observada
+        limiter = LLMFactory._rate_limiter(provider, config)
+        outer_cache = config.pop("cache", None) if limiter is not None else None
         
         # Criar instância baseada no provider
         if provider == LLMProvider.OPENAI:
-            return LLMFactory._create_openai_llm(config)
+            llm = LLMFactory._create_openai_llm(config)
         elif provider == LLMProvider.ANTHROPIC:
-            return LLMFactory._create_anthropic_llm(config)
+            llm = LLMFactory._create_anthropic_llm(config)
         elif provider == LLMProvider.GOOGLE:
-            return LLMFactory._create_google_llm(config)
+            llm = LLMFactory._create_google_llm(config)
         elif provider == LLMProvider.GROQ:
-            return LLMFactory._create_groq_llm(config)
+            llm = LLMFactory._create_groq_llm(config)
         elif provider == LLMProvider.OLLAMA:
-            return LLMFactory._create_ollama_llm(config)
+            llm = LLMFactory._create_ollama_llm(config)
         elif provider == LLMProvider.HUGGINGFACE:
-            return LLMFactory._create_huggingface_llm(config)
+            llm = LLMFactory._create_huggingface_llm(config)
+        elif provider == LLMProvider.FAKE:
+            llm = LLMFactory._create_fake_llm(config)
         else:
             raise ValueError(f"Provider '{provider}' não implementado")
+        
+        if limiter is None:
+            return llm
+        from llm_router import as_chat_model
+        from rate_limiter import RateLimitedChatModel
+        # O limiter espera respostas de chat: modelos de completion entram pelo adaptador
+        return RateLimitedChatModel(llm=as_chat_model(llm, provider), limiter=limiter, llm_provider=provider, cache=outer_cache,
+                                    model_name=LLMFactory._model_id(config))
+    
+    @staticmethod
+    async def acreate_llm(provider: str, custom_config: Optional[Dict[str, Any]] = None):
+        """
+        Versão assíncrona de create_llm, com LLMs compartilhados pelo event loop
+        
+        O LLM de cada provider/configuração é criado uma única vez por event loop (o import do
+        SDK roda numa thread, sem travar o loop) e recebe o httpx.AsyncClient compartilhado do
+        loop: gerações concorrentes reaproveitam as conexões abertas em vez de reconectar.
+        Configurações com callbacks (ex: streaming) são de uma chamada só e não entram no cache,
+        mas também usam o cliente compartilhado.
+        
+        Args:
+            provider: Nome do provider (ou router)
+            custom_config: Configurações customizadas, como em create_llm
+            
+        Returns:
+            Instância do LLM configurado
+        """
+        import asyncio
+        import json
+        
+        from http_pool import get_async_http_client, http_pool_enabled
+        
+        loop = asyncio.get_running_loop()
+        shared = not (custom_config or {}).get("callbacks")
+        if shared:
+            config = LLMFactory.resolve_config(provider, custom_config) if provider != LLMProvider.ROUTER \
+                else dict(custom_config or {})
+            key = (provider, json.dumps(config, sort_keys=True, default=repr))
+            with _async_llms_lock:
+                llm = _async_llms.get(loop, {}).get(key)
+            if llm is not None:
+                return llm
+        
+        async_client = {"http_async_client": get_async_http_client()} if http_pool_enabled() else {}
+        if provider == LLMProvider.ROUTER:
+            create = lambda: LLMFactory.create_router(
+                router_config=custom_config,
+                custom_configs={name: async_client for name in HTTP_CLIENT_PROVIDERS})
+        elif provider in HTTP_CLIENT_PROVIDERS:
+            create = lambda: LLMFactory.create_llm(provider, {**(custom_config or {}), **async_client})
+        else:
+            create = lambda: LLMFactory.create_llm(provider, custom_config)
+        llm = await asyncio.to_thread(create)
+        
+        if shared:
+            with _async_llms_lock:
+                # Outra tarefa pode ter criado o mesmo LLM enquanto este era importado
+                llm = _async_llms.setdefault(loop, {}).setdefault(key, llm)
+        return llm
+    
+    @staticmethod
+    def resolve_config(provider: str, custom_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Configuração efetiva de um provider: padrões, modelo do .env e configurações customizadas
+        
+        Raises:
+            ValueError: Se o provider não for suportado
+        """
+        if provider not in LLMConfig.DEFAULT_CONFIGS:
+            raise ValueError(f"Provider '{provider}' não é suportado. "
+                           f"Providers disponíveis: {list(LLMConfig.DEFAULT_CONFIGS.keys())}")
+        
+        config = LLMConfig.DEFAULT_CONFIGS[provider].copy()
+        
+        # Modelo padrão escolhido no .env (ex: GROQ_MODEL, gravado por setup_providers.py --benchmark --apply)
+        model_env = os.getenv(f"{provider.upper()}_MODEL")
+        if model_env:
+            config["repo_id" if "repo_id" in config else "model"] = model_env
+        
+        # Aplicar configurações customizadas se fornecidas
+        if custom_config:
+            config.update(custom_config)
+        return config
+    
+    @staticmethod
+    def _model_id(config: Dict[str, Any]) -> str:
+        return str(config.get("model") or config.get("repo_id") or "desconhecido")
+    
+    @staticmethod
+    def _rate_limiter(provider: str, config: Dict[str, Any]):
+        """Rate limiter do provider/modelo pelo qual as chamadas do LLM passam (None sem limites configurados)"""
+        from rate_limiter import get_rate_limiter
+        
+        return get_rate_limiter(provider, LLMFactory._model_id(config))
+    
+    @staticmethod
+    def _optional_kwargs(config: Dict[str, Any]) -> Dict[str, Any]:
+        """Parâmetros opcionais comuns a todos os providers, repassados apenas se presentes"""
+        return {key: config[key] for key in OPTIONAL_LLM_KWARGS if config.get(key) is not None}
+    
+    @staticmethod
+    def _http_kwargs(config: Dict[str, Any]) -> Dict[str, Any]:
+        """Clientes httpx externos (pool compartilhado), para os providers que os aceitam"""
+        return {key: config[key] for key in ("http_client", "http_async_client") if config.get(key) is not None}
     
     @staticmethod
     def _create_openai_llm(config: Dict[str, Any]):
         """Cria instância do OpenAI LLM"""
-        if ChatOpenAI is None:
-            raise ImportError("langchain-openai não está instalado. Execute: pip install langchain-openai")
+        ChatOpenAI = LLMFactory._load_provider_class(LLMProvider.OPENAI)
         
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("❌ OPENAI_API_KEY não encontrada! Configure a chave da OpenAI no arquivo .env")
         
+        # OPENAI_BASE_URL aponta para qualquer servidor compatível com a API da OpenAI
+        # (vLLM, LM Studio, Ollama em /v1 ou o servidor local do fake_llm.py)
+        base_url = config.get("base_url") or os.getenv("OPENAI_BASE_URL")
+        extra = {"base_url": base_url} if base_url else {}
+        
         return ChatOpenAI(
             model=config["model"],
             temperature=config["temperature"],
             max_tokens=config["max_tokens"],
-            openai_api_key=api_key
+            openai_api_key=api_key,
+            **extra,
+            **LLMFactory._http_kwargs(config),
+            **LLMFactory._optional_kwargs(config)
         )
     
     @staticmethod
     def _create_anthropic_llm(config: Dict[str, Any]):
         """Cria instância do Anthropic LLM"""
-        if ChatAnthropic is None:
-            raise ImportError("langchain-anthropic não está instalado. Execute: pip install langchain-anthropic")
+        ChatAnthropic = LLMFactory._load_provider_class(LLMProvider.ANTHROPIC)
         
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
@@ -158,14 +413,14 @@ class LLMFactory:
             model=config["model"],
             temperature=config["temperature"],
             max_tokens=config["max_tokens"],
-            anthropic_api_key=api_key
+            anthropic_api_key=api_key,
+            **LLMFactory._optional_kwargs(config)
         )
     
     @staticmethod
     def _create_google_llm(config: Dict[str, Any]):
         """Cria instância do Google LLM"""
-        if ChatGoogleGenerativeAI is None:
-            raise ImportError("langchain-google-genai não está instalado. Execute: pip install langchain-google-genai")
+        ChatGoogleGenerativeAI = LLMFactory._load_provider_class(LLMProvider.GOOGLE)
         
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
@@ -175,14 +430,14 @@ class LLMFactory:
             model=config["model"],
             temperature=config["temperature"],
             max_output_tokens=config["max_output_tokens"],
-            google_api_key=api_key
+            google_api_key=api_key,
+            **LLMFactory._optional_kwargs(config)
         )
     
     @staticmethod
     def _create_groq_llm(config: Dict[str, Any]):
         """Cria instância do Groq LLM"""
-        if ChatGroq is None:
-            raise ImportError("langchain-groq não está instalado. Execute: pip install langchain-groq")
+        ChatGroq = LLMFactory._load_provider_class(LLMProvider.GROQ)
         
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
@@ -192,14 +447,15 @@ class LLMFactory:
             model=config["model"],
             temperature=config["temperature"],
             max_tokens=config["max_tokens"],
-            groq_api_key=api_key
+            groq_api_key=api_key,
+            **LLMFactory._http_kwargs(config),
+            **LLMFactory._optional_kwargs(config)
         )
     
     @staticmethod
     def _create_ollama_llm(config: Dict[str, Any]):
         """Cria instância do Ollama LLM (local)"""
-        if ChatOllama is None:
-            raise ImportError("langchain-community não está instalado. Execute: pip install langchain-community")
+        ChatOllama = LLMFactory._load_provider_class(LLMProvider.OLLAMA)
         
         # Ollama não precisa de API key, roda localmente
         base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
@@ -207,14 +463,14 @@ class LLMFactory:
         return ChatOllama(
             model=config["model"],
             temperature=config["temperature"],
-            base_url=base_url
+            base_url=base_url,
+            **LLMFactory._optional_kwargs(config)
         )
     
     @staticmethod
     def _create_huggingface_llm(config: Dict[str, Any]):
         """Cria instância do HuggingFace LLM"""
-        if HuggingFaceEndpoint is None:
-            raise ImportError("langchain-huggingface não está instalado. Execute: pip install langchain-huggingface")
+        HuggingFaceEndpoint = LLMFactory._load_provider_class(LLMProvider.HUGGINGFACE)
         
         api_key = os.getenv("HUGGINGFACE_API_KEY")
         if not api_key:
@@ -224,9 +480,187 @@ class LLMFactory:
             repo_id=config["repo_id"],
             temperature=config["temperature"],
             max_length=config["max_length"],
-            huggingfacehub_api_token=api_key
+            huggingfacehub_api_token=api_key,
+            **LLMFactory._optional_kwargs(config)
+        )
+    
+    @staticmethod
+    def _create_fake_llm(config: Dict[str, Any]):
+        """Cria instância do provider fake (local, sem rede e sem API key)"""
+        FakeChatModel = LLMFactory._load_provider_class(LLMProvider.FAKE)
+        
+        return FakeChatModel(
+            model_name=config["model"],
+            temperature=config["temperature"],
+            max_tokens=config["max_tokens"],
+            latency_s=config["latency_s"],
+            tokens_per_s=config["tokens_per_s"],
+            error_rate=config["error_rate"],
+            error_kind=config["error_kind"],
+            seed=config["seed"],
+            max_concurrency=config["max_concurrency"],
+            **LLMFactory._optional_kwargs(config)
         )
     
+    @staticmethod
+    def _embeddings_config(provider: Optional[str], custom_config: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Resolve provider e configuração de embeddings (RAG_EMBEDDINGS_PROVIDER/RAG_EMBEDDINGS_MODEL)"""
+        provider = (provider or os.getenv("RAG_EMBEDDINGS_PROVIDER") or LLMProvider.OPENAI).lower()
+        if provider not in EMBEDDING_REGISTRY:
+            raise ValueError(f"Provider '{provider}' não tem embeddings. "
+                           f"Disponíveis: {list(EMBEDDING_REGISTRY.keys())}")
+        
+        config = LLMConfig.EMBEDDING_CONFIGS[provider].copy()
+        if os.getenv("RAG_EMBEDDINGS_MODEL"):
+            config["model"] = os.getenv("RAG_EMBEDDINGS_MODEL")
+        if custom_config:
+            config.update(custom_config)
+        return provider, config
+    
+    @staticmethod
+    def embeddings_model_id(provider: Optional[str] = None, custom_config: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Identifica o modelo de embeddings como "provider/modelo"
+        
+        Vetores de modelos diferentes não são comparáveis; o índice do RAG guarda este id.
+        """
+        provider, config = LLMFactory._embeddings_config(provider, custom_config)
+        return f"{provider}/{config['model']}"
+    
+    @staticmethod
+    def create_embeddings(provider: Optional[str] = None, custom_config: Optional[Dict[str, Any]] = None):
+        """
+        Cria o modelo de embeddings usado na ingestão e na busca do RAG
+        
+        Args:
+            provider: openai, ollama, huggingface ou fake (padrão: RAG_EMBEDDINGS_PROVIDER ou openai)
+            custom_config: Configurações customizadas (ex: {"model": "text-embedding-3-large"})
+            
+        Returns:
+            Instância de Embeddings do LangChain
+            
+        Raises:
+            ValueError: Se o provider não tiver modelo de embeddings ou faltar a API key
+        """
+        provider, config = LLMFactory._embeddings_config(provider, custom_config)
+        embeddings_class = LLMFactory._import_class(*EMBEDDING_REGISTRY[provider])
+        
+        if provider == LLMProvider.OPENAI:
+            if not os.getenv("OPENAI_API_KEY"):
+                raise ValueError("OPENAI_API_KEY não encontrada no arquivo .env")
+            return embeddings_class(model=config["model"], api_key=os.getenv("OPENAI_API_KEY"))
+        elif provider == LLMProvider.OLLAMA:
+            return embeddings_class(model=config["model"],
+                                    base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"))
+        elif provider == LLMProvider.HUGGINGFACE:
+            return embeddings_class(model_name=config["model"])
+        else:
+            return embeddings_class(model=config["model"], size=config["size"])
+    
+    @staticmethod
+    def get_configured_providers() -> List[str]:
+        """
+        Lista os providers instalados e com API key configurada, na ordem de preferência
+        
+        Returns:
+            Lista de providers; PREFERRED_LLM_PROVIDER vem primeiro, se configurado
+        """
+        provider_info = LLMFactory.get_provider_info()
+        configured = []
+        for provider, is_available in LLMFactory.list_available_providers().items():
+            info = provider_info[provider]
+            if not is_available:
+                continue
+            if info["requires_api_key"] and not os.getenv(info["env_var"].split()[0]):
+                continue
+            configured.append(provider)
+        
+        preferred = os.getenv("PREFERRED_LLM_PROVIDER", "").lower()
+        if preferred in configured:
+            configured.remove(preferred)
+            configured.insert(0, preferred)
+        return configured
+    
+    @staticmethod
+    def create_router(providers: Optional[List[str]] = None, router_config: Optional[Dict[str, Any]] = None,
+                      custom_configs: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Cria um LLM que roteia as chamadas entre vários providers, com fallback automático
+        
+        Args:
+            providers: Providers a usar, em ordem de preferência. Padrão: LLM_FALLBACK_PROVIDERS
+                ou todos os providers instalados e com API key
+            router_config: Sobrescreve LLMConfig.ROUTER_CONFIG (timeout_s, cooldown_s, ...)
+            custom_configs: Configurações customizadas por provider
+            
+        Returns:
+            Instância de RoutingChatModel
+            
+        Raises:
+            ValueError: Se nenhum provider puder ser criado
+        """
+        from llm_router import RoutingChatModel
+        
+        if providers is None:
+            env_providers = os.getenv("LLM_FALLBACK_PROVIDERS", "")
+            providers = [p.strip().lower() for p in env_providers.split(",") if p.strip()]
+            if not providers:
+                providers = LLMFactory.get_configured_providers()
+        
+        routes = []
+        for provider in providers:
+            try:
+                llm = LLMFactory.create_llm(provider, (custom_configs or {}).get(provider))
+                # No roteamento, um 429 deve ir para o próximo provider em vez de esperar o Retry-After
+                if hasattr(llm, "max_throttle_retries"):
+                    llm = llm.model_copy(update={"max_throttle_retries": 0})
+                routes.append((provider, llm))
+            except Exception as e:
+                print(f"⚠️ Provider {provider} ignorado no roteamento: {e}")
+        
+        if not routes:
+            raise ValueError("❌ Nenhum provider disponível para o roteamento automático. "
+                             "Configure ao menos uma API key no arquivo .env")
+        
+        config = LLMConfig.ROUTER_CONFIG.copy()
+        if router_config:
+            config.update(router_config)
+        return RoutingChatModel(routes=routes, **config)
+    
+    @staticmethod
+    def close_llm(llm):
+        """
+        Libera os recursos próprios de um LLM criado pelo factory (ex: pools de threads do roteamento)
+        
+        Args:
+            llm: Instância retornada por create_llm; LLMs sem recursos próprios são ignorados
+        """
+        from llm_router import RoutingChatModel
+        
+        if isinstance(llm, RoutingChatModel):
+            llm.close()
+    
+    @staticmethod
+    def describe_llm(llm) -> Tuple[str, str]:
+        """
+        Identifica provider e modelo de uma instância criada pelo factory
+        
+        Args:
+            llm: Instância retornada por create_llm
+        
+        Returns:
+            Tupla (provider, modelo); usa "desconhecido" quando não for possível identificar
+        """
+        provider = getattr(llm, "llm_provider", None) or "desconhecido"
+        for name, llm_class in _loaded_classes.items():
+            if isinstance(llm, llm_class):
+                provider = name
+                break
+        
+        model = (getattr(llm, "model_name", None) or getattr(llm, "model", None)
+                 or getattr(llm, "repo_id", None) or "desconhecido")
+        return provider, str(model)
+    
     @staticmethod
     def list_available_providers() -> Dict[str, bool]:
         """
@@ -237,13 +671,10 @@ class LLMFactory:
         """
         availability = {}
         
-        # Verificar disponibilidade de cada provider
-        availability[LLMProvider.OPENAI] = ChatOpenAI is not None
-        availability[LLMProvider.ANTHROPIC] = ChatAnthropic is not None
-        availability[LLMProvider.GOOGLE] = ChatGoogleGenerativeAI is not None
-        availability[LLMProvider.GROQ] = ChatGroq is not None
-        availability[LLMProvider.OLLAMA] = ChatOllama is not None
-        availability[LLMProvider.HUGGINGFACE] = HuggingFaceEndpoint is not None
+        # Verificar disponibilidade de cada provider (sem importar os SDKs)
+        for provider in PROVIDER_REGISTRY:
+            if provider not in HIDDEN_PROVIDERS:
+                availability[provider] = LLMFactory.is_provider_installed(provider)
         
         return availability
     
@@ -0,0 +1,315 @@
+"""
+Roteamento automático entre providers de LLM, com fallback e circuit breaker
+
+O RoutingChatModel é um chat model do LangChain que recebe vários LLMs criados pelo
+LLMFactory. Cada chamada vai para o provider saudável com menor latência por token de saída
+(p50 da janela recente), para que respostas curtas (ex: análise do especialista) não façam
+um provider parecer mais rápido que outro que atendeu o gerador; timeouts, 429 e erros de servidor disparam failover para o próximo provider,
+e o provider que falha repetidamente fica em cooldown (circuito aberto).
+
+Cada provider tem o seu pool de threads, limitado: uma chamada que passa do timeout continua
+ocupando a vaga até terminar, e um provider com o pool cheio e vagas presas em chamadas
+abandonadas é pulado, em vez de enfileirar atrás delas. Modelos de completion (ex: HuggingFaceEndpoint) entram no
+roteamento através do CompletionChatAdapter.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from instrumentation import extract_token_usage
+
+# Status HTTP que indicam problema do provider (e não do pedido)
+FAILOVER_STATUS = {401, 403, 408, 409, 429, 500, 502, 503, 504, 529}
+
+class ProviderUnavailableError(RuntimeError):
+    """Nenhum provider conseguiu atender a chamada"""
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """Extrai o status HTTP de exceções dos SDKs (openai, anthropic, groq, httpx...)"""
+    for attr in ("status_code", "status", "http_status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Lê o cabeçalho Retry-After da resposta de erro, em segundos"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+def is_failover_error(error: Exception) -> bool:
+    """Indica se o erro justifica tentar outro provider"""
+    if isinstance(error, (TimeoutError, FutureTimeoutError, ConnectionError)):
+        return True
+
+    status = get_status_code(error)
+    if status is not None:
+        return status in FAILOVER_STATUS or status >= 500
+
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    return any(hint in name for hint in ("timeout", "ratelimit", "connection", "overloaded", "unavailable")) \
+        or "429" in message or "rate limit" in message
+
+class CompletionChatAdapter(BaseChatModel):
+    """Expõe um LLM de completion (texto → texto) como chat model, para o roteamento"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    llm: Any
+    llm_provider: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "completion-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"provider": self.llm_provider, "llm": getattr(self.llm, "_llm_type", "")}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        result = self.llm.generate([get_buffer_string(messages)], stop=stop, **kwargs)
+        generations = [ChatGeneration(message=AIMessage(content=generation.text),
+                                      generation_info=generation.generation_info)
+                       for generation in result.generations[0]]
+        return ChatResult(generations=generations, llm_output=result.llm_output)
+
+def as_chat_model(llm, provider: str = ""):
+    """O próprio LLM se já for um chat model; senão, o LLM de completion dentro do adaptador"""
+    return llm if isinstance(llm, BaseChatModel) else CompletionChatAdapter(llm=llm, llm_provider=provider)
+
+class ProviderHealth:
+    """Janela de latências/erros e estado do circuit breaker de um provider"""
+
+    def __init__(self, window: int = 50):
+        self.latencies = deque(maxlen=window)
+        # Latência dividida pelos tokens de saída, usada para ordenar os providers
+        self.per_token = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.calls = 0
+
+    def percentile(self, pct: float, per_token: bool = False) -> Optional[float]:
+        """Percentil das latências de sucesso recentes, em segundos (ou segundos por token de saída)"""
+        values = self.per_token if per_token else self.latencies
+        if not values:
+            return None
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        """Fração de falhas na janela recente"""
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def is_available(self, now: float) -> bool:
+        """Fechado ou meio-aberto (cooldown já passou)"""
+        return now >= self.open_until
+
+    def record_success(self, latency: float, output_tokens: int = 0):
+        self.calls += 1
+        self.latencies.append(latency)
+        self.per_token.append(latency / max(output_tokens, 1))
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, now: float, failure_threshold: int, cooldown: float,
+                       retry_after: Optional[float] = None):
+        self.calls += 1
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        # 429 com Retry-After abre o circuito imediatamente pelo tempo pedido
+        if retry_after:
+            self.open_until = now + retry_after
+        elif self.consecutive_failures >= failure_threshold:
+            # Backoff exponencial enquanto o provider continuar falhando
+            extra = self.consecutive_failures - failure_threshold
+            self.open_until = now + cooldown * (2 ** min(extra, 5))
+
+class RoutingChatModel(BaseChatModel):
+    """Chat model que distribui as chamadas entre vários providers"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    routes: List[Tuple[str, Any]]
+    llm_provider: str = "router"
+    model_name: str = ""
+    timeout_s: float = 60.0
+    failure_threshold: int = 3
+    cooldown_s: float = 30.0
+    window: int = 50
+    explore_rate: float = 0.05
+    # Chamadas simultâneas por provider, contando as que já passaram do timeout e seguem rodando
+    max_concurrency: int = 16
+
+    _health: Dict[str, ProviderHealth] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _executors: Dict[str, ThreadPoolExecutor] = PrivateAttr(default_factory=dict)
+    _in_flight: Dict[str, int] = PrivateAttr(default_factory=dict)
+    # Chamadas que passaram do timeout e ainda ocupam uma vaga do pool
+    _abandoned: Dict[str, int] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if not self.model_name:
+            self.model_name = "router(" + ",".join(provider for provider, _ in self.routes) + ")"
+        self.routes = [(provider, as_chat_model(llm, provider)) for provider, llm in self.routes]
+        for provider, _ in self.routes:
+            self._health[provider] = ProviderHealth(self.window)
+            self._executors[provider] = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                           thread_name_prefix=f"llm-router-{provider}")
+            self._in_flight[provider] = 0
+            self._abandoned[provider] = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "routing"
+
+    def _ordered_routes(self) -> List[Tuple[str, Any]]:
+        """
+        Ordena os providers: disponíveis primeiro, do mais rápido ao mais lento (latência por
+        token de saída, penalizada pela taxa de erro)
+
+        Providers sem medições mantêm a ordem configurada, depois dos já medidos. Uma pequena
+        fração das chamadas explora outro provider para manter as latências atualizadas.
+        """
+        now = time.monotonic()
+        with self._lock:
+            def score(item):
+                position, (provider, _) = item
+                health = self._health[provider]
+                p50 = health.percentile(50, per_token=True)
+                if p50 is None:
+                    return (1, position)
+                return (0, p50 * (1 + 4 * health.error_rate))
+
+            indexed = list(enumerate(self.routes))
+            available = [item for item in indexed if self._health[item[1][0]].is_available(now)]
+            cooling = [item for item in indexed if not self._health[item[1][0]].is_available(now)]
+            ordered = [route for _, route in sorted(available, key=score)]
+            # Se todos estão em cooldown, tentar mesmo assim o que reabre primeiro
+            cooling.sort(key=lambda item: self._health[item[1][0]].open_until)
+
+        if len(ordered) > 1 and random.random() < self.explore_rate:
+            ordered.insert(0, ordered.pop(random.randrange(1, len(ordered))))
+        return ordered + [route for _, route in cooling]
+
+    def _submit(self, provider: str, llm, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any):
+        """
+        Envia a chamada ao pool do provider
+
+        Returns:
+            Future da chamada, ou None se o pool estiver cheio com chamadas abandonadas
+            (a nova chamada ficaria na fila atrás delas)
+        """
+        with self._lock:
+            if self._in_flight[provider] >= self.max_concurrency and self._abandoned[provider]:
+                return None
+            self._in_flight[provider] += 1
+        future = self._executors[provider].submit(llm.generate, [messages], stop=stop, **kwargs)
+        future.abandoned = False
+        future.add_done_callback(lambda done: self._release(provider, done))
+        return future
+
+    def _abandon(self, provider: str, future):
+        """Marca a chamada que passou do timeout: segue ocupando a vaga até terminar"""
+        # cancel() roda o callback de _release na hora, então fica fora do lock
+        if future.cancel():
+            return
+        with self._lock:
+            if not future.done():
+                future.abandoned = True
+                self._abandoned[provider] += 1
+
+    def _release(self, provider: str, future):
+        with self._lock:
+            self._in_flight[provider] -= 1
+            if future.abandoned:
+                self._abandoned[provider] -= 1
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        errors = []
+        for provider, llm in self._ordered_routes():
+            start = time.monotonic()
+            future = self._submit(provider, llm, messages, stop, **kwargs)
+            if future is None:
+                # Vagas presas em chamadas lentas (ex: que passaram do timeout): não enfileirar atrás delas
+                errors.append(f"{provider}: pool ocupado por chamadas que passaram do timeout")
+                print(f"⚠️ Provider {provider} sem vagas livres; tentando o próximo...")
+                continue
+            try:
+                result = future.result(timeout=self.timeout_s)
+            except Exception as e:
+                if isinstance(e, FutureTimeoutError):
+                    self._abandon(provider, future)
+                    e = TimeoutError(f"{provider} excedeu {self.timeout_s:.0f}s")
+                if not is_failover_error(e):
+                    raise
+                with self._lock:
+                    self._health[provider].record_failure(
+                        time.monotonic(), self.failure_threshold, self.cooldown_s, get_retry_after(e)
+                    )
+                errors.append(f"{provider}: {e}")
+                print(f"⚠️ Provider {provider} falhou ({type(e).__name__}); tentando o próximo...")
+                continue
+
+            # Sem uso informado pelo provider, extract_token_usage estima os tokens pelo texto
+            output_tokens = extract_token_usage(result)[1]
+            with self._lock:
+                self._health[provider].record_success(time.monotonic() - start, output_tokens)
+            llm_output = dict(result.llm_output or {})
+            llm_output["provider"] = provider
+            return ChatResult(generations=result.generations[0], llm_output=llm_output)
+
+        raise ProviderUnavailableError("❌ Todos os providers falharam: " + " | ".join(errors))
+
+    def close(self):
+        """Encerra os pools dos providers; chamadas já em andamento terminam em segundo plano"""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Estado de cada provider
+
+        Returns:
+            Dict com p50/p95 (s), taxa de erro, chamadas e se o circuito está aberto
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                provider: {
+                    "p50_s": health.percentile(50),
+                    "p95_s": health.percentile(95),
+                    "p50_s_per_token": health.percentile(50, per_token=True),
+                    "error_rate": round(health.error_rate, 3),
+                    "calls": health.calls,
+                    "circuit_open": not health.is_available(now),
+                    "in_flight": self._in_flight[provider],
+                    "abandoned": self._abandoned[provider],
+                }
+                for provider, health in self._health.items()
+            }
@@ -0,0 +1,161 @@
+"""
+Journal de progresso (write-ahead) para retomar lotes interrompidos
+
+Cada tarefa concluída é anexada a um arquivo JSONL, com fsync, assim que termina: a análise
+do especialista de cada combinação e o resultado de cada questão, identificada pela linha do
+lote, pela combinação, pelo provider e pelo número da questão na linha. Se o processo cair ou o provider falhar no meio do lote,
+--resume lê o journal, pula as questões já concluídas e reaproveita as análises prontas,
+refazendo só o que ficou pendente ou falhou. Uma linha final truncada (queda durante a
+escrita) é ignorada na leitura.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from specialist_cache import SpecialistCache
+
+DEFAULT_JOURNAL_DIR = os.path.join(".cache", "progresso")
+# Execuções avulsas (uma questão) ficam num subdiretório próprio, uma por combinação, para
+# não se confundirem com o journal de um lote
+SINGLE_RUN_DIR = "avulsas"
+
+def journal_path(name: str) -> str:
+    """Journal padrão de um lote, pelo nome do arquivo de lote"""
+    base = os.path.splitext(os.path.basename(name))[0] or "lote"
+    return os.path.join(DEFAULT_JOURNAL_DIR, f"{base}.jsonl")
+
+def single_run_journal_path(prova: str, tema: str, nivel: str, area: str) -> str:
+    """Journal de uma execução avulsa da combinação"""
+    digest = hashlib.sha256(json.dumps([prova, tema, nivel, area], ensure_ascii=False).encode("utf-8")).hexdigest()
+    return os.path.join(DEFAULT_JOURNAL_DIR, SINGLE_RUN_DIR, f"{digest[:16]}.jsonl")
+
+def item_key(job: Dict[str, Any]) -> str:
+    """Chave de uma questão do lote no journal: linha, combinação, provider e número na linha"""
+    return json.dumps([job.get("linha", 0), job["prova"], job["tema"], job["nivel"], job["area"],
+                       job.get("provider"), job.get("item", 0)], ensure_ascii=False)
+
+class ProgressJournal:
+    """Journal append-only das tarefas concluídas, relido na retomada"""
+
+    def __init__(self, path: str, resume: bool = False):
+        """
+        Args:
+            path: Arquivo JSONL do journal
+            resume: Lê o journal existente para retomar; sem resume, um journal novo
+                substitui o anterior
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Estado recuperado da execução anterior (só com resume)
+        self.analyses: Dict[str, str] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.reused_analyses = 0
+        # Combinações (prova, tema, nivel, area) com análise no journal, desta execução ou da anterior
+        self._analyzed: Set[Tuple[str, ...]] = set()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if resume and os.path.exists(path):
+            for entry in self._read():
+                if entry["tipo"] == "especialista":
+                    self.analyses[entry["chave"]] = entry["analise"]
+                    self._analyzed.add(self._combination(entry))
+                elif entry["tipo"] == "questao":
+                    self.results[entry["chave"]] = entry["registro"]
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _read(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Linha truncada por uma queda durante a escrita
+                    continue
+
+    def _append(self, entry: Dict[str, Any]):
+        """Grava uma entrada e só retorna depois de ela estar em disco"""
+        line = json.dumps({**entry, "ts": round(time.time(), 3)}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    @staticmethod
+    def _combination(entry: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(entry.get(field, "")) for field in ("prova", "tema", "nivel", "area"))
+
+    def record_analysis(self, key: str, analise: str, **combinacao: Any):
+        """Registra a análise do especialista de uma combinação (chave do SpecialistCache)"""
+        self._append({"tipo": "especialista", "chave": key, "analise": analise, **combinacao})
+        with self._lock:
+            self._analyzed.add(self._combination(combinacao))
+
+    def has_analysis(self, prova: str, tema: str, nivel: str, area: str) -> bool:
+        """Indica se há análise do especialista da combinação no journal"""
+        with self._lock:
+            return self._combination({"prova": prova, "tema": tema, "nivel": nivel, "area": area}) in self._analyzed
+
+    def record_result(self, record: Dict[str, Any]):
+        """Registra o resultado (ok ou erro) de uma questão do lote"""
+        self._append({"tipo": "questao", "chave": item_key(record), "registro": record})
+
+    def completed(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Registro da questão se ela já foi concluída com sucesso na execução anterior"""
+        record = self.results.get(item_key(job))
+        return record if record is not None and record.get("status") == "ok" else None
+
+    def pending(self, jobs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Separa os jobs que ainda precisam rodar
+
+        Returns:
+            Tupla (jobs pendentes ou que falharam, quantidade de jobs já concluídos)
+        """
+        pending = [job for job in jobs if self.completed(job) is None]
+        return pending, len(jobs) - len(pending)
+
+    def wrap(self, cache: Optional[SpecialistCache]) -> "JournaledSpecialistCache":
+        """Cache da análise do especialista que também grava e reaproveita as análises do journal"""
+        return JournaledSpecialistCache(self, cache)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class JournaledSpecialistCache:
+    """
+    Interface do SpecialistCache sobre o journal (e o cache real, se houver)
+
+    As análises recuperadas da execução anterior são servidas antes do cache; toda análise nova
+    vai para o journal. Sem cache real, análises da própria execução não são reaproveitadas
+    entre questões, como acontece com SPECIALIST_CACHE=0.
+    """
+
+    def __init__(self, journal: ProgressJournal, cache: Optional[SpecialistCache] = None):
+        self.journal = journal
+        self.cache = cache
+
+    make_key = staticmethod(SpecialistCache.make_key)
+
+    def lock_for(self, key: str):
+        return self.cache.lock_for(key) if self.cache is not None else nullcontext()
+
+    def get(self, key: str) -> Optional[str]:
+        analise = self.journal.analyses.get(key)
+        if analise is not None:
+            with self.journal._lock:
+                self.journal.reused_analyses += 1
+            return analise
+        return self.cache.get(key) if self.cache is not None else None
+
+    def set(self, key: str, analise: str, **metadados: Any):
+        self.journal.record_analysis(key, analise, **{field: metadados.get(field, "")
+                                                      for field in ("prova", "tema", "nivel", "area")})
+        if self.cache is not None:
+            self.cache.set(key, analise, **metadados)
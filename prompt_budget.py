@@ -0,0 +1,155 @@
+"""
+Compactação de prompts e orçamento de tokens do contexto entre tarefas
+
+Os textos dos agentes e das tarefas são escritos como f-strings indentadas; o
+PromptTemplate remove a indentação e as linhas em branco repetidas uma única vez, na
+carga do módulo. A análise do especialista repassada ao gerador é reduzida ao orçamento
+(PROMPT_CONTEXT_BUDGET tokens), mantendo primeiro os tópicos e itens de lista. Os tokens
+são contados com o tokenizer do provider quando disponível (tiktoken para a OpenAI) ou
+estimados pelo tamanho do texto, e a economia fica em prompt_budget_stats().
+"""
+
+import importlib.util
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_CONTEXT_BUDGET = 800
+# Caracteres por token em português, para providers sem tokenizer local
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# (provider, modelo) cujo tokenizer conta os tokens
+Tokenizer = Optional[Tuple[str, str]]
+
+_LIST_ITEM = re.compile(r"^(\d+[.)]|[-*•]|#+)\s|:$")
+
+_encoders: Dict[str, Any] = {}
+_stats = {"trechos": 0, "contextos_reduzidos": 0, "tokens_originais": 0, "tokens_enviados": 0}
+_lock = threading.Lock()
+
+def compact(text: str) -> str:
+    """Remove a indentação de cada linha, espaços no fim e linhas em branco repetidas"""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    result = []
+    for line in lines:
+        if line or (result and result[-1]):
+            result.append(line)
+    return "\n".join(result)
+
+def _encoder(model: str):
+    """Encoder do tiktoken para o modelo (None se o tiktoken não estiver instalado ou não carregar)"""
+    if model not in _encoders:
+        encoder = None
+        if importlib.util.find_spec("tiktoken") is not None:
+            import tiktoken
+            try:
+                try:
+                    encoder = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    # Modelo fora da OpenAI (ex: servido em OPENAI_BASE_URL): vocabulário mais recente
+                    encoder = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                # Sem rede na primeira carga do vocabulário: cai na estimativa
+                encoder = None
+        _encoders[model] = encoder
+    return _encoders[model]
+
+def count_tokens(text: str, tokenizer: Tokenizer = None) -> int:
+    """Tokens do texto no tokenizer do provider/modelo (estimativa por tamanho se não houver)"""
+    if tokenizer is not None and tokenizer[0] == "openai":
+        encoder = _encoder(tokenizer[1])
+        if encoder is not None:
+            return len(encoder.encode(text))
+    return math.ceil(len(text) / DEFAULT_CHARS_PER_TOKEN)
+
+def _record(original: int, sent: int, reduced: bool = False):
+    with _lock:
+        _stats["trechos"] += 1
+        _stats["contextos_reduzidos"] += int(reduced)
+        _stats["tokens_originais"] += original
+        _stats["tokens_enviados"] += sent
+
+class PromptTemplate:
+    """Template de prompt compactado na criação, formatado com str.format"""
+
+    def __init__(self, template: str):
+        self.raw = template
+        self.text = compact(template)
+        self._counts: Dict[Tokenizer, Tuple[int, int]] = {}
+
+    def format(self, tokenizer: Tokenizer = None, record: bool = True, **values: Any) -> str:
+        """
+        Preenche o template e registra a economia da compactação
+
+        A economia é contada só no texto fixo do template (por tokenizer, uma vez); os valores
+        preenchidos são iguais nas duas versões.
+
+        Args:
+            record: False quando o texto não vai ser enviado (ex: só compõe uma chave de cache)
+        """
+        if record:
+            if tokenizer not in self._counts:
+                self._counts[tokenizer] = (count_tokens(self.raw, tokenizer), count_tokens(self.text, tokenizer))
+            _record(*self._counts[tokenizer])
+        return self.text.format(**values) if values else self.text
+
+def context_budget() -> int:
+    """Orçamento de tokens do contexto entre tarefas (PROMPT_CONTEXT_BUDGET; 0 = sem limite)"""
+    return int(os.getenv("PROMPT_CONTEXT_BUDGET", DEFAULT_CONTEXT_BUDGET))
+
+def fit_context(text: str, budget: Optional[int] = None, tokenizer: Tokenizer = None) -> str:
+    """
+    Reduz um contexto (ex: a análise do especialista) ao orçamento de tokens
+
+    O texto é compactado; se ainda passar do orçamento, ficam primeiro os tópicos, títulos e
+    itens de lista e, com o que sobrar, as demais linhas, na ordem original. Se nenhuma linha
+    couber, o texto é cortado no fim de uma palavra.
+
+    Args:
+        budget: Máximo de tokens (padrão: context_budget(); 0 = sem limite)
+        tokenizer: (provider, modelo) para contar os tokens
+
+    Returns:
+        Contexto dentro do orçamento
+    """
+    budget = context_budget() if budget is None else budget
+    original = count_tokens(text, tokenizer)
+    result = compact(text)
+    truncated = bool(budget) and count_tokens(result, tokenizer) > budget
+    if truncated:
+        lines = result.splitlines()
+        costs = [count_tokens(line, tokenizer) + 1 for line in lines]
+        keep = set()
+        remaining = budget
+        for priority in (True, False):
+            for index, line in enumerate(lines):
+                if index not in keep and line and bool(_LIST_ITEM.search(line)) == priority and costs[index] <= remaining:
+                    keep.add(index)
+                    remaining -= costs[index]
+        if keep:
+            result = "\n".join(line for index, line in enumerate(lines) if index in keep)
+        else:
+            # Nem a primeira linha cabe: corta no limite de caracteres equivalente
+            cut = result[:int(budget * DEFAULT_CHARS_PER_TOKEN)]
+            result = cut.rsplit(" ", 1)[0] + "…"
+    sent = count_tokens(result, tokenizer)
+    _record(original, sent, reduced=truncated)
+    return result
+
+def print_prompt_savings():
+    """Imprime os tokens de entrada economizados na execução (nada, se nenhum prompt foi montado)"""
+    stats = prompt_budget_stats()
+    if stats["trechos"]:
+        print(f"✂️ Prompts: {stats['economia']} tokens de entrada economizados ({stats['economia_pct']}%), "
+              f"{stats['contextos_reduzidos']} análises reduzidas ao orçamento")
+
+def prompt_budget_stats() -> Dict[str, Any]:
+    """Tokens de entrada antes e depois da compactação/orçamento, desde o início do processo"""
+    with _lock:
+        stats = dict(_stats)
+    stats["economia"] = stats["tokens_originais"] - stats["tokens_enviados"]
+    stats["economia_pct"] = round(100 * stats["economia"] / stats["tokens_originais"], 1) \
+        if stats["tokens_originais"] else 0.0
+    return stats
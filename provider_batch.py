@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""
+Geração em massa pelas APIs de lote dos providers (OpenAI Batch e Anthropic Message Batches)
+
+Para encher o banco de uma prova nova sem latência interativa: os prompts do motor direto
+(agents.py) são empacotados em lotes do provider, que custam metade do preço e não
+disputam os limites de taxa das chamadas síncronas. O job tem duas etapas dependentes:
+um lote com a análise do especialista de cada combinação e, com as análises prontas, lotes
+do gerador (QUESTIONS_PER_CALL questões por pedido). As questões inválidas ou duplicadas
+voltam num novo lote do gerador, até MAX_GENERATOR_RETRIES vezes.
+
+O estado do job (lotes enviados, análises e questões aceitas) é gravado num arquivo JSON a
+cada passo. Após uma queda, --resume retoma do ponto em que parou: lotes já enviados são
+consultados de novo em vez de reenviados.
+
+Uso:
+    python provider_batch.py --batch exemplos/lote.csv --provider openai --state .cache/lote.json
+    python provider_batch.py --resume .cache/lote.json
+    python provider_batch.py --batch exemplos/lote.csv --provider anthropic --standin   # sem rede
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from agents import (MAX_GENERATOR_RETRIES, build_agents, direct_messages, generator_description,
+                    questions_per_call, specialist_prompt, syllabus_context)
+from batch import expand_jobs, group_jobs, load_batch_spec
+from instrumentation import estimate_cost
+from llm_config import LLMFactory, LLMProvider
+from question_bank import QuestionBank
+from question_dedup import QuestionDedupIndex
+from question_model import Questao, parse_questions
+from specialist_cache import SpecialistCache
+
+BATCH_PROVIDERS = (LLMProvider.OPENAI, LLMProvider.ANTHROPIC)
+
+DEFAULT_STATE_PATH = ".cache/lote_provider.json"
+DEFAULT_POLL_INTERVAL = 60.0
+# Desconto das APIs de lote sobre o preço das chamadas síncronas
+BATCH_DISCOUNT = 0.5
+
+STATE_VERSION = 1
+
+class BatchBackend:
+    """Cliente HTTP da API de lote de um provider"""
+
+    def __init__(self, model: str, temperature: float, max_tokens: int, base_url: str, headers: Dict[str, str],
+                 timeout: float = 120.0):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.client = httpx.Client(base_url=base_url, headers=headers, timeout=timeout)
+
+    def submit(self, pedidos: List[Dict[str, str]]) -> str:
+        """
+        Envia um lote de pedidos {"custom_id", "system", "user"}
+
+        Returns:
+            Id do lote no provider
+        """
+        raise NotImplementedError
+
+    def poll(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Consulta um lote
+
+        Returns:
+            Dict com 'status' ("andamento", "concluido" ou "falhou"), 'progresso' (texto) e
+            'info' (resposta do provider)
+        """
+        raise NotImplementedError
+
+    def results(self, info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Baixa os resultados de um lote concluído
+
+        Returns:
+            Dict custom_id → {"texto", "prompt_tokens", "completion_tokens"} ou {"erro"}
+        """
+        raise NotImplementedError
+
+    def close(self):
+        self.client.close()
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API: arquivo JSONL em /files e lote em /batches sobre /v1/chat/completions"""
+
+    ENDPOINT = "/v1/chat/completions"
+
+    def submit(self, pedidos: List[Dict[str, str]]) -> str:
+        lines = []
+        for pedido in pedidos:
+            lines.append(json.dumps({
+                "custom_id": pedido["custom_id"], "method": "POST", "url": self.ENDPOINT,
+                "body": {"model": self.model, "temperature": self.temperature, "max_tokens": self.max_tokens,
+                         "messages": [{"role": "system", "content": pedido["system"]},
+                                      {"role": "user", "content": pedido["user"]}]},
+            }, ensure_ascii=False))
+        content = ("\n".join(lines) + "\n").encode("utf-8")
+
+        response = self.client.post("/files", data={"purpose": "batch"},
+                                    files={"file": ("lote.jsonl", content, "application/jsonl")})
+        response.raise_for_status()
+        response = self.client.post("/batches", json={"input_file_id": response.json()["id"],
+                                                      "endpoint": self.ENDPOINT, "completion_window": "24h"})
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def poll(self, batch_id: str) -> Dict[str, Any]:
+        response = self.client.get(f"/batches/{batch_id}")
+        response.raise_for_status()
+        info = response.json()
+        # Um lote expirado ainda entrega os pedidos concluídos; os demais voltam na próxima rodada
+        if info["status"] in ("completed", "expired"):
+            status = "concluido"
+        elif info["status"] in ("failed", "cancelled", "cancelling"):
+            status = "falhou"
+        else:
+            status = "andamento"
+        counts = info.get("request_counts") or {}
+        progresso = f"{info['status']}, {counts.get('completed', 0)}/{counts.get('total', '?')}"
+        return {"status": status, "progresso": progresso, "info": info}
+
+    def results(self, info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for file_id in (info.get("output_file_id"), info.get("error_file_id")):
+            if not file_id:
+                continue
+            response = self.client.get(f"/files/{file_id}/content")
+            response.raise_for_status()
+            for line in response.text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                answer = item.get("response") or {}
+                body = answer.get("body") or {}
+                if answer.get("status_code") == 200:
+                    usage = body.get("usage") or {}
+                    results[item["custom_id"]] = {"texto": body["choices"][0]["message"]["content"] or "",
+                                                  "prompt_tokens": usage.get("prompt_tokens", 0),
+                                                  "completion_tokens": usage.get("completion_tokens", 0)}
+                else:
+                    error = item.get("error") or body.get("error") or {}
+                    results[item["custom_id"]] = {"erro": error.get("message") or f"status {answer.get('status_code')}"}
+        return results
+
+class AnthropicBatchBackend(BatchBackend):
+    """Anthropic Message Batches API (/v1/messages/batches)"""
+
+    def submit(self, pedidos: List[Dict[str, str]]) -> str:
+        requests = [{
+            "custom_id": pedido["custom_id"],
+            "params": {"model": self.model, "max_tokens": self.max_tokens, "temperature": self.temperature,
+                       "system": pedido["system"], "messages": [{"role": "user", "content": pedido["user"]}]},
+        } for pedido in pedidos]
+        response = self.client.post("/v1/messages/batches", json={"requests": requests})
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def poll(self, batch_id: str) -> Dict[str, Any]:
+        response = self.client.get(f"/v1/messages/batches/{batch_id}")
+        response.raise_for_status()
+        info = response.json()
+        counts = info.get("request_counts") or {}
+        progresso = (f"{info['processing_status']}, {counts.get('processing', 0)} em processamento, "
+                     f"{counts.get('succeeded', 0)} concluídos")
+        # Lotes cancelados também terminam como "ended", com os pedidos pendentes como erro
+        status = "concluido" if info["processing_status"] == "ended" else "andamento"
+        return {"status": status, "progresso": progresso, "info": info}
+
+    def results(self, info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        if not info.get("results_url"):
+            return {}
+        response = self.client.get(info["results_url"])
+        response.raise_for_status()
+        results = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            result = item["result"]
+            if result["type"] == "succeeded":
+                message = result["message"]
+                usage = message.get("usage") or {}
+                results[item["custom_id"]] = {
+                    "texto": "".join(block.get("text", "") for block in message["content"] if block["type"] == "text"),
+                    "prompt_tokens": usage.get("input_tokens", 0),
+                    "completion_tokens": usage.get("output_tokens", 0),
+                }
+            else:
+                error = (result.get("error") or {}).get("error") or {}
+                results[item["custom_id"]] = {"erro": error.get("message") or result["type"]}
+        return results
+
+def create_backend(provider: str) -> BatchBackend:
+    """
+    Cria o cliente da API de lote do provider, com o modelo e os parâmetros do LLMFactory
+
+    Raises:
+        ValueError: Se o provider não tiver API de lote ou a API key não estiver configurada
+    """
+    if provider not in BATCH_PROVIDERS:
+        raise ValueError(f"Provider '{provider}' não tem API de lote. Opções: {', '.join(BATCH_PROVIDERS)}")
+    config = LLMFactory.resolve_config(provider)
+
+    if provider == LLMProvider.OPENAI:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("❌ OPENAI_API_KEY não encontrada! Configure a chave da OpenAI no arquivo .env")
+        base_url = config.get("base_url") or os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+        return OpenAIBatchBackend(config["model"], config["temperature"], config["max_tokens"], base_url,
+                                  {"Authorization": f"Bearer {api_key}"})
+
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise ValueError("❌ ANTHROPIC_API_KEY não encontrada! Configure a chave da Anthropic no arquivo .env")
+    base_url = os.getenv("ANTHROPIC_BASE_URL") or "https://api.anthropic.com"
+    return AnthropicBatchBackend(config["model"], config["temperature"], config["max_tokens"], base_url,
+                                 {"x-api-key": api_key, "anthropic-version": "2023-06-01"})
+
+class ProviderBatchJob:
+    """Job de geração em massa pelas APIs de lote, com estado em arquivo e retomável"""
+
+    def __init__(self, state_path: str, state: Dict[str, Any], backend: Optional[BatchBackend] = None):
+        self.state_path = state_path
+        self.state = state
+        self.backend = backend or create_backend(state["provider"])
+
+    @classmethod
+    def create(cls, spec_path: str, provider: str, state_path: str = DEFAULT_STATE_PATH,
+               per_call: Optional[int] = None) -> "ProviderBatchJob":
+        """
+        Cria o job a partir de um arquivo de lote (o mesmo formato do index.py --batch)
+
+        A coluna provider do arquivo é ignorada: o job inteiro vai para a API de lote de `provider`.
+
+        Raises:
+            FileExistsError: Se já houver um job não finalizado em state_path (use --resume)
+        """
+        if os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as f:
+                if not json.load(f).get("finalizado"):
+                    raise FileExistsError(f"Já existe um job em andamento em {state_path}; use --resume")
+
+        backend = create_backend(provider)
+        jobs = expand_jobs(load_batch_spec(spec_path), provider)
+        combinacoes: Dict[str, Dict[str, Any]] = {}
+        ids: Dict[tuple, str] = {}
+        grupos = []
+        for job in jobs:
+            job["provider"] = provider
+        for numero, grupo in enumerate(group_jobs(jobs, questions_per_call(per_call))):
+            first = grupo[0]
+            key = (first["prova"], first["tema"], first["nivel"], first["area"])
+            if key not in ids:
+                ids[key] = f"c{len(ids):04d}"
+                combinacoes[ids[key]] = {"prova": key[0], "tema": key[1], "nivel": key[2], "area": key[3],
+                                         "analise": None, "erro": None, "prompt_tokens": 0, "completion_tokens": 0}
+            grupos.append({"id": f"g{numero:04d}", "combinacao": ids[key], "jobs": [job["indice"] for job in grupo],
+                           "questoes": [], "evitar": [], "correcao": None, "problemas": [],
+                           "prompt_tokens": 0, "completion_tokens": 0})
+
+        state = {
+            "versao": STATE_VERSION, "id": uuid.uuid4().hex, "provider": provider, "modelo": backend.model, "arquivo": spec_path,
+            "criado_em": time.time(), "jobs": jobs, "combinacoes": combinacoes, "grupos": grupos,
+            "lotes": [], "finalizado": False,
+        }
+        job = cls(state_path, state, backend)
+        job.save()
+        return job
+
+    @classmethod
+    def load(cls, state_path: str) -> "ProviderBatchJob":
+        """Carrega um job gravado, para retomar"""
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("versao") != STATE_VERSION:
+            raise ValueError(f"Versão do estado do job não suportada: {state.get('versao')}")
+        return cls(state_path, state)
+
+    def save(self):
+        """Grava o estado de forma atômica (arquivo temporário + rename)"""
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        temporary = f"{self.state_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.state_path)
+
+    def _agents(self, combinacao: Dict[str, Any]) -> Dict[str, Any]:
+        # Os agentes do motor direto só fornecem os textos; quem executa é a API de lote
+        return build_agents(None, combinacao["prova"], combinacao["tema"], combinacao["nivel"], combinacao["area"],
+                            verbose=False, engine="direct")
+
+    def _pedido(self, custom_id: str, agente, description: str) -> Dict[str, str]:
+        system, user = direct_messages(agente, description)
+        return {"custom_id": custom_id, "system": system.content, "user": user.content}
+
+    def _wait(self, lote: Dict[str, Any], poll_interval: float) -> Dict[str, Any]:
+        """Consulta o lote até ele terminar"""
+        last = None
+        while True:
+            status = self.backend.poll(lote["id"])
+            if status["progresso"] != last:
+                print(f"⏳ Lote {lote['etapa']} {lote['rodada'] + 1} ({lote['id']}): {status['progresso']}")
+                last = status["progresso"]
+            if status["status"] != "andamento":
+                if status["status"] == "falhou":
+                    print(f"⚠️ Lote {lote['id']} falhou; os pedidos voltam na próxima rodada")
+                return status["info"]
+            time.sleep(poll_interval)
+
+    def _stage(self, etapa: str, rodada: int, build: Callable[[], List[Dict[str, str]]],
+               apply: Callable[[Dict[str, Dict[str, Any]], bool], None], poll_interval: float):
+        """
+        Executa uma rodada de uma etapa: envia o lote (se ainda não enviado), espera e aplica
+
+        Os resultados são aplicados com o estado marcado como "aplicando": se o processo cair
+        no meio, a retomada sabe que parte deles pode já ter entrado no índice de duplicatas.
+        """
+        lote = next((item for item in self.state["lotes"] if item["etapa"] == etapa and item["rodada"] == rodada), None)
+        if lote is None:
+            pedidos = build()
+            if not pedidos:
+                return
+            lote = {"etapa": etapa, "rodada": rodada, "id": self.backend.submit(pedidos), "status": "enviado",
+                    "pedidos": len(pedidos), "enviado_em": time.time()}
+            self.state["lotes"].append(lote)
+            self.save()
+            print(f"📤 Lote {etapa} {rodada + 1} enviado: {lote['id']} ({len(pedidos)} pedidos)")
+        if lote["status"] == "aplicado":
+            return
+
+        retomando = lote["status"] == "aplicando"
+        results = self.backend.results(self._wait(lote, poll_interval))
+        lote["status"] = "aplicando"
+        self.save()
+        apply(results, retomando)
+        lote["status"] = "aplicado"
+        lote["concluido_em"] = time.time()
+        self.save()
+
+    def _specialist_round(self, rodada: int, cache: Optional[SpecialistCache], poll_interval: float):
+        combinacoes = self.state["combinacoes"]
+        provider, model = self.state["provider"], self.state["modelo"]
+        keys = {}
+        for cid, combinacao in combinacoes.items():
+            prompt = specialist_prompt(combinacao["tema"], combinacao["nivel"], combinacao["area"],
+                                       syllabus_context(combinacao["prova"], combinacao["tema"]), record=False)
+            keys[cid] = cache.make_key(combinacao["prova"], combinacao["tema"], combinacao["nivel"], combinacao["area"],
+                                       provider, model, "\n".join(prompt.values())) if cache is not None else None
+            if combinacao["analise"] is None and cache is not None:
+                combinacao["analise"] = cache.get(keys[cid])
+
+        def build() -> List[Dict[str, str]]:
+            pedidos = []
+            for cid, combinacao in combinacoes.items():
+                if combinacao["analise"] is None:
+                    description = specialist_prompt(combinacao["tema"], combinacao["nivel"], combinacao["area"],
+                                                    syllabus_context(combinacao["prova"], combinacao["tema"]),
+                                                    (provider, model))["description"]
+                    pedidos.append(self._pedido(f"esp-{cid}", self._agents(combinacao)["especialista"], description))
+            return pedidos
+
+        def apply(results: Dict[str, Dict[str, Any]], retomando: bool):
+            for cid, combinacao in combinacoes.items():
+                result = results.get(f"esp-{cid}")
+                if combinacao["analise"] is not None or result is None:
+                    continue
+                if "erro" in result:
+                    combinacao["erro"] = result["erro"]
+                    continue
+                combinacao["analise"] = result["texto"]
+                combinacao["erro"] = None
+                combinacao["prompt_tokens"] += result["prompt_tokens"]
+                combinacao["completion_tokens"] += result["completion_tokens"]
+                if cache is not None:
+                    cache.set(keys[cid], result["texto"], prova=combinacao["prova"], tema=combinacao["tema"],
+                              nivel=combinacao["nivel"], area=combinacao["area"], provider=provider, model=model)
+
+        self._stage("especialista", rodada, build, apply, poll_interval)
+
+    def _generator_round(self, rodada: int, dedup: Optional[QuestionDedupIndex], poll_interval: float):
+        combinacoes = self.state["combinacoes"]
+        tokenizer = (self.state["provider"], self.state["modelo"])
+
+        def pending() -> List[Dict[str, Any]]:
+            return [grupo for grupo in self.state["grupos"]
+                    if len(grupo["questoes"]) < len(grupo["jobs"]) and combinacoes[grupo["combinacao"]]["analise"]]
+
+        def build() -> List[Dict[str, str]]:
+            pedidos = []
+            for grupo in pending():
+                combinacao = combinacoes[grupo["combinacao"]]
+                description = generator_description(combinacao["analise"], grupo["evitar"], grupo["correcao"],
+                                                    tokenizer=tokenizer,
+                                                    quantidade=len(grupo["jobs"]) - len(grupo["questoes"]))
+                pedidos.append(self._pedido(f"ger-{grupo['id']}", self._agents(combinacao)["gerador"], description))
+            return pedidos
+
+        def apply(results: Dict[str, Dict[str, Any]], retomando: bool):
+            for grupo in pending():
+                result = results.get(f"ger-{grupo['id']}")
+                if result is None:
+                    continue
+                if "erro" in result:
+                    grupo["problemas"] = [result["erro"]]
+                    continue
+                grupo["prompt_tokens"] += result["prompt_tokens"]
+                grupo["completion_tokens"] += result["completion_tokens"]
+                self._accept(grupo, result["texto"], dedup, retomando)
+
+        self._stage("gerador", rodada, build, apply, poll_interval)
+
+    def _accept(self, grupo: Dict[str, Any], texto: str, dedup: Optional[QuestionDedupIndex], retomando: bool):
+        """Valida as questões de uma resposta do gerador e guarda as aceitas no grupo"""
+        combinacao = self.state["combinacoes"][grupo["combinacao"]]
+        faltam = len(grupo["jobs"]) - len(grupo["questoes"])
+        validas, problems = parse_questions(texto, prova=combinacao["prova"], tema=combinacao["tema"],
+                                            nivel=combinacao["nivel"], area=combinacao["area"])
+        if len(validas) + len(problems) < faltam:
+            problems.append(f"{len(validas) + len(problems)} questões de {faltam} pedidas")
+
+        for questao in validas[:faltam]:
+            if questao.enunciado in grupo["evitar"]:
+                problems.append(f"enunciado repetido: '{questao.enunciado[:80]}'")
+                continue
+            duplicada = dedup.check_and_add(questao.enunciado, list(questao.alternativas.values()),
+                                            combinacao["prova"], combinacao["tema"]) if dedup is not None else None
+            # Na retomada, a própria questão pode já ter entrado no índice antes da queda
+            if duplicada is not None and not (retomando and duplicada["enunciado"] == questao.enunciado):
+                problems.append(f"questão duplicada de '{duplicada['enunciado'][:80]}'")
+                if duplicada["enunciado"] not in grupo["evitar"]:
+                    grupo["evitar"].append(duplicada["enunciado"])
+                continue
+            grupo["questoes"].append({"questao": questao.model_dump(), "gravada": False})
+            grupo["evitar"].append(questao.enunciado)
+
+        grupo["problemas"] = problems
+        grupo["correcao"] = "; ".join(problems) or None
+
+    def run(self, poll_interval: float = DEFAULT_POLL_INTERVAL, cache: Optional[SpecialistCache] = None,
+            dedup: Optional[QuestionDedupIndex] = None) -> Dict[str, Any]:
+        """
+        Executa (ou retoma) as etapas do job até o fim
+
+        Returns:
+            Dict com as contagens de questões 'ok' e com 'erro'
+        """
+        for rodada in range(MAX_GENERATOR_RETRIES + 1):
+            self._specialist_round(rodada, cache, poll_interval)
+            if all(combinacao["analise"] for combinacao in self.state["combinacoes"].values()):
+                break
+        for rodada in range(MAX_GENERATOR_RETRIES + 1):
+            self._generator_round(rodada, dedup, poll_interval)
+        self.state["finalizado"] = True
+        self.save()
+        return self.summary()
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Registros de resultado por questão pedida, no formato do index.py --batch"""
+        jobs = {job["indice"]: job for job in self.state["jobs"]}
+        records = []
+        for grupo in self.state["grupos"]:
+            combinacao = self.state["combinacoes"][grupo["combinacao"]]
+            for posicao, indice in enumerate(grupo["jobs"]):
+                record = dict(jobs[indice])
+                if posicao < len(grupo["questoes"]):
+                    questao = Questao(**grupo["questoes"][posicao]["questao"])
+                    record["status"] = "ok"
+                    record["questao"] = questao.model_dump(include={"enunciado", "alternativas", "resposta_correta",
+                                                                    "justificativa"})
+                    record["resultado"] = str(questao)
+                else:
+                    record["status"] = "erro"
+                    motivo = combinacao["erro"] if not combinacao["analise"] else "; ".join(grupo["problemas"])
+                    record["erro"] = f"Questão não gerada: {motivo or 'novas tentativas esgotadas'}"
+                records.append(record)
+        return sorted(records, key=lambda record: record["indice"])
+
+    def store(self, bank: QuestionBank):
+        """
+        Guarda no banco as questões aceitas ainda não gravadas, com tokens e custo divididos no grupo
+
+        Cada questão vai com a chave job + grupo + posição: se o processo cair entre a gravação
+        no banco e o estado do job, a retomada grava de novo e o banco ignora as repetidas.
+        """
+        provider, model = self.state["provider"], self.state["modelo"]
+        # Jobs criados antes do campo id são identificados pelo instante de criação
+        job_id = self.state.get("id") or f"{self.state['criado_em']:.6f}"
+        for grupo in self.state["grupos"]:
+            if not grupo["questoes"]:
+                continue
+            share = len(grupo["questoes"])
+            prompt_tokens, completion_tokens = grupo["prompt_tokens"] // share, grupo["completion_tokens"] // share
+            cost = estimate_cost(provider, model, prompt_tokens, completion_tokens)
+            for posicao, item in enumerate(grupo["questoes"]):
+                if item["gravada"]:
+                    continue
+                # Estoque para o atendimento pelo banco: ainda não foi entregue a ninguém
+                bank.add(Questao(**item["questao"]), servida=False, chave=f"lote:{job_id}:{grupo['id']}:{posicao}",
+                         provider=provider, modelo=model,
+                         prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                         custo_usd=cost * BATCH_DISCOUNT if cost is not None else None)
+                item["gravada"] = True
+        bank.flush()
+        self.save()
+
+    def summary(self) -> Dict[str, Any]:
+        """Questões ok/erro, lotes enviados, tokens e custo estimado (com o desconto de lote)"""
+        records = self.records()
+        etapas = list(self.state["combinacoes"].values()) + self.state["grupos"]
+        prompt_tokens = sum(item["prompt_tokens"] for item in etapas)
+        completion_tokens = sum(item["completion_tokens"] for item in etapas)
+        cost = estimate_cost(self.state["provider"], self.state["modelo"], prompt_tokens, completion_tokens)
+        return {
+            "ok": sum(record["status"] == "ok" for record in records),
+            "erro": sum(record["status"] == "erro" for record in records),
+            "lotes": len(self.state["lotes"]),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "custo_usd": round(cost * BATCH_DISCOUNT, 6) if cost is not None else None,
+        }
+
+def start_standin(batch_delay_s: float = 0.5):
+    """
+    Sobe em segundo plano o provider fake com as APIs de lote e aponta OPENAI_BASE_URL e
+    ANTHROPIC_BASE_URL para ele
+
+    Returns:
+        Servidor em execução
+    """
+    from fake_llm import FakeChatModel, serve_openai_compatible
+    from llm_config import LLMConfig
+
+    config = LLMConfig.DEFAULT_CONFIGS[LLMProvider.FAKE]
+    model = FakeChatModel(model_name=config["model"], temperature=config["temperature"], latency_s=config["latency_s"],
+                          tokens_per_s=config["tokens_per_s"], error_rate=config["error_rate"],
+                          error_kind=config["error_kind"], seed=config["seed"])
+    server = serve_openai_compatible(model, port=0, batch_delay_s=batch_delay_s)
+    threading.Thread(target=server.serve_forever, name="servidor-standin", daemon=True).start()
+    origin = f"http://127.0.0.1:{server.server_port}"
+    os.environ["OPENAI_BASE_URL"] = f"{origin}/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = origin
+    os.environ.setdefault("OPENAI_API_KEY", "local")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "local")
+    print(f"🧪 APIs de lote locais em {origin}")
+    return server
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Geração em massa pelas APIs de lote da OpenAI e da Anthropic")
+    parser.add_argument("--batch", metavar="ARQUIVO", help="Arquivo de lote (CSV/JSON/YAML), como no index.py --batch")
+    parser.add_argument("--provider", choices=BATCH_PROVIDERS, help="Provider do job (padrão: openai)")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH,
+                        help=f"Arquivo de estado do job (padrão: {DEFAULT_STATE_PATH})")
+    parser.add_argument("--resume", metavar="ESTADO", help="Retoma o job gravado neste arquivo de estado")
+    parser.add_argument("--questions-per-call", type=int,
+                        help="Questões por pedido ao gerador (padrão: QUESTIONS_PER_CALL ou 1)")
+    parser.add_argument("--poll-interval", type=float,
+                        default=float(os.getenv("PROVIDER_BATCH_POLL_INTERVAL", DEFAULT_POLL_INTERVAL)),
+                        help=f"Segundos entre consultas aos lotes (padrão: {DEFAULT_POLL_INTERVAL:.0f})")
+    parser.add_argument("--output", metavar="ARQUIVO", help="Arquivo JSONL onde gravar os resultados")
+    parser.add_argument("--standin", action="store_true",
+                        help="Usa APIs de lote locais (provider fake), para testes sem rede nem custo")
+    args = parser.parse_args()
+    if not args.batch and not args.resume:
+        parser.error("informe --batch ARQUIVO ou --resume ESTADO")
+
+    if args.standin:
+        start_standin()
+        args.poll_interval = min(args.poll_interval, 0.5)
+
+    try:
+        if args.resume:
+            job = ProviderBatchJob.load(args.resume)
+            print(f"🔁 Retomando job de {job.state['arquivo']} ({job.state['provider']}, "
+                  f"{len(job.state['lotes'])} lotes já enviados)")
+        else:
+            job = ProviderBatchJob.create(args.batch, args.provider or LLMProvider.OPENAI, args.state,
+                                          args.questions_per_call)
+            print(f"📦 Job com {len(job.state['jobs'])} questões ({len(job.state['combinacoes'])} combinações, "
+                  f"{len(job.state['grupos'])} pedidos ao gerador) em {job.state_path}")
+    except (ValueError, FileExistsError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        exit(1)
+
+    cache, dedup, bank = SpecialistCache.from_env(), QuestionDedupIndex.from_env(), QuestionBank.from_env()
+    try:
+        summary = job.run(args.poll_interval, cache=cache, dedup=dedup)
+        if bank is not None:
+            job.store(bank)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in job.records())
+    except httpx.HTTPError as e:
+        print(f"❌ Erro na API de lote: {e}")
+        print(f"💡 O progresso está salvo; retome com: python provider_batch.py --resume {job.state_path}")
+        exit(1)
+    finally:
+        job.backend.close()
+        for resource in (cache, dedup, bank):
+            if resource is not None:
+                resource.close()
+
+    print("=" * 60)
+    print(f"🏁 Job finalizado: {summary['ok']} ok, {summary['erro']} com erro, {summary['lotes']} lotes")
+    custo = f"US$ {summary['custo_usd']:.4f}" if summary["custo_usd"] is not None else "sem preço cadastrado"
+    print(f"💰 Tokens: {summary['prompt_tokens']} entrada, {summary['completion_tokens']} saída | custo estimado "
+          f"com desconto de lote: {custo}")
+    if bank is not None:
+        print(f"🗄️ Questões guardadas em {bank.path}")
+    if args.output:
+        print(f"📝 Resultados em {args.output}")
+
+if __name__ == "__main__":
+    main()
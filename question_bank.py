@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Banco de questões geradas (SQLite)
+
+Cada questão aceita é guardada com seus metadados (prova, tema, nível, área, provider,
+modelo, tokens, custo e latência). As gravações vão para uma fila atendida por uma única
+thread, que as agrupa em transações: geradores concorrentes nunca disputam o lock de
+escrita do SQLite. Consultas usam o índice (prova, tema, nivel) e a busca textual nos
+enunciados usa FTS5. A exportação para CSV/Parquet percorre o cursor em blocos, sem
+carregar o banco inteiro em memória.
+
+O banco também atende pedidos (take): entrega a questão da combinação nunca servida, ou a
+servida há mais tempo, e registra a demanda de cada combinação para o reabastecimento.
+
+Uso:
+    python question_bank.py --stats
+    python question_bank.py --search "debêntures incentivadas" --prova CPA-20
+    python question_bank.py --export questoes.parquet --prova CPA-20
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from question_model import Questao
+
+DEFAULT_BANK_PATH = os.path.join(".cache", "questoes.sqlite")
+# Questões gravadas por transação e espera máxima para completar um lote
+WRITE_BATCH_SIZE = 200
+WRITE_BATCH_SECONDS = 0.5
+# Linhas lidas do cursor por vez na exportação
+EXPORT_CHUNK_ROWS = 5000
+# Uma questão já servida volta a ser elegível depois deste intervalo
+DEFAULT_REUSE_AFTER_SECONDS = 7 * 24 * 3600
+
+METADATA_FIELDS = ("provider", "modelo", "prompt_tokens", "completion_tokens", "custo_usd", "latencia_s")
+EXPORT_COLUMNS = ("id", "prova", "tema", "nivel", "area", "enunciado", "alternativa_a", "alternativa_b",
+                  "alternativa_c", "alternativa_d", "resposta_correta", "justificativa") + METADATA_FIELDS + ("criado_em",)
+
+_STOP = object()
+
+def _row_to_export(row: Tuple) -> Tuple:
+    """Expande o JSON das alternativas em colunas A-D"""
+    alternativas = json.loads(row[6])
+    return row[:6] + tuple(alternativas.get(letter, "") for letter in "ABCD") + row[7:]
+
+class QuestionBank:
+    """Banco persistente de questões, com gravação em lote por uma thread dedicada"""
+
+    def __init__(self, path: str = DEFAULT_BANK_PATH, batch_size: int = WRITE_BATCH_SIZE,
+                 batch_seconds: float = WRITE_BATCH_SECONDS,
+                 reuse_after_seconds: float = DEFAULT_REUSE_AFTER_SECONDS):
+        """
+        Args:
+            path: Arquivo SQLite do banco
+            batch_size: Máximo de questões gravadas numa mesma transação
+            batch_seconds: Espera máxima por mais questões antes de gravar o lote
+            reuse_after_seconds: Tempo até uma questão servida poder ser servida de novo
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.reuse_after_seconds = reuse_after_seconds
+        self.written = 0
+        self.write_errors = 0
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._create_schema()
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="banco-questoes", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def from_env(cls) -> Optional["QuestionBank"]:
+        """
+        Cria o banco a partir das variáveis de ambiente
+
+        QUESTION_BANK=0 desativa o banco. QUESTION_BANK_PATH define o arquivo e
+        QUESTION_BANK_REUSE_AFTER (segundos) quando uma questão servida volta a ser elegível.
+
+        Returns:
+            Instância do banco, ou None se estiver desativado
+        """
+        if os.getenv("QUESTION_BANK", "1").lower() in ("0", "false", "no", "nao", "não"):
+            return None
+        return cls(
+            path=os.getenv("QUESTION_BANK_PATH", DEFAULT_BANK_PATH),
+            reuse_after_seconds=float(os.getenv("QUESTION_BANK_REUSE_AFTER", DEFAULT_REUSE_AFTER_SECONDS)),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _create_schema(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS questoes (
+                id INTEGER PRIMARY KEY,
+                prova TEXT NOT NULL,
+                tema TEXT NOT NULL,
+                nivel TEXT NOT NULL,
+                area TEXT,
+                enunciado TEXT NOT NULL,
+                alternativas TEXT NOT NULL,
+                resposta_correta TEXT NOT NULL,
+                justificativa TEXT,
+                provider TEXT,
+                modelo TEXT,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                custo_usd REAL,
+                latencia_s REAL,
+                criado_em REAL NOT NULL,
+                servida_em REAL,
+                vezes_servida INTEGER NOT NULL DEFAULT 0,
+                chave TEXT
+            );
+            CREATE TABLE IF NOT EXISTS demanda (
+                prova TEXT NOT NULL,
+                tema TEXT NOT NULL,
+                nivel TEXT NOT NULL,
+                area TEXT,
+                pedidos INTEGER NOT NULL,
+                ultimo_pedido REAL NOT NULL,
+                PRIMARY KEY (prova, tema, nivel)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS questoes_fts USING fts5(
+                enunciado, content='questoes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS questoes_fts_insert AFTER INSERT ON questoes BEGIN
+                INSERT INTO questoes_fts (rowid, enunciado) VALUES (new.id, new.enunciado);
+            END;
+            CREATE TRIGGER IF NOT EXISTS questoes_fts_delete AFTER DELETE ON questoes BEGIN
+                INSERT INTO questoes_fts (questoes_fts, rowid, enunciado) VALUES ('delete', old.id, old.enunciado);
+            END;
+        """)
+        # Bancos criados antes do modo de atendimento não têm as colunas de uso
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(questoes)")}
+        if "servida_em" not in columns:
+            self._conn.execute("ALTER TABLE questoes ADD COLUMN servida_em REAL")
+            self._conn.execute("ALTER TABLE questoes ADD COLUMN vezes_servida INTEGER NOT NULL DEFAULT 0")
+        if "chave" not in columns:
+            self._conn.execute("ALTER TABLE questoes ADD COLUMN chave TEXT")
+        # Chave de origem opcional (ex: job de lote + item): gravar de novo a mesma questão não a duplica
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_questoes_chave ON questoes (chave) WHERE chave IS NOT NULL")
+        self._conn.execute("DROP INDEX IF EXISTS idx_questoes_combinacao")
+        # Também ordena por servida_em: a questão a servir sai direto do índice (NULL vem antes)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_questoes_atendimento ON questoes (prova, tema, nivel, servida_em)")
+        self._conn.commit()
+
+    def add(self, questao: Questao, servida: bool = False, chave: Optional[str] = None, **metadados: Any):
+        """
+        Enfileira uma questão para gravação (não bloqueia o gerador)
+
+        Args:
+            questao: Questão validada (prova, tema, nível e área vêm dela)
+            servida: Se a questão já foi entregue a quem pediu (modo único, serviço); as
+                geradas para estoque (lotes, reabastecimento) são as primeiras a serem servidas
+            chave: Identificador único da questão na origem (ex: job de lote + item); uma
+                questão com chave já gravada é ignorada, para que retomadas não dupliquem o estoque
+            **metadados: provider, modelo, prompt_tokens, completion_tokens, custo_usd, latencia_s
+        """
+        unknown = set(metadados) - set(METADATA_FIELDS)
+        if unknown:
+            raise ValueError(f"Metadados desconhecidos: {', '.join(sorted(unknown))}")
+        now = time.time()
+        row = (
+            questao.prova, questao.tema, questao.nivel, questao.area, questao.enunciado,
+            json.dumps(questao.alternativas, ensure_ascii=False), questao.resposta_correta, questao.justificativa,
+            *(metadados.get(field) for field in METADATA_FIELDS), now,
+            now if servida else None, 1 if servida else 0, chave,
+        )
+        self._queue.put(row)
+
+    def _write_loop(self):
+        """Agrupa as questões da fila e grava cada lote numa única transação"""
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    self._queue.task_done()
+                    return
+                rows = [item]
+                deadline = time.monotonic() + self.batch_seconds
+                stop = False
+                while len(rows) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    rows.append(item)
+
+                try:
+                    with conn:
+                        cursor = conn.executemany(
+                            """INSERT OR IGNORE INTO questoes (prova, tema, nivel, area, enunciado, alternativas,
+                               resposta_correta, justificativa, provider, modelo, prompt_tokens,
+                               completion_tokens, custo_usd, latencia_s, criado_em, servida_em, vezes_servida,
+                               chave)
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                            rows
+                        )
+                    # Linhas com chave repetida são ignoradas e não contam como gravadas
+                    self.written += cursor.rowcount
+                except sqlite3.Error as e:
+                    self.write_errors += len(rows)
+                    print(f"⚠️ Falha ao gravar {len(rows)} questões no banco: {e}")
+                finally:
+                    for _ in range(len(rows) + (1 if stop else 0)):
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Espera até que todas as questões enfileiradas estejam gravadas"""
+        self._queue.join()
+
+    def _where(self, prova: Optional[str], tema: Optional[str], nivel: Optional[str],
+               area: Optional[str]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, value in (("prova", prova), ("tema", tema), ("nivel", nivel), ("area", area)):
+            if value:
+                clauses.append(f"q.{column} = ?")
+                params.append(value)
+        return (" AND ".join(clauses) or "1"), params
+
+    def query(self, prova: Optional[str] = None, tema: Optional[str] = None, nivel: Optional[str] = None,
+              area: Optional[str] = None, text: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Busca questões por combinação e, opcionalmente, por texto do enunciado
+
+        Args:
+            text: Consulta FTS5 sobre os enunciados (ex: 'debentures incentivadas', 'CDB OR LCI')
+            limit: Número máximo de questões
+
+        Returns:
+            Questões (com metadados), da mais relevante ou mais recente para a mais antiga
+        """
+        where, params = self._where(prova, tema, nivel, area)
+        if text:
+            sql = f"""SELECT q.* FROM questoes_fts f JOIN questoes q ON q.id = f.rowid
+                      WHERE questoes_fts MATCH ? AND {where} ORDER BY f.rank LIMIT ?"""
+            params = [text] + params + [limit]
+        else:
+            sql = f"SELECT q.* FROM questoes q WHERE {where} ORDER BY q.id DESC LIMIT ?"
+            params = params + [limit]
+
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+
+        results = []
+        for row in rows:
+            record = dict(zip(columns, row))
+            record["alternativas"] = json.loads(record["alternativas"])
+            results.append(record)
+        return results
+
+    def take(self, prova: str, tema: str, nivel: str, area: str = "") -> Optional[Questao]:
+        """
+        Serve uma questão guardada da combinação, se houver uma disponível
+
+        A escolhida é uma nunca servida ou, na falta dela, a servida há mais tempo (desde que
+        há mais de reuse_after_seconds). Ela é marcada como servida na mesma transação, para
+        que dois pedidos simultâneos não recebam a mesma questão. Todo pedido, atendido ou não,
+        conta na demanda da combinação.
+
+        Returns:
+            Questao, ou None se a combinação não tiver questão disponível
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    """INSERT INTO demanda (prova, tema, nivel, area, pedidos, ultimo_pedido) VALUES (?, ?, ?, ?, 1, ?)
+                       ON CONFLICT (prova, tema, nivel) DO UPDATE
+                       SET pedidos = pedidos + 1, ultimo_pedido = excluded.ultimo_pedido, area = excluded.area""",
+                    (prova, tema, nivel, area, now)
+                )
+                row = self._conn.execute(
+                    """SELECT id, enunciado, alternativas, resposta_correta, justificativa, area FROM questoes
+                       WHERE prova = ? AND tema = ? AND nivel = ? AND (servida_em IS NULL OR servida_em < ?)
+                       ORDER BY servida_em LIMIT 1""",
+                    (prova, tema, nivel, now - self.reuse_after_seconds)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE questoes SET servida_em = ?, vezes_servida = vezes_servida + 1 WHERE id = ?",
+                        (now, row[0])
+                    )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return Questao(enunciado=row[1], alternativas=json.loads(row[2]), resposta_correta=row[3],
+                       justificativa=row[4] or "", prova=prova, tema=tema, nivel=nivel, area=row[5] or area)
+
+    def stock(self, prova: str, tema: str, nivel: str) -> int:
+        """Número de questões da combinação disponíveis para servir agora"""
+        with self._lock:
+            return self._conn.execute(
+                """SELECT COUNT(*) FROM questoes WHERE prova = ? AND tema = ? AND nivel = ?
+                   AND (servida_em IS NULL OR servida_em < ?)""",
+                (prova, tema, nivel, time.time() - self.reuse_after_seconds)
+            ).fetchone()[0]
+
+    def hot_combinations(self, limit: int = 20, window_seconds: float = 7 * 24 * 3600) -> List[Dict[str, Any]]:
+        """
+        Combinações mais pedidas recentemente
+
+        Returns:
+            Dicts com prova, tema, nivel, area e pedidos, da mais pedida para a menos pedida
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT prova, tema, nivel, area, pedidos FROM demanda WHERE ultimo_pedido >= ?
+                   ORDER BY pedidos DESC LIMIT ?""",
+                (time.time() - window_seconds, limit)
+            ).fetchall()
+        return [{"prova": row[0], "tema": row[1], "nivel": row[2], "area": row[3] or "", "pedidos": row[4]}
+                for row in rows]
+
+    def _iter_export_rows(self, where: str, params: Sequence[Any]) -> Iterator[List[Tuple]]:
+        """Blocos de linhas para exportação, lidos por uma conexão própria"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"""SELECT q.id, q.prova, q.tema, q.nivel, q.area, q.enunciado, q.alternativas,
+                           q.resposta_correta, q.justificativa, q.provider, q.modelo, q.prompt_tokens,
+                           q.completion_tokens, q.custo_usd, q.latencia_s, q.criado_em
+                    FROM questoes q WHERE {where} ORDER BY q.id""",
+                list(params)
+            )
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+                if not rows:
+                    return
+                yield [_row_to_export(row) for row in rows]
+        finally:
+            conn.close()
+
+    def export(self, output_path: str, prova: Optional[str] = None, tema: Optional[str] = None,
+               nivel: Optional[str] = None, area: Optional[str] = None) -> int:
+        """
+        Exporta as questões para CSV ou Parquet (pela extensão do arquivo), em blocos
+
+        Returns:
+            Número de questões exportadas
+
+        Raises:
+            ValueError: Se a extensão não for .csv nem .parquet
+        """
+        self.flush()
+        extension = os.path.splitext(output_path)[1].lower()
+        if extension not in (".csv", ".parquet"):
+            raise ValueError(f"Formato '{extension}' não suportado. Use CSV ou Parquet")
+
+        where, params = self._where(prova, tema, nivel, area)
+        chunks = self._iter_export_rows(where, params)
+        total = 0
+
+        if extension == ".csv":
+            with open(output_path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(EXPORT_COLUMNS)
+                for rows in chunks:
+                    writer.writerows(rows)
+                    total += len(rows)
+            return total
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow não está instalado. Execute: pip install pyarrow")
+
+        schema = pa.schema([
+            ("id", pa.int64()), ("prova", pa.string()), ("tema", pa.string()), ("nivel", pa.string()),
+            ("area", pa.string()), ("enunciado", pa.string()), ("alternativa_a", pa.string()),
+            ("alternativa_b", pa.string()), ("alternativa_c", pa.string()), ("alternativa_d", pa.string()),
+            ("resposta_correta", pa.string()), ("justificativa", pa.string()), ("provider", pa.string()),
+            ("modelo", pa.string()), ("prompt_tokens", pa.int64()), ("completion_tokens", pa.int64()),
+            ("custo_usd", pa.float64()), ("latencia_s", pa.float64()), ("criado_em", pa.float64()),
+        ])
+        with pq.ParquetWriter(output_path, schema) as writer:
+            for rows in chunks:
+                # Cada bloco vira um row group; só um bloco fica em memória por vez
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)], schema=schema
+                ))
+                total += len(rows)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna totais do banco e contadores de gravação e atendimento desta execução"""
+        with self._lock:
+            total, combinations, never_served = self._conn.execute(
+                """SELECT COUNT(*), COUNT(DISTINCT prova || '|' || tema || '|' || nivel),
+                          COUNT(*) - COUNT(servida_em) FROM questoes"""
+            ).fetchone()
+        return {"questoes": total, "combinacoes": combinations, "nunca_servidas": never_served,
+                "gravadas": self.written, "falhas_gravacao": self.write_errors, "fila": self._queue.qsize(),
+                "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """Grava o que estiver na fila, encerra a thread de escrita e fecha o banco"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta e exporta o banco de questões")
+    parser.add_argument("--path", help="Arquivo do banco (padrão: QUESTION_BANK_PATH ou .cache/questoes.sqlite)")
+    parser.add_argument("--prova")
+    parser.add_argument("--tema")
+    parser.add_argument("--nivel")
+    parser.add_argument("--area")
+    parser.add_argument("--search", metavar="TEXTO", help="Busca textual nos enunciados (FTS5)")
+    parser.add_argument("--limit", type=int, default=20, help="Máximo de questões listadas (padrão: 20)")
+    parser.add_argument("--export", metavar="ARQUIVO", help="Exporta para .csv ou .parquet")
+    parser.add_argument("--stats", action="store_true", help="Mostra o conteúdo do banco")
+    args = parser.parse_args()
+
+    bank = QuestionBank(args.path or os.getenv("QUESTION_BANK_PATH", DEFAULT_BANK_PATH))
+    filters = {"prova": args.prova, "tema": args.tema, "nivel": args.nivel, "area": args.area}
+    try:
+        if args.export:
+            total = bank.export(args.export, **filters)
+            print(f"📤 {total} questões exportadas para {args.export}")
+        elif args.search or any(filters.values()):
+            for record in bank.query(text=args.search, limit=args.limit, **filters):
+                print(f"#{record['id']} [{record['prova']} | {record['tema']} | {record['nivel']}] "
+                      f"{record['enunciado'][:100]}")
+        if args.stats or not (args.export or args.search or any(filters.values())):
+            print(f"🗄️ Banco de questões: {bank.stats()}")
+    finally:
+        bank.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Detecção de questões quase duplicadas (MinHash + LSH em SQLite)
+
+Cada questão aceita vira uma assinatura MinHash dos shingles (trigramas de palavras) do
+enunciado e das alternativas. A assinatura é dividida em bandas; questões com alguma banda
+igual na mesma prova são candidatas, e a similaridade de Jaccard estimada pelas assinaturas
+decide se é duplicada. A busca consulta só as bandas da questão, então o custo não cresce
+com o número de questões guardadas.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_INDEX_PATH = os.path.join(".cache", "dedup.sqlite")
+NUM_PERM = 128
+BANDS = 32
+# Similaridade (Jaccard estimada) a partir da qual a questão é considerada duplicada
+DEFAULT_THRESHOLD = 0.6
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+def _permutations(seed: int = 1) -> List[Tuple[int, int]]:
+    """Coeficientes (a, b) das permutações a*x + b mod p, fixos entre execuções"""
+    result = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"{seed}:{i}".encode(), digest_size=16).digest()
+        a, b = struct.unpack("<QQ", digest)
+        result.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+    return result
+
+_PERMUTATIONS = _permutations()
+
+def normalize(text: str) -> List[str]:
+    """Palavras em minúsculas, sem acentos e pontuação"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"\w+", text)
+
+def shingles(stem: str, alternatives: List[str]) -> set:
+    """Trigramas de palavras do enunciado e de cada alternativa (sem cruzar fronteiras)"""
+    result = set()
+    for part in [stem] + sorted(alternatives):
+        words = normalize(part)
+        if len(words) < SHINGLE_SIZE:
+            if words:
+                result.add(" ".join(words))
+            continue
+        for i in range(len(words) - SHINGLE_SIZE + 1):
+            result.add(" ".join(words[i:i + SHINGLE_SIZE]))
+    return result
+
+def minhash(tokens: set) -> array:
+    """Assinatura MinHash (NUM_PERM valores de 32 bits)"""
+    signature = array("I", [_MAX_HASH] * NUM_PERM)
+    for token in tokens:
+        value = struct.unpack("<Q", hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest())[0]
+        for i, (a, b) in enumerate(_PERMUTATIONS):
+            hashed = ((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH
+            if hashed < signature[i]:
+                signature[i] = hashed
+    return signature
+
+def similarity(first: array, second: array) -> float:
+    """Jaccard estimada entre duas assinaturas"""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERM
+
+def _band_keys(scope: str, signature: array) -> List[int]:
+    """Chave (inteiro de 63 bits) de cada banda da assinatura, dentro do escopo"""
+    rows = NUM_PERM // BANDS
+    keys = []
+    for band in range(BANDS):
+        payload = scope.encode("utf-8") + struct.pack("<H", band) + signature[band * rows:(band + 1) * rows].tobytes()
+        keys.append(struct.unpack("<q", hashlib.blake2b(payload, digest_size=8).digest())[0] >> 1)
+    return keys
+
+class DuplicateQuestionError(RuntimeError):
+    """Todas as tentativas de regeneração resultaram em questões duplicadas"""
+
+class QuestionDedupIndex:
+    """Índice incremental de questões já aceitas, por prova"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, threshold: float = DEFAULT_THRESHOLD):
+        """
+        Args:
+            path: Arquivo SQLite do índice
+            threshold: Similaridade mínima para considerar duas questões duplicadas
+        """
+        self.path = path
+        self.threshold = threshold
+        self.accepted = 0
+        self.duplicates = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS questoes (
+                id INTEGER PRIMARY KEY,
+                prova TEXT NOT NULL,
+                tema TEXT,
+                enunciado TEXT NOT NULL,
+                assinatura BLOB NOT NULL,
+                criado_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bandas (
+                chave INTEGER NOT NULL,
+                questao_id INTEGER NOT NULL,
+                PRIMARY KEY (chave, questao_id)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["QuestionDedupIndex"]:
+        """
+        Cria o índice a partir das variáveis de ambiente
+
+        DEDUP=0 desativa a detecção. DEDUP_INDEX_PATH e DEDUP_THRESHOLD ajustam o comportamento.
+
+        Returns:
+            Instância do índice, ou None se estiver desativado
+        """
+        if os.getenv("DEDUP", "1").lower() in ("0", "false", "no", "nao", "não"):
+            return None
+        return cls(
+            path=os.getenv("DEDUP_INDEX_PATH", DEFAULT_INDEX_PATH),
+            threshold=float(os.getenv("DEDUP_THRESHOLD", DEFAULT_THRESHOLD)),
+        )
+
+    @staticmethod
+    def _scope(prova: str) -> str:
+        return prova.strip().upper()
+
+    def _find(self, scope: str, signature: array) -> Optional[Tuple[str, float]]:
+        """Questão mais parecida acima do limiar (chamado com o lock adquirido)"""
+        keys = _band_keys(scope, signature)
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn.execute(
+            f"""SELECT q.enunciado, q.assinatura FROM questoes q
+                WHERE q.id IN (SELECT DISTINCT questao_id FROM bandas WHERE chave IN ({placeholders}))""",
+            keys
+        ).fetchall()
+
+        best = None
+        for enunciado, blob in rows:
+            score = similarity(signature, array("I", blob))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (enunciado, score)
+        return best
+
+    def check_and_add(self, enunciado: str, alternativas: List[str], prova: str,
+                      tema: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Verifica se a questão é quase duplicada e, se não for, a registra
+
+        A verificação e o registro são atômicos: em lotes concorrentes, duas questões iguais
+        geradas ao mesmo tempo não são ambas aceitas.
+
+        Returns:
+            None se a questão foi aceita, ou dict com o 'enunciado' parecido e a 'similaridade'
+        """
+        signature = minhash(shingles(enunciado, alternativas))
+        scope = self._scope(prova)
+
+        with self._lock:
+            duplicate = self._find(scope, signature)
+            if duplicate is not None:
+                self.duplicates += 1
+                return {"enunciado": duplicate[0], "similaridade": round(duplicate[1], 3)}
+
+            cursor = self._conn.execute(
+                "INSERT INTO questoes (prova, tema, enunciado, assinatura, criado_em) VALUES (?, ?, ?, ?, ?)",
+                (scope, tema, enunciado, signature.tobytes(), time.time())
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO bandas (chave, questao_id) VALUES (?, ?)",
+                [(key, cursor.lastrowid) for key in _band_keys(scope, signature)]
+            )
+            self._conn.commit()
+            self.accepted += 1
+        return None
+
+    def discard(self, enunciado: str, alternativas: List[str], prova: str) -> bool:
+        """
+        Remove do índice uma questão registrada por check_and_add que acabou não sendo aceita
+        (ex: reprovada pelo revisor), para que ela e sua versão corrigida não contem como duplicatas
+
+        Returns:
+            True se a questão estava no índice
+        """
+        signature = minhash(shingles(enunciado, alternativas))
+        scope = self._scope(prova)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM questoes WHERE prova = ? AND enunciado = ? AND assinatura = ? ORDER BY id DESC LIMIT 1",
+                (scope, enunciado, signature.tobytes())
+            ).fetchone()
+            if row is None:
+                return False
+            keys = _band_keys(scope, signature)
+            self._conn.execute(f"DELETE FROM bandas WHERE chave IN ({','.join('?' * len(keys))}) AND questao_id = ?",
+                               [*keys, row[0]])
+            self._conn.execute("DELETE FROM questoes WHERE id = ?", (row[0],))
+            self._conn.commit()
+            self.accepted -= 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna questões aceitas, duplicadas rejeitadas e total no índice"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM questoes").fetchone()[0]
+        return {"aceitas": self.accepted, "duplicadas": self.duplicates, "entries": entries}
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,239 @@
+"""
+Modelo tipado da questão gerada e parser do formato pedido ao gerador
+
+O gerador continua escrevendo no formato "QUESTÃO / A) B) C) D) / RESPOSTA CORRETA", que
+funciona com qualquer provider; o parser lê esse texto (ou um JSON com os mesmos campos)
+numa única passada pelas linhas e valida a questão antes de ela ser aceita. Uma resposta
+com várias questões (QUESTÃO 1, QUESTÃO 2, ...) é separada por split_questions e cada
+questão é validada individualmente.
+"""
+
+import json
+import re
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+
+from pydantic import BaseModel, ValidationError, model_validator
+
+LETTERS = ("A", "B", "C", "D")
+
+_MARKDOWN = re.compile(r"[*_`#]+")
+_STEM = re.compile(r"^\s*QUEST[ÃA]O(?:\s*\d+)?\s*[:.\-–]?\s*(.*)$", re.I)
+_ALTERNATIVE = re.compile(r"^\s*\(?([A-Ea-e])\s*[\).:\-–]\s*(.*)$")
+_ANSWER = re.compile(
+    r"^\s*(?:RESPOSTA|GABARITO)(?:\s+CORRETA)?\s*[:.\-–]?\s*(?:LETRA\s+|ALTERNATIVA\s+)?\(?([A-Ea-e])\b\)?\s*[\).:\-–—]?\s*(.*)$",
+    re.I
+)
+_REVIEW = re.compile(r"^\s*(?:VEREDITO\s*[:.\-–]?\s*)?(APROVADA|REPROVADA)\b\s*[:.\-–—]?\s*(.*)$", re.I)
+_JUSTIFICATION = re.compile(r"^\s*(?:JUSTIFICATIVA|EXPLICA[ÇC][ÃA]O|COMENT[ÁA]RIO)\s*[:.\-–]?\s*(.*)$", re.I)
+_SEPARATOR = re.compile(r"^\s*[-=_*]{3,}\s*$")
+
+class QuestionValidationError(ValueError):
+    """A saída do gerador não forma uma questão válida"""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+class Questao(BaseModel):
+    """Questão de múltipla escolha validada"""
+
+    enunciado: str
+    alternativas: Dict[str, str]
+    resposta_correta: str
+    justificativa: str
+    prova: str = ""
+    tema: str = ""
+    nivel: str = ""
+    area: str = ""
+
+    @model_validator(mode="after")
+    def _validate(self) -> "Questao":
+        problems = question_problems(self.enunciado, self.alternativas, self.resposta_correta, self.justificativa)
+        if problems:
+            raise ValueError("; ".join(problems))
+        return self
+
+    def to_text(self) -> str:
+        """Texto no formato original (QUESTÃO / alternativas / RESPOSTA CORRETA)"""
+        alternativas = "\n".join(f"{letter}) {self.alternativas[letter]}" for letter in LETTERS)
+        return (f"QUESTÃO: {self.enunciado}\n\n{alternativas}\n\n"
+                f"RESPOSTA CORRETA: {self.resposta_correta}) {self.justificativa}")
+
+    def __str__(self) -> str:
+        return self.to_text()
+
+def question_problems(enunciado: str, alternativas: Dict[str, str], resposta: Optional[str],
+                      justificativa: str) -> List[str]:
+    """Lista os problemas de uma questão (vazia se for válida)"""
+    problems = []
+    if not enunciado.strip():
+        problems.append("enunciado ausente")
+    if sorted(alternativas) != list(LETTERS):
+        problems.append(f"são necessárias exatamente 4 alternativas (A-D), encontradas: {', '.join(sorted(alternativas)) or 'nenhuma'}")
+    elif any(not text.strip() for text in alternativas.values()):
+        problems.append("há alternativas vazias")
+    elif len({text.strip().lower() for text in alternativas.values()}) < len(alternativas):
+        problems.append("há alternativas repetidas")
+    if resposta not in LETTERS:
+        problems.append("resposta correta ausente ou fora de A-D")
+    if len(justificativa.strip()) < 5:
+        problems.append("justificativa da resposta ausente")
+    return problems
+
+def _parse_json(text: str) -> Optional[dict]:
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) and "alternativas" in data else None
+
+def parse_question(text: str, prova: str = "", tema: str = "", nivel: str = "", area: str = "") -> Questao:
+    """
+    Converte a saída do gerador numa Questao validada
+
+    Args:
+        text: Saída do gerador, no formato do prompt ou em JSON com os campos da Questao
+
+    Returns:
+        Questao validada
+
+    Raises:
+        QuestionValidationError: Com a lista de problemas encontrados
+    """
+    data = _parse_json(text) if text.lstrip().startswith(("{", "```")) else None
+    if data is None:
+        data = _parse_text(text)
+
+    alternativas = {str(k).upper(): str(v).strip() for k, v in (data.get("alternativas") or {}).items()}
+    resposta = str(data.get("resposta_correta") or "").strip().upper()[:1] or None
+    enunciado = str(data.get("enunciado") or "").strip()
+    justificativa = str(data.get("justificativa") or "").strip()
+
+    problems = question_problems(enunciado, alternativas, resposta, justificativa)
+    if problems:
+        raise QuestionValidationError(problems)
+    try:
+        return Questao(enunciado=enunciado, alternativas=alternativas, resposta_correta=resposta,
+                       justificativa=justificativa, prova=prova, tema=tema, nivel=nivel, area=area)
+    except ValidationError as e:
+        raise QuestionValidationError([error["msg"] for error in e.errors()])
+
+def split_questions(text: str) -> List[str]:
+    """
+    Separa a saída do gerador com várias questões em um texto por questão
+
+    Cada questão começa numa linha "QUESTÃO" (numerada ou não); o que vem antes da primeira
+    e as linhas separadoras (---) são descartados. Uma lista JSON vira um texto JSON por item.
+    """
+    if text.lstrip().startswith("["):
+        start, end = text.find("["), text.rfind("]")
+        try:
+            items = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            items = None
+        if isinstance(items, list):
+            return [json.dumps(item, ensure_ascii=False) for item in items if isinstance(item, dict)]
+
+    blocks: List[List[str]] = []
+    for line in text.splitlines():
+        if _STEM.match(_MARKDOWN.sub("", line)):
+            blocks.append([line])
+        elif blocks and not _SEPARATOR.match(line):
+            blocks[-1].append(line)
+    return ["\n".join(block).strip() for block in blocks]
+
+def parse_questions(text: str, prova: str = "", tema: str = "", nivel: str = "",
+                    area: str = "") -> Tuple[List[Questao], List[str]]:
+    """
+    Converte a saída do gerador com várias questões, validando cada uma
+
+    Returns:
+        Tupla (questões válidas, na ordem da saída; problemas das inválidas)
+    """
+    questoes: List[Questao] = []
+    problems: List[str] = []
+    for number, block in enumerate(split_questions(text), 1):
+        try:
+            questoes.append(parse_question(block, prova=prova, tema=tema, nivel=nivel, area=area))
+        except QuestionValidationError as e:
+            problems.append(f"questão {number}: {e}")
+    return questoes, problems
+
+def _parse_text(text: str) -> dict:
+    """Lê o formato QUESTÃO / A) B) C) D) / RESPOSTA CORRETA numa única passada"""
+    stem: List[str] = []
+    alternatives: Dict[str, List[str]] = {}
+    answer: Optional[str] = None
+    justification: List[str] = []
+    section = "preambulo"
+    current = None
+
+    for raw_line in text.splitlines():
+        line = _MARKDOWN.sub("", raw_line).strip()
+        if not line:
+            continue
+
+        match = _ANSWER.match(line)
+        if match and section != "resposta":
+            answer = match.group(1).upper()
+            justification.append(match.group(2))
+            section = "resposta"
+            continue
+
+        if section == "resposta":
+            match = _JUSTIFICATION.match(line)
+            justification.append(match.group(1) if match else line)
+            continue
+
+        match = _STEM.match(line)
+        if match and section == "preambulo":
+            stem.append(match.group(1))
+            section = "enunciado"
+            continue
+
+        match = _ALTERNATIVE.match(line)
+        if match and section in ("enunciado", "alternativas", "preambulo"):
+            current = match.group(1).upper()
+            alternatives[current] = [match.group(2)]
+            section = "alternativas"
+            continue
+
+        if section == "enunciado":
+            stem.append(line)
+        elif section == "alternativas" and current:
+            alternatives[current].append(line)
+
+    return {
+        "enunciado": " ".join(part for part in stem if part),
+        "alternativas": {letter: " ".join(parts).strip() for letter, parts in alternatives.items()},
+        "resposta_correta": answer,
+        "justificativa": " ".join(part for part in justification if part),
+    }
+
+def parse_review(text: str) -> Tuple[bool, str]:
+    """
+    Lê o veredito do revisor (APROVADA, ou REPROVADA: motivo)
+
+    Sem veredito reconhecível a questão é aprovada: ela já passou pela validação, e um
+    revisor fora do formato não deve descartar trabalho pronto.
+
+    Returns:
+        Tupla (aprovada, motivo)
+    """
+    lines = [_MARKDOWN.sub("", line).strip() for line in text.splitlines()]
+    for number, line in enumerate(lines):
+        match = _REVIEW.match(line)
+        if match is None:
+            continue
+        if match.group(1).upper() == "APROVADA":
+            return True, ""
+        motivo = match.group(2).strip() or " ".join(part for part in lines[number + 1:] if part)
+        return False, motivo or "reprovada sem motivo informado"
+    return True, ""
+
+def write_questions_jsonl(questoes: Iterable[Questao], output: TextIO):
+    """Grava as questões em JSONL (uma por linha), sem passar por dicts intermediários"""
+    output.writelines(questao.model_dump_json() + "\n" for questao in questoes)
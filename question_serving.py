@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Atendimento a partir do banco de questões, com reabastecimento em segundo plano
+
+Com o modo de atendimento pelo banco (service.py --from-bank, index.py --from-bank), um
+pedido é atendido primeiro por QuestionBank.take (milissegundos); só na falta de questão
+disponível a equipe de agentes é executada. O RestockWorker mantém um estoque mínimo
+de questões nunca servidas para as combinações mais pedidas, gerando-as fora do caminho
+dos pedidos, em grupos de até QUESTIONS_PER_CALL questões por chamada ao gerador.
+
+Uso (reabastecimento avulso, ex: num cron):
+    python question_serving.py --restock --stock 5 --provider groq
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from question_bank import QuestionBank
+from question_model import Questao
+
+DEFAULT_STOCK = 5
+DEFAULT_RESTOCK_INTERVAL = 60.0
+DEFAULT_HOT_COMBINATIONS = 20
+DEFAULT_RESTOCK_WORKERS = 1
+
+# generate(prova, tema, nivel, area, quantidade) -> questões aceitas (até `quantidade`)
+GenerateFn = Callable[[str, str, str, str, int], List[Questao]]
+
+class RestockWorker:
+    """Mantém o estoque de questões nunca servidas das combinações mais pedidas"""
+
+    def __init__(self, bank: QuestionBank, generate: GenerateFn, stock: int = DEFAULT_STOCK,
+                 interval: float = DEFAULT_RESTOCK_INTERVAL, hot_combinations: int = DEFAULT_HOT_COMBINATIONS,
+                 workers: int = DEFAULT_RESTOCK_WORKERS, per_call: int = 1):
+        """
+        Args:
+            bank: Banco de questões
+            generate: Função que gera (e valida) até `quantidade` questões da combinação
+            stock: Questões disponíveis a manter por combinação
+            interval: Segundos entre verificações do estoque
+            hot_combinations: Quantas combinações (as mais pedidas) reabastecer
+            workers: Gerações simultâneas do reabastecimento
+            per_call: Questões da mesma combinação por chamada ao gerador
+        """
+        self.bank = bank
+        self.generate = generate
+        self.stock = stock
+        self.interval = interval
+        self.hot_combinations = hot_combinations
+        self.workers = max(1, workers)
+        self.per_call = max(1, per_call)
+        self.generated = 0
+        self.failed = 0
+        self._counters_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, bank: QuestionBank, generate: GenerateFn) -> "RestockWorker":
+        """
+        Cria o worker com BANK_STOCK, BANK_RESTOCK_INTERVAL, BANK_HOT_COMBINATIONS,
+        BANK_RESTOCK_WORKERS e QUESTIONS_PER_CALL
+        """
+        return cls(
+            bank, generate,
+            stock=int(os.getenv("BANK_STOCK", DEFAULT_STOCK)),
+            interval=float(os.getenv("BANK_RESTOCK_INTERVAL", DEFAULT_RESTOCK_INTERVAL)),
+            hot_combinations=int(os.getenv("BANK_HOT_COMBINATIONS", DEFAULT_HOT_COMBINATIONS)),
+            workers=int(os.getenv("BANK_RESTOCK_WORKERS", DEFAULT_RESTOCK_WORKERS)),
+            per_call=int(os.getenv("QUESTIONS_PER_CALL", 1)),
+        )
+
+    def _generate_group(self, job: Tuple[Dict[str, Any], int]) -> int:
+        combination, quantidade = job
+        try:
+            questoes = self.generate(combination["prova"], combination["tema"], combination["nivel"],
+                                     combination["area"], quantidade)
+        except Exception as e:
+            questoes = []
+            print(f"⚠️ Reabastecimento de {combination['prova']} | {combination['tema']} falhou: {e}")
+        for questao in questoes:
+            self.bank.add(questao, servida=False)
+        with self._counters_lock:
+            self.generated += len(questoes)
+            self.failed += quantidade - len(questoes)
+        return len(questoes)
+
+    def run_once(self) -> int:
+        """
+        Completa o estoque das combinações mais pedidas
+
+        Returns:
+            Número de questões geradas
+        """
+        jobs = []
+        for combination in self.bank.hot_combinations(self.hot_combinations):
+            missing = self.stock - self.bank.stock(combination["prova"], combination["tema"], combination["nivel"])
+            # Grupos de até per_call questões, cada um numa única chamada ao gerador
+            jobs.extend((combination, min(self.per_call, missing - start)) for start in range(0, missing, self.per_call))
+        if not jobs:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reabastecimento") as executor:
+            generated = sum(executor.map(self._generate_group, jobs))
+        # Gravar antes da próxima verificação, para o estoque não ser contado em dobro
+        self.bank.flush()
+        return generated
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Erro no reabastecimento do banco: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        """Inicia o reabastecimento periódico numa thread em segundo plano"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="reabastecimento-banco", daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = True):
+        """Interrompe o reabastecimento (a geração em andamento termina antes)"""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        """Questões geradas e falhas do reabastecimento"""
+        return {"geradas": self.generated, "falhas": self.failed, "estoque_alvo": self.stock}
+
+def main():
+    from dotenv import load_dotenv
+
+    from agents import generate_questions, questions_per_call
+    from llm_config import LLMFactory, LLMProvider
+    from question_dedup import QuestionDedupIndex
+    from specialist_cache import SpecialistCache
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Reabastece o banco com questões das combinações mais pedidas")
+    parser.add_argument("--restock", action="store_true", help="Executa um ciclo de reabastecimento")
+    parser.add_argument("--stock", type=int, default=int(os.getenv("BANK_STOCK", DEFAULT_STOCK)),
+                        help=f"Questões disponíveis por combinação (padrão: BANK_STOCK ou {DEFAULT_STOCK})")
+    parser.add_argument("--combinations", type=int, default=DEFAULT_HOT_COMBINATIONS,
+                        help=f"Combinações mais pedidas a reabastecer (padrão: {DEFAULT_HOT_COMBINATIONS})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_RESTOCK_WORKERS, help="Gerações simultâneas")
+    parser.add_argument("--provider", help="Provider (padrão: PREFERRED_LLM_PROVIDER ou router)")
+    parser.add_argument("--questions-per-call", type=int,
+                        help="Questões da mesma combinação por chamada ao gerador (padrão: QUESTIONS_PER_CALL ou 1)")
+    args = parser.parse_args()
+
+    bank = QuestionBank.from_env() or QuestionBank()
+    try:
+        if args.restock:
+            provider = (args.provider or os.getenv("PREFERRED_LLM_PROVIDER") or LLMProvider.ROUTER).lower()
+            llm = LLMFactory.create_llm(provider)
+            cache, dedup = SpecialistCache.from_env(), QuestionDedupIndex.from_env()
+
+            def generate(prova: str, tema: str, nivel: str, area: str, quantidade: int) -> List[Questao]:
+                return generate_questions(llm, prova, tema, nivel, area, quantidade, verbose=False, cache=cache,
+                                          dedup=dedup, por_chamada=quantidade)[0]
+
+            worker = RestockWorker(bank, generate, stock=args.stock, hot_combinations=args.combinations,
+                                   workers=args.workers, per_call=questions_per_call(args.questions_per_call))
+            try:
+                print(f"📦 {worker.run_once()} questões geradas para o estoque")
+            finally:
+                LLMFactory.close_llm(llm)
+        for combination in bank.hot_combinations(args.combinations):
+            available = bank.stock(combination["prova"], combination["tema"], combination["nivel"])
+            print(f"🔥 {combination['prova']} | {combination['tema']} | {combination['nivel']}: "
+                  f"{combination['pedidos']} pedidos, {available} disponíveis")
+    finally:
+        bank.close()
+
+if __name__ == "__main__":
+    main()
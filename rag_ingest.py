@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Ingestão dos PDFs de editais no índice do RAG
+
+As páginas são extraídas num pool de processos (pypdf) e consumidas em ordem, à medida
+que ficam prontas, com um número limitado de lotes em andamento: o PDF nunca é carregado
+inteiro em memória. Cada página vira trechos com sobreposição, vetorizados em lotes e
+gravados no VectorStore.
+
+A reingestão é incremental: um PDF com o mesmo hash é ignorado, e num PDF alterado só as
+páginas cujo texto mudou são vetorizadas de novo.
+
+Uso:
+    python rag_ingest.py editais/ --prova CPA-20
+    python rag_ingest.py editais/cpa20.pdf editais/cea.pdf --workers 8
+    python rag_ingest.py --stats
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from llm_config import LLMFactory
+from vector_store import DEFAULT_INDEX_DIR, VectorStore, normalize_prova
+
+DEFAULT_CHUNK_SIZE = 1200
+DEFAULT_CHUNK_OVERLAP = 200
+DEFAULT_EMBED_BATCH = 64
+# Páginas extraídas por tarefa do pool (cada tarefa abre o PDF uma vez)
+PAGES_PER_TASK = 8
+
+def file_sha256(path: str) -> str:
+    """Hash do arquivo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def count_pages(path: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+def _extract_pages(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extrai o texto das páginas [start, end) — executado nos processos do pool"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    end = min(end, len(reader.pages))
+    return [(number + 1, reader.pages[number].extract_text() or "") for number in range(start, end)]
+
+def iter_pages(path: str, executor: Executor, total_pages: int, pages_per_task: int = PAGES_PER_TASK,
+               max_in_flight: int = 8) -> Iterator[Tuple[int, str]]:
+    """
+    Gera (número, texto) de cada página, em ordem, extraindo em paralelo
+
+    No máximo `max_in_flight` lotes ficam em andamento, para a memória não crescer com o
+    tamanho do PDF quando a vetorização é mais lenta que a extração.
+    """
+    starts = iter(range(0, total_pages, pages_per_task))
+    pending = deque()
+
+    def submit_next():
+        start = next(starts, None)
+        if start is not None:
+            pending.append(executor.submit(_extract_pages, path, start, start + pages_per_task))
+
+    for _ in range(max_in_flight):
+        submit_next()
+    while pending:
+        pages = pending.popleft().result()
+        submit_next()
+        yield from pages
+
+def normalize_text(text: str) -> str:
+    """Junta palavras hifenizadas na quebra de linha e normaliza espaços"""
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r"\n\s*\n+", "\n\n", text)
+    return text.strip()
+
+def chunk_text(text: str, size: int = DEFAULT_CHUNK_SIZE, overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[str]:
+    """
+    Divide o texto em trechos de até `size` caracteres, respeitando frases
+
+    Cada trecho começa com o final (até `overlap` caracteres) do anterior, para que um item
+    do conteúdo programático cortado na divisão apareça inteiro em algum trecho.
+    """
+    sentences = [s.strip() for s in re.split(r"(?<=[.;:!?])\s+|\n+", text) if s.strip()]
+    current = ""
+    for sentence in sentences:
+        # Frases maiores que o trecho são cortadas em pedaços de `size`
+        while len(sentence) > size:
+            if current:
+                yield current
+                current = ""
+            yield sentence[:size]
+            sentence = sentence[size - overlap:] if overlap < size else sentence[size:]
+
+        if current and len(current) + 1 + len(sentence) > size:
+            yield current
+            tail = current[-overlap:] if overlap else ""
+            # Começar a sobreposição numa fronteira de palavra
+            current = tail[tail.find(" ") + 1:] if " " in tail else tail
+        current = f"{current} {sentence}".strip()
+
+    if current:
+        yield current
+
+def embed_texts(embeddings, texts: Sequence[str], batch_size: int = DEFAULT_EMBED_BATCH) -> np.ndarray:
+    """Vetoriza os textos em lotes e normaliza cada vetor (produto interno = cosseno)"""
+    parts = []
+    for start in range(0, len(texts), batch_size):
+        parts.append(np.asarray(embeddings.embed_documents(list(texts[start:start + batch_size])), dtype=np.float32))
+    vectors = np.vstack(parts)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def ingest_pdf(path: str, store: VectorStore, embeddings, executor: Executor, prova: str,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, overlap: int = DEFAULT_CHUNK_OVERLAP,
+               batch_size: int = DEFAULT_EMBED_BATCH, force: bool = False) -> Dict[str, Any]:
+    """
+    Ingere (ou atualiza) um PDF no índice
+
+    Args:
+        path: Caminho do PDF
+        store: Índice de destino
+        embeddings: Modelo criado por LLMFactory.create_embeddings
+        executor: Pool de processos usado na extração das páginas
+        prova: Prova à qual o edital pertence (filtro da busca)
+        force: Reprocessa todas as páginas, mesmo sem alteração
+
+    Returns:
+        Contadores de páginas e trechos processados
+    """
+    path = os.path.abspath(path)
+    stats = {"documento": os.path.basename(path), "paginas": 0, "paginas_alteradas": 0, "trechos": 0,
+             "ignorado": False}
+
+    file_hash = file_sha256(path)
+    document = store.get_document(path)
+    if document and document["hash"] == file_hash and not force:
+        if document["prova"] != normalize_prova(prova):
+            store.upsert_document(path, prova, file_hash, document["paginas"])
+        stats.update(paginas=document["paginas"], ignorado=True)
+        return stats
+
+    total_pages = count_pages(path)
+    # O hash do arquivo só é gravado no final: uma ingestão interrompida é retomada na próxima
+    document_id = store.upsert_document(path, prova, "", total_pages)
+    known = {} if force else store.page_hashes(document_id)
+    store.remove_pages_after(document_id, total_pages)
+
+    pending_pages: Dict[int, str] = {}
+    pending_chunks: List[Tuple[int, int, str]] = []
+
+    def flush():
+        vectors = embed_texts(embeddings, [text for _, _, text in pending_chunks], batch_size) \
+            if pending_chunks else np.zeros((0, 0), dtype=np.float32)
+        store.add_pages(document_id, prova, dict(pending_pages), list(pending_chunks), vectors)
+        stats["trechos"] += len(pending_chunks)
+        pending_pages.clear()
+        pending_chunks.clear()
+
+    for number, text in iter_pages(path, executor, total_pages):
+        stats["paginas"] += 1
+        text = normalize_text(text)
+        page_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if known.get(number) == page_hash:
+            continue
+
+        stats["paginas_alteradas"] += 1
+        pending_pages[number] = page_hash
+        pending_chunks.extend((number, order, chunk) for order, chunk in enumerate(chunk_text(text, chunk_size, overlap)))
+        # Só páginas inteiras são gravadas, para o hash nunca marcar uma página pela metade
+        if len(pending_chunks) >= batch_size:
+            flush()
+
+    if pending_pages:
+        flush()
+    store.upsert_document(path, prova, file_hash, total_pages)
+    return stats
+
+def find_pdfs(paths: Sequence[str]) -> List[str]:
+    """Expande diretórios nos PDFs que eles contêm"""
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                pdfs.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+        else:
+            pdfs.append(path)
+    return pdfs
+
+def ingest(paths: Sequence[str], prova: Optional[str] = None, index_dir: Optional[str] = None,
+           workers: Optional[int] = None, embeddings_provider: Optional[str] = None,
+           force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Ingere PDFs (ou diretórios de PDFs) no índice do RAG
+
+    Args:
+        paths: PDFs ou diretórios
+        prova: Prova dos editais; se omitida, usa o nome do arquivo (ex: cpa-20.pdf → CPA-20)
+        index_dir: Diretório do índice (padrão: RAG_INDEX_DIR ou .cache/rag)
+        workers: Processos de extração (padrão: número de CPUs)
+        embeddings_provider: Provider de embeddings (padrão: RAG_EMBEDDINGS_PROVIDER ou openai)
+        force: Reprocessa todas as páginas
+
+    Returns:
+        Contadores de cada documento
+    """
+    store = VectorStore(index_dir or os.getenv("RAG_INDEX_DIR", DEFAULT_INDEX_DIR))
+    store.check_embeddings(LLMFactory.embeddings_model_id(embeddings_provider))
+    embeddings = LLMFactory.create_embeddings(embeddings_provider)
+
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for path in find_pdfs(paths):
+                document_prova = prova or os.path.splitext(os.path.basename(path))[0]
+                start = time.perf_counter()
+                stats = ingest_pdf(path, store, embeddings, executor, document_prova, force=force)
+                stats["duracao_s"] = round(time.perf_counter() - start, 2)
+                results.append(stats)
+                if stats["ignorado"]:
+                    print(f"⏭️  {stats['documento']}: sem alterações")
+                else:
+                    print(f"✅ {stats['documento']}: {stats['paginas_alteradas']}/{stats['paginas']} páginas "
+                          f"alteradas, {stats['trechos']} trechos em {stats['duracao_s']}s")
+    finally:
+        store.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingere PDFs de editais no índice do RAG")
+    parser.add_argument("paths", nargs="*", help="PDFs ou diretórios com PDFs")
+    parser.add_argument("--prova", help="Prova dos editais (padrão: nome do arquivo)")
+    parser.add_argument("--index-dir", help="Diretório do índice (padrão: RAG_INDEX_DIR ou .cache/rag)")
+    parser.add_argument("--workers", type=int, help="Processos de extração (padrão: CPUs)")
+    parser.add_argument("--embeddings", help="Provider de embeddings (padrão: RAG_EMBEDDINGS_PROVIDER ou openai)")
+    parser.add_argument("--force", action="store_true", help="Reprocessa todas as páginas")
+    parser.add_argument("--compact", action="store_true", help="Remove da matriz os vetores de trechos desativados")
+    parser.add_argument("--stats", action="store_true", help="Mostra o conteúdo do índice")
+    args = parser.parse_args()
+
+    if args.paths:
+        ingest(args.paths, prova=args.prova, index_dir=args.index_dir, workers=args.workers,
+               embeddings_provider=args.embeddings, force=args.force)
+
+    if args.compact or args.stats or not args.paths:
+        store = VectorStore(args.index_dir or os.getenv("RAG_INDEX_DIR", DEFAULT_INDEX_DIR))
+        if args.compact:
+            print(f"🧹 {store.compact()} vetores inativos removidos")
+        print(f"📚 Índice: {store.stats()}")
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Busca aproximada (IVF) dos trechos dos editais para os agentes
+
+Os vetores do VectorStore são agrupados por k-means em `nlist` listas invertidas; uma busca
+compara a consulta com os centróides e só pontua os trechos das `nprobe` listas mais
+próximas, direto da matriz mapeada em memória. Com filtro de prova pequeno o bastante, a
+busca é exata sobre os trechos da prova (filtrar antes é mais barato que sondar listas).
+
+Trechos ingeridos depois da construção do índice são pontuados por força bruta até a
+próxima reconstrução, que acontece sozinha quando eles passam de uma fração do índice.
+
+Uso:
+    python rag_retrieval.py "tributação de fundos" --prova CPA-20 -k 5
+    python rag_retrieval.py --rebuild
+"""
+
+import argparse
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from llm_config import LLMFactory
+from vector_store import DEFAULT_INDEX_DIR, METADATA_FILE, VectorStore, normalize_prova
+
+IVF_FILE = "ivf.npz"
+DEFAULT_TOP_K = 5
+DEFAULT_NPROBE = 16
+# Abaixo disso (no total ou depois do filtro de prova) a busca é exata
+BRUTE_FORCE_ROWS = 4096
+# Amostra usada no k-means e iterações
+KMEANS_SAMPLE = 20000
+KMEANS_ITERATIONS = 12
+# Reconstrói o índice quando os trechos fora dele passam desta fração
+REBUILD_TAIL_FRACTION = 0.2
+# Embeddings de consultas guardados (o tema de uma prova se repete muito)
+QUERY_CACHE_SIZE = 512
+
+def train_ivf(matrix: np.ndarray, rows: np.ndarray, nlist: int, seed: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Treina o k-means esférico e monta as listas invertidas
+
+    Args:
+        matrix: Matriz de vetores normalizados (memmap)
+        rows: Linhas da matriz a indexar (trechos ativos)
+        nlist: Número de listas
+
+    Returns:
+        Dict com centroides, linhas ordenadas por lista e offsets de cada lista
+    """
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(rows, size=min(len(rows), KMEANS_SAMPLE), replace=False))
+    sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        for cluster in range(nlist):
+            members = sample[labels == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+            else:
+                # Lista vazia: recomeçar de um ponto aleatório
+                centroids[cluster] = sample[rng.integers(len(sample))]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+    # Atribuir todas as linhas em blocos, sem carregar a matriz inteira
+    labels = np.empty(len(rows), dtype=np.int32)
+    for start in range(0, len(rows), 8192):
+        block = np.asarray(matrix[rows[start:start + 8192]], dtype=np.float32)
+        labels[start:start + 8192] = np.argmax(block @ centroids.T, axis=1)
+
+    order = np.argsort(labels, kind="stable")
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+    return {"centroides": centroids, "linhas": rows[order], "offsets": offsets}
+
+class SyllabusRetriever:
+    """Busca top-k de trechos dos editais, com filtro por prova"""
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR, embeddings=None, nprobe: int = DEFAULT_NPROBE):
+        """
+        Args:
+            index_dir: Diretório do índice criado pelo rag_ingest.py
+            embeddings: Modelo de embeddings; por padrão, o mesmo usado na ingestão
+            nprobe: Listas sondadas por busca (mais listas = mais recall, mais lento)
+        """
+        self.store = VectorStore(index_dir)
+        self.ivf_path = os.path.join(index_dir, IVF_FILE)
+        self.nprobe = nprobe
+        if embeddings is None:
+            model_id = self.store.get_meta("embeddings")
+            if model_id is None:
+                raise ValueError(f"Índice vazio em '{index_dir}'. Execute: python rag_ingest.py <pdfs>")
+            provider, model = model_id.split("/", 1)
+            embeddings = LLMFactory.create_embeddings(provider, {"model": model})
+        self.embeddings = embeddings
+
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        # Matriz, índice e máscaras de uma mesma versão, trocados juntos a cada recarga
+        self._state: Dict[str, Any] = {"matrix": None, "ivf": None, "masks": {}}
+        self._queries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    def build(self) -> Optional[Dict[str, Any]]:
+        """
+        (Re)constrói as listas invertidas a partir dos trechos ativos
+
+        Returns:
+            Índice IVF, ou None se houver poucos trechos (a busca exata basta)
+        """
+        rows = self.store.active_rows()
+        if len(rows) <= BRUTE_FORCE_ROWS:
+            if os.path.exists(self.ivf_path):
+                os.remove(self.ivf_path)
+            return None
+
+        nlist = min(4096, max(16, int(math.sqrt(len(rows)))))
+        ivf = train_ivf(self.store.vectors(), rows, nlist)
+        ivf["linhas_total"] = np.int64(self.store.rows)
+        ivf["compactacoes"] = np.int64(int(self.store.get_meta("compactacoes") or 0))
+        temporary = self.ivf_path + ".tmp.npz"
+        np.savez(temporary, **ivf)
+        os.replace(temporary, self.ivf_path)
+        return ivf
+
+    def _load_ivf(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.ivf_path):
+            return None
+        with np.load(self.ivf_path) as data:
+            return {name: data[name] for name in data.files}
+
+    def _refresh(self) -> Dict[str, Any]:
+        """Recarrega matriz, índice e filtros quando o VectorStore muda"""
+        version = self.store.version
+        if version == self._version:
+            return self._state
+        with self._lock:
+            if version == self._version:
+                return self._state
+            rows = self.store.rows
+            active = len(self.store.active_rows())
+            ivf = self._load_ivf()
+            stale = ivf is not None and (
+                int(ivf["linhas_total"]) > rows
+                or int(ivf["compactacoes"]) != int(self.store.get_meta("compactacoes") or 0)
+            )
+            tail = rows - int(ivf["linhas_total"]) if ivf is not None and not stale else rows
+            if (ivf is None and active > BRUTE_FORCE_ROWS) or stale or \
+                    (ivf is not None and tail > REBUILD_TAIL_FRACTION * len(ivf["linhas"])):
+                ivf = self.build()
+
+            self._state = {"matrix": self.store.vectors(), "ivf": ivf, "masks": {}}
+            self._version = version
+            return self._state
+
+    def _mask(self, state: Dict[str, Any], prova: Optional[str]) -> np.ndarray:
+        """Máscara booleana das linhas ativas (da prova, se informada)"""
+        prova = normalize_prova(prova) if prova else None
+        mask = state["masks"].get(prova)
+        if mask is None:
+            mask = np.zeros(len(state["matrix"]), dtype=bool)
+            rows = self.store.active_rows(prova)
+            mask[rows[rows < len(mask)]] = True
+            state["masks"][prova] = mask
+        return mask
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embedding normalizado da consulta, com cache LRU"""
+        with self._lock:
+            if query in self._queries:
+                self._queries.move_to_end(query)
+                return self._queries[query]
+
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        with self._lock:
+            self._queries[query] = vector
+            if len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return vector
+
+    def _candidates(self, ivf: Optional[Dict[str, Any]], query: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Linhas a pontuar: todas as da máscara (busca exata) ou as das listas sondadas"""
+        allowed = np.flatnonzero(mask)
+        if ivf is None or len(allowed) <= BRUTE_FORCE_ROWS:
+            return allowed
+
+        probe = np.argsort(ivf["centroides"] @ query)[::-1][:self.nprobe]
+        offsets = ivf["offsets"]
+        parts = [ivf["linhas"][offsets[c]:offsets[c + 1]] for c in probe]
+        # Trechos ingeridos depois da construção do índice
+        parts.append(np.arange(int(ivf["linhas_total"]), len(mask)))
+        candidates = np.concatenate(parts)
+        return candidates[mask[candidates]]
+
+    def search(self, query: str, prova: Optional[str] = None, k: int = DEFAULT_TOP_K) -> List[Dict[str, Any]]:
+        """
+        Busca os trechos mais próximos da consulta
+
+        Args:
+            query: Texto da consulta (ex: o tema da questão)
+            prova: Restringe a busca aos editais desta prova
+            k: Número de trechos
+
+        Returns:
+            Trechos com prova, pagina, texto, documento e score, do mais para o menos relevante
+        """
+        state = self._refresh()
+        matrix = state["matrix"]
+        if matrix is None or not len(matrix):
+            return []
+
+        vector = self._embed_query(query)
+        candidates = self._candidates(state["ivf"], vector, self._mask(state, prova))
+        if not len(candidates):
+            return []
+
+        scores = np.asarray(matrix[candidates]) @ vector
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        chunks = self.store.get_chunks(candidates[top])
+        results = []
+        for index in top:
+            chunk = chunks.get(int(candidates[index]))
+            if chunk:
+                results.append({**chunk, "score": round(float(scores[index]), 4)})
+        return results
+
+def format_context(results: List[Dict[str, Any]]) -> str:
+    """Formata os trechos para o prompt do agente"""
+    return "\n\n".join(f"[{r['prova']}, p. {r['pagina']}] {r['texto']}" for r in results)
+
+_retrievers: Dict[str, SyllabusRetriever] = {}
+_retrievers_lock = threading.Lock()
+
+def get_retriever(index_dir: Optional[str] = None) -> Optional[SyllabusRetriever]:
+    """
+    Busca compartilhada pelo processo
+
+    Returns:
+        SyllabusRetriever do índice, ou None se RAG=0 ou ainda não houver editais ingeridos
+    """
+    if os.getenv("RAG", "1").lower() in ("0", "false", "no", "nao", "não"):
+        return None
+    index_dir = index_dir or os.getenv("RAG_INDEX_DIR", DEFAULT_INDEX_DIR)
+    if not os.path.exists(os.path.join(index_dir, METADATA_FILE)):
+        return None
+
+    with _retrievers_lock:
+        if index_dir not in _retrievers:
+            store = VectorStore(index_dir)
+            empty = store.get_meta("embeddings") is None
+            store.close()
+            if empty:
+                return None
+            _retrievers[index_dir] = SyllabusRetriever(index_dir, nprobe=int(os.getenv("RAG_NPROBE", DEFAULT_NPROBE)))
+        return _retrievers[index_dir]
+
+def main():
+    parser = argparse.ArgumentParser(description="Busca trechos no índice de editais")
+    parser.add_argument("query", nargs="?", help="Consulta")
+    parser.add_argument("--prova", help="Restringe a busca a uma prova")
+    parser.add_argument("-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--index-dir", help="Diretório do índice (padrão: RAG_INDEX_DIR ou .cache/rag)")
+    parser.add_argument("--rebuild", action="store_true", help="Reconstrói as listas invertidas")
+    args = parser.parse_args()
+
+    retriever = SyllabusRetriever(args.index_dir or os.getenv("RAG_INDEX_DIR", DEFAULT_INDEX_DIR),
+                                  nprobe=int(os.getenv("RAG_NPROBE", DEFAULT_NPROBE)))
+    if args.rebuild:
+        start = time.perf_counter()
+        ivf = retriever.build()
+        lists = len(ivf["centroides"]) if ivf else 0
+        print(f"🔨 Índice reconstruído em {time.perf_counter() - start:.2f}s ({lists} listas)")
+
+    if args.query:
+        retriever.search(args.query, prova=args.prova, k=args.k)  # aquecer matriz e índice
+        start = time.perf_counter()
+        results = retriever.search(args.query, prova=args.prova, k=args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"🔎 {len(results)} trechos em {elapsed:.1f} ms\n")
+        for result in results:
+            print(f"[{result['score']:.3f}] {result['prova']} p.{result['pagina']}: {result['texto'][:200]}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Limitação de taxa por provider/modelo, com concorrência adaptativa (AIMD)
+
+Cada provider/modelo tem um balde de requisições por minuto (RPM), um de tokens por
+minuto (TPM) e um limite de chamadas simultâneas ajustado pelo que se observa: cada
+sucesso aumenta o limite aos poucos (aditivo), um 429 o corta pela metade
+(multiplicativo) e latência muito acima da mínima observada o reduz levemente. A
+latência é comparada por token de saída e só entre respostas de tamanho parecido (o
+parecer do revisor não é comparado com a questão do gerador). Um
+Retry-After pausa todas as chamadas do provider pelo tempo pedido, e a chamada que
+recebeu o 429 é repetida depois da pausa, em vez de derrubar a equipe.
+
+Os limites ficam em LLMConfig.RATE_LIMITS e podem ser sobrescritos por
+RATE_LIMIT_<PROVIDER>_RPM, RATE_LIMIT_<PROVIDER>_TPM e RATE_LIMIT_<PROVIDER>_CONCURRENCY.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from instrumentation import extract_token_usage
+from llm_router import get_retry_after, get_status_code
+
+# Pausa usada quando o 429 não traz Retry-After
+DEFAULT_THROTTLE_PAUSE_S = 1.0
+# Exceções de limite de taxa dos SDKs (openai, anthropic e groq usam RateLimitError; o
+# Google, ResourceExhausted), para quando a exceção não traz o status HTTP
+RATE_LIMIT_ERRORS = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+# Latência acima de (mínima observada × tolerância) é tratada como sinal de saturação
+LATENCY_TOLERANCE = 3.0
+
+def latency_class(output_tokens: Optional[int]) -> int:
+    """Faixa de tamanho da resposta (tokens de saída dobrando a cada faixa; 0 = desconhecido)"""
+    return int(output_tokens).bit_length() if output_tokens else 0
+
+class TokenBucket:
+    """Balde de fichas reabastecido continuamente a `per_minute` fichas por minuto"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Reserva `amount` fichas, mesmo que o saldo fique negativo
+
+        Reservar antes de esperar mantém a ordem de chegada entre as threads: quem chega
+        depois espera também pela dívida de quem chegou antes.
+
+        Returns:
+            Segundos a esperar até a reserva estar coberta
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, delta: float):
+        """Corrige a reserva com o consumo real (delta positivo devolve fichas)"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+class AdaptiveConcurrency:
+    """Limite de chamadas simultâneas com aumento aditivo e redução multiplicativa"""
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.min_latency: Optional[float] = None
+        # Menor latência por token de saída em cada faixa de tamanho da resposta
+        self.baselines: Dict[int, float] = {}
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False,
+                output_tokens: Optional[int] = None):
+        """
+        Libera a vaga e ajusta o limite
+
+        Args:
+            latency: Duração da chamada bem-sucedida (None em erros que não são 429)
+            throttled: Se a chamada recebeu 429
+            output_tokens: Tokens gerados na resposta (None se o provider não informar)
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self._decrease(now, 0.5)
+            elif latency is not None:
+                self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+                faixa = latency_class(output_tokens)
+                per_token = latency / (output_tokens or 1)
+                baseline = self.baselines[faixa] = min(self.baselines.get(faixa, per_token), per_token)
+                if per_token > baseline * LATENCY_TOLERANCE:
+                    self._decrease(now, 0.9)
+                else:
+                    # +1 vaga a cada `limit` sucessos: cresce uma vaga por "rodada" de chamadas
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _decrease(self, now: float, factor: float):
+        # Uma redução por janela: vários 429 da mesma rajada não zeram o limite
+        window = self.min_latency or 1.0
+        if now - self.last_decrease >= window:
+            self.limit = max(self.minimum, self.limit * factor)
+            self.last_decrease = now
+            self.decreases += 1
+
+class RateLimiter:
+    """Baldes RPM/TPM, concorrência adaptativa e pausa por Retry-After de um provider/modelo"""
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_concurrency: int = 16, min_concurrency: int = 1, initial_concurrency: Optional[int] = None):
+        """
+        Args:
+            name: Identificação (provider/modelo), usada nas estatísticas
+            rpm: Requisições por minuto (None = sem limite)
+            tpm: Tokens por minuto, entrada + saída (None = sem limite)
+            max_concurrency: Teto do limite adaptativo de chamadas simultâneas
+            min_concurrency: Piso do limite adaptativo
+            initial_concurrency: Limite inicial (padrão: metade do teto)
+        """
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = AdaptiveConcurrency(initial_concurrency or max(min_concurrency, max_concurrency // 2),
+                                               min_concurrency, max_concurrency)
+        self.paused_until = 0.0
+        self.calls = 0
+        self.throttled = 0
+        self.waited_s = 0.0
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int = 0):
+        """Bloqueia até a chamada caber na pausa, na concorrência e nos baldes"""
+        start = time.monotonic()
+        pause = self.paused_until - start
+        if pause > 0:
+            time.sleep(pause)
+        self.concurrency.acquire()
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.reserve(1)
+        if self.tokens is not None and estimated_tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            self.calls += 1
+            self.waited_s += time.monotonic() - start
+
+    def release(self, latency: Optional[float] = None, estimated_tokens: int = 0, used_tokens: Optional[int] = None,
+                output_tokens: Optional[int] = None):
+        """Libera a vaga; com o consumo real, devolve ao balde TPM o que foi reservado a mais"""
+        if self.tokens is not None and used_tokens is not None and estimated_tokens:
+            self.tokens.adjust(estimated_tokens - used_tokens)
+        if latency is not None:
+            with self._lock:
+                self._latencies.append(latency)
+        self.concurrency.release(latency, output_tokens=output_tokens)
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """Registra um 429: reduz a concorrência e pausa o provider pelo Retry-After"""
+        with self._lock:
+            self.throttled += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + (retry_after or DEFAULT_THROTTLE_PAUSE_S))
+        self.concurrency.release(throttled=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Chamadas, 429 recebidos, limite atual de concorrência e latência p50"""
+        with self._lock:
+            ordered = sorted(self._latencies)
+            return {
+                "chamadas": self.calls,
+                "throttled": self.throttled,
+                "concorrencia": round(self.concurrency.limit, 1),
+                "reducoes": self.concurrency.decreases,
+                "espera_total_s": round(self.waited_s, 2),
+                "p50_s": ordered[len(ordered) // 2] if ordered else None,
+            }
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def rate_limit_config(provider: str) -> Optional[Dict[str, Any]]:
+    """
+    Limites do provider: LLMConfig.RATE_LIMITS sobrescrito pelas variáveis de ambiente
+
+    Returns:
+        Dict com rpm, tpm e max_concurrency, ou None se o provider não tiver limites
+        (ou RATE_LIMIT=0)
+    """
+    from llm_config import LLMConfig
+
+    if os.getenv("RATE_LIMIT", "1").lower() in ("0", "false", "no", "nao", "não"):
+        return None
+    config = dict(LLMConfig.RATE_LIMITS.get(provider) or {})
+    prefix = f"RATE_LIMIT_{provider.upper()}_"
+    for key, cast in (("rpm", float), ("tpm", float), ("max_concurrency", int)):
+        value = os.getenv(prefix + ("CONCURRENCY" if key == "max_concurrency" else key.upper()))
+        if value:
+            config[key] = cast(value)
+    return config or None
+
+def get_rate_limiter(provider: str, model: str) -> Optional[RateLimiter]:
+    """Limiter compartilhado pelo processo para o provider/modelo, ou None se não houver limites"""
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            config = rate_limit_config(provider)
+            if config is None:
+                return None
+            _limiters[key] = RateLimiter(f"{provider}/{model}", rpm=config.get("rpm"), tpm=config.get("tpm"),
+                                         max_concurrency=config.get("max_concurrency", 16))
+        return _limiters[key]
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Estatísticas de todos os limiters criados no processo"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Indica se o erro é uma resposta 429 do provider
+
+    Só o status HTTP e a classe da exceção contam: um "429" no texto (ex: timeout de 4290 ms
+    ou id de requisição) não reduz a concorrência do provider.
+    """
+    status = get_status_code(error)
+    if status is not None:
+        return status == 429
+    return any(cls.__name__ in RATE_LIMIT_ERRORS for cls in type(error).__mro__)
+
+def estimate_tokens(messages: List[BaseMessage], max_tokens: int = 0) -> int:
+    """Tokens que a chamada pode consumir: prompt (~4 caracteres por token) + max_tokens"""
+    return sum(len(str(message.content)) for message in messages) // 4 + max_tokens
+
+class RateLimitedChatModel(BaseChatModel):
+    """Chat model que passa cada chamada do LLM interno pelo RateLimiter do provider"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    llm: Any
+    limiter: Any
+    llm_provider: str
+    model_name: str
+    max_throttle_retries: int = 5
+
+    @property
+    def _llm_type(self) -> str:
+        return "rate-limited"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"provider": self.llm_provider, "model_name": self.model_name}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        estimated = estimate_tokens(messages, getattr(self.llm, "max_tokens", None) or 0)
+        for attempt in range(self.max_throttle_retries + 1):
+            self.limiter.acquire(estimated)
+            start = time.monotonic()
+            try:
+                result = self.llm.generate([messages], stop=stop, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    self.limiter.release(estimated_tokens=estimated, used_tokens=0)
+                    raise
+                self.limiter.throttle(get_retry_after(e))
+                if attempt == self.max_throttle_retries:
+                    raise
+                continue
+
+            prompt_tokens, completion_tokens, _ = extract_token_usage(result)
+            self.limiter.release(time.monotonic() - start, estimated, prompt_tokens + completion_tokens,
+                                 output_tokens=completion_tokens)
+            return ChatResult(generations=result.generations[0], llm_output=result.llm_output)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        # A espera pelo limiter bloqueia, então vai para uma thread; a chamada usa o cliente
+        # assíncrono do LLM interno (LLMFactory.acreate_llm), sem ocupar uma thread por requisição.
+        # asyncio só é importado aqui: create_llm importa este módulo em todo processo
+        import asyncio
+
+        estimated = estimate_tokens(messages, getattr(self.llm, "max_tokens", None) or 0)
+        for attempt in range(self.max_throttle_retries + 1):
+            await asyncio.to_thread(self.limiter.acquire, estimated)
+            start = time.monotonic()
+            try:
+                result = await self.llm.agenerate([messages], stop=stop, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    self.limiter.release(estimated_tokens=estimated, used_tokens=0)
+                    raise
+                self.limiter.throttle(get_retry_after(e))
+                if attempt == self.max_throttle_retries:
+                    raise
+                continue
+
+            prompt_tokens, completion_tokens, _ = extract_token_usage(result)
+            self.limiter.release(time.monotonic() - start, estimated, prompt_tokens + completion_tokens,
+                                 output_tokens=completion_tokens)
+            return ChatResult(generations=result.generations[0], llm_output=result.llm_output)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # Sem nova tentativa no 429: parte da resposta pode já ter sido entregue
+        estimated = estimate_tokens(messages, getattr(self.llm, "max_tokens", None) or 0)
+        self.limiter.acquire(estimated)
+        start = time.monotonic()
+        used, output, latency, throttled = 0, 0, None, False
+        try:
+            for chunk in self.llm.stream(messages, stop=stop, **kwargs):
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage:
+                    output += int(usage.get("output_tokens", 0))
+                    used += int(usage.get("input_tokens", 0)) + int(usage.get("output_tokens", 0))
+                generation = ChatGenerationChunk(message=chunk)
+                if run_manager:
+                    run_manager.on_llm_new_token(generation.text, chunk=generation)
+                yield generation
+            latency = time.monotonic() - start
+        except Exception as e:
+            if is_rate_limit_error(e):
+                throttled = True
+                self.limiter.throttle(get_retry_after(e))
+            raise
+        finally:
+            if not throttled:
+                self.limiter.release(latency, estimated, used or (None if latency is not None else 0),
+                                     output_tokens=output or None)
@@ -0,0 +1,237 @@
+"""
+Geração com revisão pedagógica como estágio separado do pipeline
+
+A geração (especialista → gerador) e a revisão rodam em pools próprios, ligados pelas
+filas dos executores: enquanto a questão N está com o revisor, a N+1 já está sendo
+gerada. Uma questão reprovada volta para a fila de geração, onde só o gerador é
+executado de novo, com a questão e o motivo da reprovação no prompt; a análise do
+especialista é reaproveitada. Cada estágio mede espera na fila, tempo de execução e vazão.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agents import analyze_topic, build_agents, generate_validated, get_specialist_analysis, review_question
+from batch import DEFAULT_CONCURRENCY, get_concurrency_limits
+from instrumentation import UsageTracker
+from llm_config import LLMFactory
+from question_bank import QuestionBank
+from question_model import Questao
+
+DEFAULT_REVIEW_CONCURRENCY = 2
+# Novas gerações de uma questão reprovada pelo revisor antes de desistir dela
+MAX_REVIEW_ROUNDS = 2
+
+STAGES = ("geracao", "revisao")
+
+class StageMetrics:
+    """Espera na fila e tempo de execução dos itens de um estágio"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.items = 0
+        self.busy_s = 0.0
+        self.waits = deque(maxlen=10000)
+        self.runs = deque(maxlen=10000)
+
+    def record(self, wait_s: float, run_s: float):
+        self.items += 1
+        self.busy_s += run_s
+        self.waits.append(wait_s)
+        self.runs.append(run_s)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """Vazão, ocupação dos workers e p50/p95 de espera e execução"""
+        def percentile(values, fraction):
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3) if ordered else 0.0
+
+        return {
+            "itens": self.items,
+            "vazao_por_min": round(self.items / elapsed * 60, 2) if elapsed else 0.0,
+            "ocupacao": round(self.busy_s / (elapsed * self.workers), 2) if elapsed else 0.0,
+            "espera_p50_s": percentile(self.waits, 0.5),
+            "execucao_p50_s": percentile(self.runs, 0.5),
+            "execucao_p95_s": percentile(self.runs, 0.95),
+        }
+
+def _timed(fn: Callable, *args: Any) -> Tuple[Any, Optional[Exception], float, float]:
+    """Executa fn no worker e devolve (resultado, erro, início, fim)"""
+    start = time.perf_counter()
+    try:
+        return fn(*args), None, start, time.perf_counter()
+    except Exception as e:
+        return None, e, start, time.perf_counter()
+
+class ReviewPipeline:
+    """Pipeline geração → revisão com pools e métricas por estágio"""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, review_concurrency: int = DEFAULT_REVIEW_CONCURRENCY,
+                 cache=None, tracker: Optional[UsageTracker] = None, dedup=None,
+                 bank: Optional[QuestionBank] = None, max_rounds: int = MAX_REVIEW_ROUNDS, servida: bool = False):
+        """
+        Args:
+            concurrency: Gerações simultâneas por provider (BATCH_CONCURRENCY_<PROVIDER> sobrescreve)
+            review_concurrency: Revisões simultâneas
+            cache: SpecialistCache opcional
+            tracker: UsageTracker opcional
+            dedup: QuestionDedupIndex opcional
+            bank: Banco onde as questões aprovadas são guardadas
+            max_rounds: Regenerações de uma questão reprovada antes de desistir dela
+            servida: Se as questões aprovadas são entregues a quem pediu (modo único) em vez de
+                ficarem no banco como estoque
+        """
+        self.concurrency = concurrency
+        self.review_concurrency = max(1, review_concurrency)
+        self.cache = cache
+        self.tracker = tracker
+        self.dedup = dedup
+        self.bank = bank
+        self.max_rounds = max_rounds
+        self.servida = servida
+        self.metrics: Dict[str, StageMetrics] = {}
+        self.approved = 0
+        self.rejections = 0
+        self.elapsed = 0.0
+
+    def _generate(self, llm, job: Dict[str, Any], state: Dict[str, Any]) -> Questao:
+        """Estágio de geração: especialista (uma vez por job) e gerador"""
+        prova, tema, nivel, area = job["prova"], job["tema"], job["nivel"], job["area"]
+        if state["agentes"] is None:
+            llms = state["tracker"].instrument(llm) if state["tracker"] is not None else None
+            state["agentes"] = build_agents(llm, prova, tema, nivel, area, verbose=False, llms=llms)
+        if state["analise"] is None:
+            if self.cache is not None:
+                state["analise"] = get_specialist_analysis(llm, prova, tema, nivel, area, self.cache,
+                                                           verbose=False, agentes=state["agentes"])
+            else:
+                state["analise"] = analyze_topic(llm, prova, tema, nivel, area, verbose=False, agentes=state["agentes"])
+        return generate_validated(llm, prova, tema, nivel, area, state["analise"], self.dedup, verbose=False,
+                                  agentes=state["agentes"], revisao=state["revisao"])
+
+    def _review(self, llm, questao: Questao, state: Dict[str, Any]) -> Tuple[bool, str]:
+        """Estágio de revisão"""
+        return review_question(llm, questao, verbose=False, agentes=state["agentes"])
+
+    def _discard(self, job: Dict[str, Any], state: Dict[str, Any]):
+        """Tira do índice de duplicatas a questão que não passou pela revisão"""
+        if self.dedup is not None and state["questao"] is not None:
+            questao = state["questao"]
+            self.dedup.discard(questao.enunciado, list(questao.alternativas.values()), job["prova"])
+
+    def _finish(self, llm, job: Dict[str, Any], state: Dict[str, Any], error: Optional[str] = None) -> Dict[str, Any]:
+        """Monta o registro final do job e guarda no banco as questões aprovadas"""
+        record = dict(job)
+        record["duracao_s"] = round(time.perf_counter() - state["inicio"], 3)
+        record["revisao"] = {"rodadas": state["rodada"] + 1, "motivos": state["motivos"]}
+        if error is not None:
+            record["status"] = "erro"
+            record["erro"] = error
+            return record
+
+        questao = state["questao"]
+        record["status"] = "ok"
+        record["questao"] = questao.model_dump(include={"enunciado", "alternativas", "resposta_correta", "justificativa"})
+        record["resultado"] = str(questao)
+        if self.bank is not None:
+            usage = state["tracker"].totals()
+            provider, model = LLMFactory.describe_llm(llm)
+            self.bank.add(questao, servida=self.servida, provider=usage["provider"] or provider,
+                          modelo=usage["modelo"] or model,
+                          prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"],
+                          custo_usd=usage["custo_usd"], latencia_s=record["duracao_s"])
+        return record
+
+    def run(self, jobs: List[Dict[str, Any]], llms: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Executa os jobs pelo pipeline e entrega cada resultado assim que é aprovado (ou desiste)
+
+        Args:
+            jobs: Lista retornada por batch.expand_jobs
+            llms: LLM por provider (padrão: um LLMFactory.create_llm por provider dos jobs)
+
+        Yields:
+            Registros de resultado na ordem de conclusão, com o histórico da revisão
+        """
+        providers = sorted({job["provider"] for job in jobs})
+        limits = get_concurrency_limits(providers, self.concurrency)
+        # LLMs criados aqui são encerrados ao final; os recebidos ficam com o chamador
+        owned = {} if llms else {provider: LLMFactory.create_llm(provider) for provider in providers}
+        llms = llms or owned
+        generators = {
+            provider: ThreadPoolExecutor(max_workers=limits[provider], thread_name_prefix=f"geracao-{provider}")
+            for provider in providers
+        }
+        reviewers = ThreadPoolExecutor(max_workers=self.review_concurrency, thread_name_prefix="revisao")
+        self.metrics = {"geracao": StageMetrics(sum(limits.values())), "revisao": StageMetrics(self.review_concurrency)}
+        pending: Dict[Future, Tuple[str, Dict[str, Any], Dict[str, Any], float]] = {}
+
+        def submit(stage: str, job: Dict[str, Any], state: Dict[str, Any]):
+            llm = llms[job["provider"]]
+            submitted_at = time.perf_counter()
+            if stage == "geracao":
+                future = generators[job["provider"]].submit(_timed, self._generate, llm, job, state)
+            else:
+                future = reviewers.submit(_timed, self._review, llm, state["questao"], state)
+            pending[future] = (stage, job, state, submitted_at)
+
+        start = time.perf_counter()
+        try:
+            for job in jobs:
+                # Com banco, cada job tem seu tracker (repassando ao do pipeline) para saber os tokens da questão
+                tracker = UsageTracker(parent=self.tracker) if self.bank is not None else self.tracker
+                submit("geracao", job, {"inicio": time.perf_counter(), "agentes": None, "analise": None,
+                                        "revisao": None, "questao": None, "rodada": 0, "motivos": [],
+                                        "tracker": tracker})
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, job, state, submitted_at = pending.pop(future)
+                    result, error, started_at, finished_at = future.result()
+                    self.metrics[stage].record(started_at - submitted_at, finished_at - started_at)
+                    llm = llms[job["provider"]]
+
+                    if error is not None:
+                        if stage == "revisao":
+                            self._discard(job, state)
+                        yield self._finish(llm, job, state, error=str(error))
+                    elif stage == "geracao":
+                        state["questao"] = result
+                        submit("revisao", job, state)
+                    else:
+                        aprovada, motivo = result
+                        if aprovada:
+                            self.approved += 1
+                            yield self._finish(llm, job, state)
+                            continue
+                        self.rejections += 1
+                        state["motivos"].append(motivo)
+                        # A versão corrigida seria barrada como duplicata da reprovada
+                        self._discard(job, state)
+                        if state["rodada"] >= self.max_rounds:
+                            yield self._finish(llm, job, state,
+                                               error=f"Reprovada pelo revisor após {state['rodada'] + 1} tentativas: {motivo}")
+                            continue
+                        state["rodada"] += 1
+                        state["revisao"] = (state["questao"].to_text(), motivo)
+                        submit("geracao", job, state)
+        finally:
+            self.elapsed = time.perf_counter() - start
+            for executor in list(generators.values()) + [reviewers]:
+                executor.shutdown(wait=False, cancel_futures=True)
+            for llm in owned.values():
+                LLMFactory.close_llm(llm)
+
+    def print_summary(self):
+        """Imprime vazão e latência de cada estágio"""
+        if not self.metrics:
+            return
+        print(f"🧑‍🏫 Revisão: {self.approved} aprovadas, {self.rejections} reprovações devolvidas ao gerador")
+        print(f"{'Estágio':<10}{'Itens':>7}{'Vazão/min':>11}{'Ocupação':>10}{'Fila p50':>10}{'Exec p50':>10}{'Exec p95':>10}")
+        for stage in STAGES:
+            row = self.metrics[stage].summary(self.elapsed)
+            print(f"{stage:<10}{row['itens']:>7}{row['vazao_por_min']:>11}{row['ocupacao']:>10.0%}"
+                  f"{row['espera_p50_s']:>9}s{row['execucao_p50_s']:>9}s{row['execucao_p95_s']:>9}s")
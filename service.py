@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Serviço HTTP local de geração de questões, com clientes de LLM aquecidos
+
+Imports, .env, LLMs (e seus pools de conexão HTTP) são inicializados uma única vez.
+Cada requisição entra numa fila atendida por um pool de workers; a resposta traz a
+latência separada em fila, especialista e gerador. Com --from-bank, os pedidos são
+atendidos primeiro pelo banco de questões, que é reabastecido em segundo plano.
+
+Uso:
+    python service.py --port 8000 --workers 8
+    python service.py --port 8000 --from-bank --stock 10
+
+    curl -X POST localhost:8000/questoes \\
+         -d '{"prova": "CPA-20", "tema": "Mercado Financeiro", "nivel": "Dificil", "area": "Finanças"}'
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm_config import LLMConfig, LLMFactory, LLMProvider
+from llm_router import ProviderUnavailableError, get_status_code, is_failover_error
+from agents import ENGINES, build_agents, analyze_topic, generate_questions, generate_validated, get_specialist_analysis
+from prompt_budget import prompt_budget_stats
+from question_bank import QuestionBank
+from question_dedup import QuestionDedupIndex
+from question_model import Questao
+from question_serving import RestockWorker
+from specialist_cache import SpecialistCache
+
+REQUIRED_FIELDS = ("prova", "tema", "nivel", "area")
+PHASES = ("fila_s", "especialista_s", "gerador_s", "banco_s", "total_s")
+
+# Providers aceitos no campo "provider" da requisição
+PROVIDERS = tuple(LLMConfig.DEFAULT_CONFIGS) + (LLMProvider.ROUTER,)
+
+# Agentes guardados por thread de worker (Agent não é compartilhado entre threads)
+MAX_AGENT_SETS_PER_WORKER = 64
+
+def request_error(request: Any) -> Optional[str]:
+    """
+    Problema no corpo da requisição, verificado antes de enfileirar a geração
+
+    Returns:
+        Mensagem para a resposta 400, ou None se a requisição for válida
+    """
+    if not isinstance(request, dict):
+        return "O corpo deve ser um objeto JSON"
+    missing = [field for field in REQUIRED_FIELDS if not str(request.get(field) or "").strip()]
+    if missing:
+        return f"Campos obrigatórios ausentes: {', '.join(missing)}"
+    provider = request.get("provider")
+    if provider is not None and (not isinstance(provider, str) or provider.lower() not in PROVIDERS):
+        return f"Provider desconhecido: {provider} (use um de: {', '.join(PROVIDERS)})"
+    return None
+
+def error_status(error: Exception) -> int:
+    """Status HTTP de uma falha na geração: 502 se o provider falhou, 500 nos demais casos"""
+    if isinstance(error, ProviderUnavailableError) or get_status_code(error) is not None or is_failover_error(error):
+        return 502
+    return 500
+
+class QuestionService:
+    """Mantém LLMs, agentes e caches vivos entre requisições"""
+
+    def __init__(self, default_provider: str, workers: int = 4, verbose: bool = False, from_bank: bool = False):
+        """
+        Args:
+            default_provider: Provider usado quando a requisição não informa um
+            workers: Número de gerações simultâneas
+            verbose: Se os agentes devem imprimir o passo a passo
+            from_bank: Atende pelo banco de questões antes de gerar, com reabastecimento em segundo plano
+        """
+        self.default_provider = default_provider
+        self.verbose = verbose
+        self.cache = SpecialistCache.from_env()
+        self.dedup = QuestionDedupIndex.from_env()
+        self.bank = QuestionBank.from_env()
+        self.from_bank = from_bank and self.bank is not None
+        self.restock: Optional[RestockWorker] = None
+        if self.from_bank:
+            self.restock = RestockWorker.from_env(self.bank, self._restock_generate)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="questoes")
+        self._llms: Dict[str, Any] = {}
+        self._llms_lock = threading.Lock()
+        self._local = threading.local()
+        self._latencies = {phase: deque(maxlen=1000) for phase in PHASES}
+        self._metrics_lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+
+        # Aquecer o provider padrão já na inicialização
+        self.get_llm(default_provider)
+
+    def close(self):
+        """Encerra a fila, o reabastecimento, os pools do roteamento e o banco"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.restock is not None:
+            self.restock.stop()
+        with self._llms_lock:
+            llms, self._llms = list(self._llms.values()), {}
+        for llm in llms:
+            LLMFactory.close_llm(llm)
+        if self.bank is not None:
+            self.bank.close()
+
+    def get_llm(self, provider: str):
+        """Retorna o LLM do provider, criando-o (e seu pool de conexões) uma única vez"""
+        with self._llms_lock:
+            if provider not in self._llms:
+                self._llms[provider] = LLMFactory.create_llm(provider)
+            return self._llms[provider]
+
+    def _get_agents(self, provider: str, llm, prova: str, tema: str, nivel: str, area: str):
+        """Agentes da combinação, reaproveitados dentro da mesma thread de worker (LRU)"""
+        agent_sets = getattr(self._local, "agent_sets", None)
+        if agent_sets is None:
+            agent_sets = self._local.agent_sets = OrderedDict()
+
+        key = (provider, prova, tema, nivel, area)
+        if key in agent_sets:
+            agent_sets.move_to_end(key)
+        else:
+            agent_sets[key] = build_agents(llm, prova, tema, nivel, area, verbose=self.verbose)
+            if len(agent_sets) > MAX_AGENT_SETS_PER_WORKER:
+                agent_sets.popitem(last=False)
+        return agent_sets[key]
+
+    def _pipeline(self, provider: str, prova: str, tema: str, nivel: str, area: str) -> Tuple[Questao, float]:
+        """
+        Executa especialista e gerador com os agentes aquecidos
+
+        Returns:
+            Tupla (questao, instante em que a análise do especialista ficou pronta)
+        """
+        llm = self.get_llm(provider)
+        agentes = self._get_agents(provider, llm, prova, tema, nivel, area)
+
+        if self.cache is not None:
+            analise = get_specialist_analysis(llm, prova, tema, nivel, area, self.cache,
+                                              verbose=self.verbose, agentes=agentes)
+        else:
+            analise = analyze_topic(llm, prova, tema, nivel, area, verbose=self.verbose, agentes=agentes)
+        specialist_done = time.perf_counter()
+
+        questao = generate_validated(llm, prova, tema, nivel, area, analise, self.dedup,
+                                     verbose=self.verbose, agentes=agentes)
+        return questao, specialist_done
+
+    def _restock_generate(self, prova: str, tema: str, nivel: str, area: str, quantidade: int) -> List[Questao]:
+        """Geração usada pelo reabastecimento do banco (provider padrão), em grupos da mesma combinação"""
+        llm = self.get_llm(self.default_provider)
+        agentes = self._get_agents(self.default_provider, llm, prova, tema, nivel, area)
+        return generate_questions(llm, prova, tema, nivel, area, quantidade, verbose=self.verbose, cache=self.cache,
+                                  dedup=self.dedup, por_chamada=quantidade, agentes=agentes)[0]
+
+    def _generate(self, request: Dict[str, str], received_at: float) -> Dict[str, Any]:
+        """Executa uma geração dentro do pool, medindo cada fase"""
+        started_at = time.perf_counter()
+        provider = (request.get("provider") or self.default_provider).lower()
+        prova, tema, nivel, area = (request[field] for field in REQUIRED_FIELDS)
+        llm = self.get_llm(provider)
+
+        questao, specialist_done = self._pipeline(provider, prova, tema, nivel, area)
+        finished_at = time.perf_counter()
+
+        latencia = {
+            "fila_s": round(started_at - received_at, 4),
+            "especialista_s": round(specialist_done - started_at, 4),
+            "gerador_s": round(finished_at - specialist_done, 4),
+            "total_s": round(finished_at - received_at, 4),
+        }
+        if self.bank is not None:
+            model = LLMFactory.describe_llm(llm)[1]
+            self.bank.add(questao, servida=True, provider=provider, modelo=model,
+                          latencia_s=round(finished_at - started_at, 4))
+        return {"questao": questao.model_dump(), "resultado": str(questao), "provider": provider,
+                "origem": "gerada", "latencia": latencia}
+
+    def _serve_from_bank(self, request: Dict[str, str], received_at: float) -> Optional[Dict[str, Any]]:
+        """Resposta com uma questão do banco, ou None se a combinação não tiver questão disponível"""
+        prova, tema, nivel, area = (request[field] for field in REQUIRED_FIELDS)
+        questao = self.bank.take(prova, tema, nivel, area)
+        if questao is None:
+            return None
+        elapsed = round(time.perf_counter() - received_at, 4)
+        return {"questao": questao.model_dump(), "resultado": str(questao), "provider": None,
+                "origem": "banco", "latencia": {"banco_s": elapsed, "total_s": elapsed}}
+
+    def submit(self, request: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Enfileira uma requisição e espera o resultado
+
+        Raises:
+            ValueError: Se a requisição for inválida (ver request_error)
+        """
+        problem = request_error(request)
+        if problem:
+            raise ValueError(problem)
+
+        received_at = time.perf_counter()
+        with self._metrics_lock:
+            self.pending += 1
+        try:
+            # Questões do banco saem direto na thread da requisição, sem passar pela fila
+            response = self._serve_from_bank(request, received_at) if self.from_bank else None
+            if response is None:
+                response = self.executor.submit(self._generate, request, received_at).result()
+        except Exception:
+            with self._metrics_lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._metrics_lock:
+                self.pending -= 1
+
+        with self._metrics_lock:
+            self.completed += 1
+            for phase, value in response["latencia"].items():
+                self._latencies[phase].append(value)
+        return response
+
+    def metrics(self) -> Dict[str, Any]:
+        """Contadores e p50/p95 de cada fase nas últimas requisições"""
+        with self._metrics_lock:
+            phases = {}
+            for phase, values in self._latencies.items():
+                ordered = sorted(values)
+                if ordered:
+                    phases[phase] = {
+                        "p50": ordered[len(ordered) // 2],
+                        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    }
+            result = {
+                "pendentes": self.pending,
+                "concluidas": self.completed,
+                "falhas": self.failed,
+                "latencia": phases,
+                "providers_aquecidos": sorted(self._llms),
+            }
+        if self.cache is not None:
+            result["cache_especialista"] = self.cache.stats()
+        if self.dedup is not None:
+            result["duplicatas"] = self.dedup.stats()
+        if self.bank is not None:
+            result["banco"] = self.bank.stats()
+        if self.restock is not None:
+            result["reabastecimento"] = self.restock.stats()
+        result["prompts"] = prompt_budget_stats()
+        return result
+
+def make_handler(service: QuestionService):
+    """Cria a classe de handler HTTP ligada ao serviço"""
+
+    class QuestionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path in ("/saude", "/health"):
+                self._send_json(200, {"status": "ok"})
+            elif self.path in ("/metricas", "/metrics"):
+                self._send_json(200, service.metrics())
+            else:
+                self._send_json(404, {"erro": "Rota não encontrada"})
+
+        def do_POST(self):
+            if self.path != "/questoes":
+                self._send_json(404, {"erro": "Rota não encontrada"})
+                return
+            # Só o corpo é erro do cliente (400); falhas da geração, já enfileirada, são 500/502
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                self._send_json(400, {"erro": f"JSON inválido: {e}"})
+                return
+            problem = request_error(request)
+            if problem:
+                self._send_json(400, {"erro": problem})
+                return
+            try:
+                self._send_json(200, service.submit(request))
+            except Exception as e:
+                self._send_json(error_status(e), {"erro": str(e)})
+
+        def log_message(self, format: str, *args: Any):
+            if service.verbose:
+                super().log_message(format, *args)
+
+    return QuestionHandler
+
+def serve(host: str = "127.0.0.1", port: int = 8000, workers: int = 4, provider: Optional[str] = None,
+          verbose: bool = False, from_bank: bool = False):
+    """Inicia o serviço e atende requisições até Ctrl+C"""
+    provider = (provider or os.getenv("PREFERRED_LLM_PROVIDER") or LLMProvider.ROUTER).lower()
+
+    print("🚀 Aquecendo LLMs e caches...")
+    service = QuestionService(provider, workers=workers, verbose=verbose, from_bank=from_bank)
+    if service.restock is not None:
+        service.restock.start()
+        print(f"📦 Atendendo pelo banco de questões (estoque de {service.restock.stock} por combinação)")
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+
+    print(f"✅ Serviço de questões em http://{host}:{port} (provider: {provider}, workers: {workers})")
+    print("   POST /questoes | GET /metricas | GET /saude")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Encerrando serviço...")
+    finally:
+        server.server_close()
+        service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP de geração de questões")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="Gerações simultâneas (padrão: 4)")
+    parser.add_argument("--provider", help="Provider padrão (padrão: PREFERRED_LLM_PROVIDER ou router)")
+    parser.add_argument("--verbose", action="store_true", help="Exibe o passo a passo dos agentes")
+    parser.add_argument("--from-bank", action="store_true",
+                        help="Atende pelo banco de questões antes de gerar e mantém um estoque das combinações mais pedidas")
+    parser.add_argument("--stock", type=int, help="Questões disponíveis por combinação (padrão: BANK_STOCK ou 5)")
+    parser.add_argument("--engine", choices=ENGINES,
+                        help="crew (CrewAI) ou direct (uma chamada ao LLM por tarefa) (padrão: PIPELINE_ENGINE ou crew)")
+    args = parser.parse_args()
+    if args.stock is not None:
+        os.environ["BANK_STOCK"] = str(args.stock)
+    if args.engine:
+        os.environ["PIPELINE_ENGINE"] = args.engine
+    serve(args.host, args.port, args.workers, args.provider, args.verbose, from_bank=args.from_bank)
+
+if __name__ == "__main__":
+    main()
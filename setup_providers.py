@@ -1,13 +1,133 @@
 #!/usr/bin/env python3
 """
 Script utilitário para configurar e testar providers de LLM
+
+Benchmark dos providers/modelos configurados (TTFT, tokens/s, latência, falhas e custo
+por questão válida), com relatório que pode gravar o melhor no .env:
+    python setup_providers.py --benchmark --runs 8 --output benchmark_providers.json
+    python setup_providers.py --benchmark --providers groq,openai --apply
+    python setup_providers.py --benchmark --standin   # servidor local compatível com a OpenAI
+
+Instalação não interativa (uma única resolução do pip para todos os pacotes; os que já
+estão instalados numa versão compatível são pulados):
+    python setup_providers.py --install all --constraints constraints.txt
+    python setup_providers.py --download-wheelhouse wheels/ --install all   # prepara o modo offline
+    python setup_providers.py --install groq,anthropic --wheelhouse wheels/   # sem rede
 """
 
+import argparse
+import importlib
+import importlib.metadata
+import json
+import math
 import subprocess
 import sys
 import os
-from typing import Dict, List
-from llm_config import LLMFactory, LLMProvider
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from llm_config import LLMConfig, LLMFactory, LLMProvider
+
+# Pacotes dos providers opcionais, com as versões mínimas do requirements.txt
+PROVIDER_PACKAGES = {
+    LLMProvider.ANTHROPIC: "langchain-anthropic>=0.1.15",
+    LLMProvider.GOOGLE: "langchain-google-genai>=1.0.3",
+    LLMProvider.GROQ: "langchain-groq>=0.1.5",
+    LLMProvider.HUGGINGFACE: "langchain-huggingface>=0.0.3",
+}
+
+def _packaging():
+    """Módulos requirements e utils do packaging (ou da cópia que acompanha o pip)"""
+    try:
+        from packaging import requirements, utils
+    except ImportError:
+        from pip._vendor.packaging import requirements, utils
+    return requirements, utils
+
+def read_constraints(path: Optional[str]) -> Dict[str, Any]:
+    """
+    Lê um arquivo de constraints/lock do pip (linhas como `pacote==1.2.3`)
+
+    Returns:
+        Dict nome normalizado → SpecifierSet; opções do pip (-r, --hash...) são ignoradas
+    """
+    if not path:
+        return {}
+    requirements, utils = _packaging()
+    pins = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].split(" --hash", 1)[0].strip()
+            if not line or line.startswith("-"):
+                continue
+            requirement = requirements.Requirement(line)
+            pins[utils.canonicalize_name(requirement.name)] = requirement.specifier
+    return pins
+
+def is_satisfied(package: str, pins: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Verifica pelo importlib.metadata se o pacote já está instalado numa versão que atende
+    ao requisito e ao constraint (sem importar o pacote nem chamar o pip)
+    """
+    requirements, utils = _packaging()
+    requirement = requirements.Requirement(package)
+    try:
+        version = importlib.metadata.version(requirement.name)
+    except importlib.metadata.PackageNotFoundError:
+        return False
+    specifier = requirement.specifier
+    pin = (pins or {}).get(utils.canonicalize_name(requirement.name))
+    if pin is not None:
+        specifier = specifier & pin
+    return specifier.contains(version, prereleases=True)
+
+def _pip(args: List[str]) -> bool:
+    """Executa o pip no interpretador atual, mostrando o fim da saída de erro se falhar"""
+    try:
+        subprocess.run([sys.executable, "-m", "pip", "--disable-pip-version-check"] + args,
+                       capture_output=True, text=True, check=True)
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"❌ pip falhou (código {e.returncode}):\n{(e.stderr or e.stdout or '')[-2000:]}")
+        return False
+
+def install_packages(packages: List[str], constraints: Optional[str] = None,
+                     wheelhouse: Optional[str] = None) -> bool:
+    """
+    Instala vários pacotes numa única execução do pip (uma só resolução de dependências)
+
+    Args:
+        packages: Requisitos (ex: "langchain-groq>=0.1.5")
+        constraints: Arquivo de constraints/lock (padrão: PROVIDER_CONSTRAINTS)
+        wheelhouse: Diretório de wheels para instalar sem rede (padrão: PROVIDER_WHEELHOUSE)
+
+    Returns:
+        True se tudo ficou instalado
+    """
+    constraints = constraints or os.getenv("PROVIDER_CONSTRAINTS")
+    wheelhouse = wheelhouse or os.getenv("PROVIDER_WHEELHOUSE")
+    pins = read_constraints(constraints)
+
+    pending = [package for package in packages if not is_satisfied(package, pins)]
+    for package in packages:
+        if package not in pending:
+            print(f"⏭️ {package} já instalado")
+    if not pending:
+        return True
+
+    args = ["install"] + pending
+    if constraints:
+        args += ["-c", constraints]
+    if wheelhouse:
+        args += ["--no-index", "--find-links", wheelhouse]
+    print(f"📦 Instalando {', '.join(pending)}...")
+    if not _pip(args):
+        return False
+    # O processo atual passa a enxergar os pacotes recém-instalados
+    importlib.invalidate_caches()
+    print(f"✅ {len(pending)} pacote(s) instalado(s) com sucesso!")
+    return True
 
 def install_package(package_name: str) -> bool:
     """
@@ -19,28 +139,32 @@ def install_package(package_name: str) -> bool:
     Returns:
         True se instalação foi bem-sucedida
     """
-    try:
-        print(f"📦 Instalando {package_name}...")
-        result = subprocess.run(
-            [sys.executable, "-m", "pip", "install", package_name],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print(f"✅ {package_name} instalado com sucesso!")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Erro ao instalar {package_name}: {e}")
-        return False
+    return install_packages([package_name])
+
+def download_wheelhouse(packages: List[str], wheelhouse: str, constraints: Optional[str] = None) -> bool:
+    """Baixa as wheels dos pacotes (e dependências) para instalar depois sem rede"""
+    constraints = constraints or os.getenv("PROVIDER_CONSTRAINTS")
+    args = ["download", "--dest", wheelhouse] + packages
+    if constraints:
+        args += ["-c", constraints]
+    print(f"📥 Baixando wheels para {wheelhouse}...")
+    return _pip(args)
+
+def provider_requirements(selection: str) -> List[str]:
+    """Requisitos dos providers escolhidos ("all" ou lista separada por vírgula)"""
+    if selection.strip().lower() == "all":
+        return list(PROVIDER_PACKAGES.values())
+    requirements = []
+    for provider in (item.strip().lower() for item in selection.split(",") if item.strip()):
+        if provider not in PROVIDER_PACKAGES:
+            raise ValueError(f"Provider '{provider}' não tem pacote opcional. "
+                             f"Opções: {', '.join(PROVIDER_PACKAGES)}")
+        requirements.append(PROVIDER_PACKAGES[provider])
+    return requirements
 
 def setup_provider_installation():
     """Interface para instalar providers específicos"""
-    provider_packages = {
-        LLMProvider.ANTHROPIC: "langchain-anthropic",
-        LLMProvider.GOOGLE: "langchain-google-genai", 
-        LLMProvider.GROQ: "langchain-groq",
-        LLMProvider.HUGGINGFACE: "langchain-huggingface"
-    }
+    provider_packages = PROVIDER_PACKAGES
     
     print("🚀 Instalador de Providers de LLM")
     print("=" * 50)
@@ -74,10 +198,8 @@ def setup_provider_installation():
         choice = input("\n> Escolha uma opção: ").strip()
         
         if choice == "0":
-            # Instalar todos
-            for provider, package in provider_packages.items():
-                if not available[provider]:
-                    install_package(package)
+            # Instalar todos, numa única resolução do pip
+            install_packages([package for provider, package in options])
         elif choice.isdigit():
             choice_idx = int(choice) - 1
             if 0 <= choice_idx < len(options):
@@ -132,6 +254,294 @@ def test_provider_connection():
         except Exception as e:
             print(f"  ❌ Erro na configuração: {e}")
 
+# Combinações (prova, tema, nível, área) do benchmark, repetidas em ordem até completar as execuções
+BENCHMARK_PROMPTS = [
+    ("CPA-20", "Renda Fixa", "Intermediário", "Mercado Financeiro"),
+    ("CPA-20", "Fundos de Investimento", "Difícil", "Mercado Financeiro"),
+    ("CEA", "Previdência Complementar", "Intermediário", "Planejamento Financeiro"),
+    ("CPA-10", "Tributação de Investimentos", "Fácil", "Mercado Financeiro"),
+]
+DEFAULT_BENCHMARK_RUNS = 4
+DEFAULT_BENCHMARK_OUTPUT = "benchmark_providers.json"
+# Taxa de falha acima da qual um modelo não é recomendado
+MAX_RECOMMENDED_FAILURE_RATE = 0.2
+
+def benchmark_prompt(prova: str, tema: str, nivel: str, area: str) -> str:
+    """Prompt de geração de uma questão, no formato que parse_question aceita"""
+    return f"""Você é um especialista em avaliação educacional na área de '{area}'.
+Crie uma questão de múltipla escolha de nível {nivel} sobre o tema '{tema}' para a prova {prova},
+seguindo exatamente este formato:
+
+QUESTÃO: [Enunciado claro e objetivo]
+
+A) [Alternativa 1]
+B) [Alternativa 2]
+C) [Alternativa 3]
+D) [Alternativa 4]
+
+RESPOSTA CORRETA: [Letra e justificativa]"""
+
+def _chunk_text(chunk: Any) -> str:
+    """Texto de um pedaço do stream (chat models devolvem mensagens; LLMs de texto, strings)"""
+    if isinstance(chunk, str):
+        return chunk
+    content = getattr(chunk, "content", "")
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))], 3)
+
+def measure_generation(llm, prompt: str) -> Dict[str, Any]:
+    """
+    Executa uma geração em streaming medindo o tempo até o primeiro token e a velocidade
+
+    Returns:
+        Dict com texto, ttft_s, latencia_s, tokens_por_s, prompt_tokens, completion_tokens e
+        tokens_estimados (o provider não informou o uso no stream)
+    """
+    start = time.perf_counter()
+    first_token = None
+    parts = []
+    prompt_tokens = completion_tokens = 0
+    for chunk in llm.stream(prompt):
+        text = _chunk_text(chunk)
+        if text and first_token is None:
+            first_token = time.perf_counter()
+        parts.append(text)
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage:
+            prompt_tokens += int(usage.get("input_tokens", 0))
+            completion_tokens += int(usage.get("output_tokens", 0))
+    end = time.perf_counter()
+
+    text = "".join(parts)
+    estimated = not completion_tokens
+    if estimated:
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(text) // 4
+    first_token = first_token or end
+    generation_s = end - first_token
+    return {
+        "texto": text,
+        "ttft_s": first_token - start,
+        "latencia_s": end - start,
+        "tokens_por_s": completion_tokens / generation_s if generation_s > 0 else None,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "tokens_estimados": estimated,
+    }
+
+def benchmark_model(provider: str, model: str, runs: int = DEFAULT_BENCHMARK_RUNS) -> Dict[str, Any]:
+    """
+    Executa o conjunto fixo de prompts num provider/modelo
+
+    Returns:
+        Linha do relatório: chamadas, falhas, questões inválidas e válidas, TTFT, tokens/s,
+        latência p50/p95/máx, custo total e custo por questão válida
+    """
+    from instrumentation import estimate_cost
+    from question_model import QuestionValidationError, parse_question
+
+    row = {"provider": provider, "modelo": model, "chamadas": runs, "falhas": 0, "invalidas": 0, "validas": 0,
+           "erro": None}
+    model_key = "repo_id" if "repo_id" in LLMConfig.DEFAULT_CONFIGS.get(provider, {}) else "model"
+    try:
+        # Sem cache de respostas: toda execução precisa chegar ao provider
+        llm = LLMFactory.create_llm(provider, {model_key: model, "cache": False})
+    except Exception as e:
+        row.update(falhas=runs, erro=str(e), taxa_falha=1.0)
+        return row
+
+    measurements = []
+    costs = []
+    for index in range(runs):
+        prova, tema, nivel, area = BENCHMARK_PROMPTS[index % len(BENCHMARK_PROMPTS)]
+        try:
+            measurement = measure_generation(llm, benchmark_prompt(prova, tema, nivel, area))
+        except Exception as e:
+            row["falhas"] += 1
+            row["erro"] = row["erro"] or str(e)[:200]
+            continue
+        measurements.append(measurement)
+        costs.append(estimate_cost(provider, model, measurement["prompt_tokens"], measurement["completion_tokens"]))
+        try:
+            parse_question(measurement["texto"], prova, tema, nivel, area)
+            row["validas"] += 1
+        except QuestionValidationError:
+            row["invalidas"] += 1
+
+    cost = None if not costs or any(value is None for value in costs) else sum(costs)
+    speeds = [m["tokens_por_s"] for m in measurements if m["tokens_por_s"] is not None]
+    latencies = [m["latencia_s"] for m in measurements]
+    row.update({
+        "taxa_falha": round(row["falhas"] / runs, 3) if runs else 0.0,
+        "ttft_p50_s": _percentile([m["ttft_s"] for m in measurements], 0.5),
+        "tokens_por_s_p50": _percentile(speeds, 0.5),
+        "latencia_p50_s": _percentile(latencies, 0.5),
+        "latencia_p95_s": _percentile(latencies, 0.95),
+        "latencia_max_s": round(max(latencies), 3) if latencies else None,
+        "custo_usd": round(cost, 6) if cost is not None else None,
+        "custo_por_questao_valida": round(cost / row["validas"], 6) if cost is not None and row["validas"] else None,
+        "tokens_estimados": any(m["tokens_estimados"] for m in measurements),
+    })
+    return row
+
+def benchmark_targets(providers: Optional[List[str]] = None, models: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    """
+    Pares (provider, modelo) a medir: os modelos de get_provider_info() de cada provider
+
+    Args:
+        providers: Providers a medir (padrão: instalados e com API key)
+        models: Restringe aos modelos listados
+    """
+    provider_info = LLMFactory.get_provider_info()
+    targets = []
+    for provider in providers or LLMFactory.get_configured_providers():
+        default = LLMConfig.DEFAULT_CONFIGS.get(provider, {})
+        provider_models = provider_info.get(provider, {}).get("models") or [default.get("model") or default.get("repo_id")]
+        for model in provider_models:
+            if not models or model in models:
+                targets.append((provider, model))
+    return targets
+
+def recommend(rows: List[Dict[str, Any]], max_failure_rate: float = MAX_RECOMMENDED_FAILURE_RATE) -> Dict[str, Any]:
+    """
+    Escolhe o melhor provider/modelo: mais questões válidas, depois menor custo por questão
+    válida e menor latência p50; só entram modelos com taxa de falha até max_failure_rate
+
+    Returns:
+        Dict com provider, modelo e modelos (melhor modelo de cada provider); vazio se nenhum servir
+    """
+    def key(row):
+        cost = row.get("custo_por_questao_valida")
+        return (-row["validas"] / row["chamadas"], cost if cost is not None else math.inf,
+                row.get("latencia_p50_s") or math.inf)
+
+    eligible = sorted((row for row in rows if row["validas"] and row.get("taxa_falha", 1.0) <= max_failure_rate), key=key)
+    if not eligible:
+        return {}
+    best_per_provider = {}
+    for row in eligible:
+        best_per_provider.setdefault(row["provider"], row["modelo"])
+    return {"provider": eligible[0]["provider"], "modelo": eligible[0]["modelo"], "modelos": best_per_provider}
+
+def print_benchmark_report(rows: List[Dict[str, Any]], recommendation: Dict[str, Any]):
+    """Imprime a tabela comparativa e a recomendação"""
+    def fmt(value, suffix=""):
+        return "-" if value is None else f"{value}{suffix}"
+
+    print(f"\n{'Provider/modelo':<40}{'Válidas':>9}{'Falhas':>8}{'TTFT p50':>10}{'Tok/s':>8}"
+          f"{'Lat p50':>9}{'Lat p95':>9}{'US$/questão':>13}")
+    for row in rows:
+        print(f"{row['provider'] + '/' + row['modelo']:<40}{row['validas']:>4}/{row['chamadas']:<4}"
+              f"{row['taxa_falha']:>8.0%}{fmt(row.get('ttft_p50_s'), 's'):>10}{fmt(row.get('tokens_por_s_p50')):>8}"
+              f"{fmt(row.get('latencia_p50_s'), 's'):>9}{fmt(row.get('latencia_p95_s'), 's'):>9}"
+              f"{fmt(row.get('custo_por_questao_valida')):>13}")
+        if row["erro"]:
+            print(f"   ⚠️ {row['erro']}")
+    if recommendation:
+        print(f"\n🏆 Recomendado: {recommendation['provider']} / {recommendation['modelo']}")
+    else:
+        print("\n❌ Nenhum modelo gerou questões válidas com taxa de falha aceitável")
+
+def apply_recommendation(recommendation: Dict[str, Any], env_path: str = ".env"):
+    """Grava PREFERRED_LLM_PROVIDER e <PROVIDER>_MODEL (melhor modelo de cada provider) no .env"""
+    values = {"PREFERRED_LLM_PROVIDER": recommendation["provider"]}
+    for provider, model in recommendation["modelos"].items():
+        values[f"{provider.upper()}_MODEL"] = model
+
+    lines = []
+    if os.path.exists(env_path):
+        with open(env_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    for name, value in values.items():
+        entry = f"{name}={value}"
+        for index, line in enumerate(lines):
+            if line.split("=", 1)[0].strip().lstrip("# ").strip() == name:
+                lines[index] = entry
+                break
+        else:
+            lines.append(entry)
+    with open(env_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"📝 {env_path} atualizado: " + ", ".join(f"{name}={value}" for name, value in values.items()))
+
+def start_standin_server():
+    """
+    Sobe em segundo plano o provider fake numa API compatível com a da OpenAI e aponta
+    OPENAI_BASE_URL para ele
+
+    Returns:
+        Tupla (servidor, modelo servido)
+    """
+    from fake_llm import FakeChatModel, serve_openai_compatible
+
+    config = LLMConfig.DEFAULT_CONFIGS[LLMProvider.FAKE]
+    model = FakeChatModel(model_name=config["model"], temperature=config["temperature"], latency_s=config["latency_s"],
+                          tokens_per_s=config["tokens_per_s"], error_rate=config["error_rate"],
+                          error_kind=config["error_kind"], seed=config["seed"],
+                          max_concurrency=config["max_concurrency"])
+    server = serve_openai_compatible(model, port=0)
+    threading.Thread(target=server.serve_forever, name="servidor-standin", daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "local")
+    print(f"🧪 Servidor local em {os.environ['OPENAI_BASE_URL']}")
+    return server, config["model"]
+
+def run_benchmark(providers: Optional[List[str]] = None, models: Optional[List[str]] = None,
+                  runs: int = DEFAULT_BENCHMARK_RUNS, output: Optional[str] = DEFAULT_BENCHMARK_OUTPUT,
+                  apply: bool = False, standin: bool = False) -> Dict[str, Any]:
+    """
+    Mede os providers/modelos, imprime a comparação e grava o relatório JSON
+
+    Args:
+        providers: Providers a medir (padrão: instalados e com API key)
+        models: Restringe aos modelos listados
+        runs: Gerações por modelo
+        output: Caminho do relatório JSON (None para não gravar)
+        apply: Grava a recomendação no .env
+        standin: Mede o provider openai contra o servidor local do fake_llm.py
+
+    Returns:
+        Relatório (resultados e recomendação)
+    """
+    server = None
+    if standin:
+        server, standin_model = start_standin_server()
+        targets = [(LLMProvider.OPENAI, standin_model)]
+    else:
+        targets = benchmark_targets(providers, models)
+    if not targets:
+        print("❌ Nenhum provider configurado para o benchmark")
+        return {}
+
+    print(f"📊 Benchmark: {len(targets)} modelos × {runs} gerações")
+    rows = []
+    try:
+        for provider, model in targets:
+            print(f"🔍 {provider}/{model}...")
+            rows.append(benchmark_model(provider, model, runs))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    recommendation = recommend(rows)
+    print_benchmark_report(rows, recommendation)
+    report = {"gerado_em": datetime.now().isoformat(timespec="seconds"), "geracoes_por_modelo": runs,
+              "resultados": rows, "recomendacao": recommendation}
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Relatório gravado em {output}")
+    if apply and recommendation and not standin:
+        apply_recommendation(recommendation)
+    return report
+
 def show_provider_info():
     """Mostra informações detalhadas sobre todos os providers"""
     print("📖 Informações dos Providers")
@@ -180,7 +590,43 @@ OPENAI_API_KEY=sua-chave-openai-aqui
         print(f"❌ Erro ao criar .env: {e}")
 
 def main():
-    """Menu principal"""
+    """Menu principal (ou execução direta com --install / --benchmark)"""
+    parser = argparse.ArgumentParser(description="Configura, testa e compara providers de LLM")
+    parser.add_argument("--benchmark", action="store_true", help="Compara providers/modelos e gera o relatório")
+    parser.add_argument("--providers", help="Providers separados por vírgula (padrão: instalados e com API key)")
+    parser.add_argument("--models", help="Modelos separados por vírgula (padrão: todos os de cada provider)")
+    parser.add_argument("--runs", type=int, default=DEFAULT_BENCHMARK_RUNS, help="Gerações por modelo")
+    parser.add_argument("--output", default=DEFAULT_BENCHMARK_OUTPUT, help="Relatório JSON")
+    parser.add_argument("--apply", action="store_true",
+                        help="Grava PREFERRED_LLM_PROVIDER e <PROVIDER>_MODEL recomendados no .env")
+    parser.add_argument("--standin", action="store_true",
+                        help="Mede o provider openai contra um servidor local compatível (fake_llm.py)")
+    parser.add_argument("--install", metavar="PROVIDERS",
+                        help="Instala os pacotes dos providers ('all' ou lista separada por vírgula)")
+    parser.add_argument("--constraints", help="Arquivo de constraints/lock do pip (padrão: PROVIDER_CONSTRAINTS)")
+    parser.add_argument("--wheelhouse", help="Instala sem rede a partir deste diretório (padrão: PROVIDER_WHEELHOUSE)")
+    parser.add_argument("--download-wheelhouse", metavar="DIR",
+                        help="Baixa as wheels dos providers de --install para DIR antes de instalar")
+    args = parser.parse_args()
+    if args.install or args.download_wheelhouse:
+        packages = provider_requirements(args.install or "all")
+        if args.download_wheelhouse:
+            if not download_wheelhouse(packages, args.download_wheelhouse, args.constraints):
+                sys.exit(1)
+            if not args.install:
+                return
+        wheelhouse = args.wheelhouse or args.download_wheelhouse
+        if not install_packages(packages, args.constraints, wheelhouse):
+            sys.exit(1)
+        if not args.benchmark:
+            return
+    if args.benchmark:
+        def split(value: Optional[str]) -> Optional[List[str]]:
+            return [item.strip() for item in value.split(",") if item.strip()] if value else None
+        
+        run_benchmark(split(args.providers), split(args.models), args.runs, args.output, args.apply, args.standin)
+        return
+
     while True:
         print("\n" + "="*60)
         print("🛠️  CONFIGURADOR DE PROVIDERS DE LLM")
@@ -189,7 +635,8 @@ def main():
         print("2. 🧪 Testar configuração")
         print("3. 📖 Informações dos providers")
         print("4. 📝 Criar arquivo .env")
-        print("5. 🚪 Sair")
+        print("5. 📊 Benchmark dos providers")
+        print("6. 🚪 Sair")
         
         try:
             choice = input("\n> Escolha uma opção: ").strip()
@@ -203,6 +650,8 @@ def main():
             elif choice == "4":
                 create_env_file()
             elif choice == "5":
+                run_benchmark()
+            elif choice == "6":
                 print("👋 Até logo!")
                 break
             else:
@@ -0,0 +1,172 @@
+"""
+Cache persistente (SQLite) da análise do especialista
+
+A análise de '5 pontos principais' de um tema depende apenas de prova/tema/nível/área,
+do provider/modelo e do prompt do especialista. Guardando-a, as próximas questões do
+mesmo tema executam apenas a tarefa do gerador.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "especialista.sqlite")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+
+class SpecialistCache:
+    """Cache da análise do especialista com TTL e limite de entradas (LRU)"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            path: Arquivo SQLite do cache
+            ttl_seconds: Idade máxima de uma análise antes de ser descartada
+            max_entries: Número máximo de análises guardadas; as menos usadas saem primeiro
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analises (
+                chave TEXT PRIMARY KEY,
+                prova TEXT, tema TEXT, nivel TEXT, area TEXT,
+                provider TEXT, modelo TEXT,
+                analise TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analises_acesso ON analises (ultimo_acesso)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["SpecialistCache"]:
+        """
+        Cria o cache a partir das variáveis de ambiente
+
+        SPECIALIST_CACHE=0 desativa o cache. SPECIALIST_CACHE_PATH, SPECIALIST_CACHE_TTL (segundos)
+        e SPECIALIST_CACHE_MAX_ENTRIES ajustam o comportamento.
+
+        Returns:
+            Instância do cache, ou None se estiver desativado
+        """
+        if os.getenv("SPECIALIST_CACHE", "1").lower() in ("0", "false", "no", "nao", "não"):
+            return None
+        return cls(
+            path=os.getenv("SPECIALIST_CACHE_PATH", DEFAULT_CACHE_PATH),
+            ttl_seconds=float(os.getenv("SPECIALIST_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            max_entries=int(os.getenv("SPECIALIST_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        )
+
+    @staticmethod
+    def make_key(prova: str, tema: str, nivel: str, area: str, provider: str, model: str, prompt: str) -> str:
+        """
+        Gera a chave do cache
+
+        Args:
+            prompt: Texto completo do prompt do especialista (papel, objetivo, história e tarefa)
+
+        Returns:
+            Hash SHA-256 dos campos normalizados
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        fields = [prova, tema, nivel, area, provider, model]
+        payload = json.dumps([field.strip().lower() for field in fields] + [prompt_hash])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def lock_for(self, key: str):
+        """
+        Serializa o cálculo de uma mesma chave
+
+        Em lotes concorrentes, várias questões do mesmo tema esperam a primeira análise
+        em vez de pedirem a mesma análise ao LLM ao mesmo tempo.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            yield
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Busca uma análise válida no cache
+
+        Returns:
+            Texto da análise, ou None se não existir ou estiver expirada
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analise, criado_em FROM analises WHERE chave = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            analise, criado_em = row
+            if now - criado_em > self.ttl_seconds:
+                self._conn.execute("DELETE FROM analises WHERE chave = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE analises SET ultimo_acesso = ? WHERE chave = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return analise
+
+    def set(self, key: str, analise: str, prova: str = "", tema: str = "", nivel: str = "",
+            area: str = "", provider: str = "", model: str = ""):
+        """Guarda uma análise e aplica a política de expiração/evicção"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO analises
+                   (chave, prova, tema, nivel, area, provider, modelo, analise, criado_em, ultimo_acesso)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key, prova, tema, nivel, area, provider, model, analise, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Remove análises expiradas e, se passar do limite, as menos usadas recentemente"""
+        self._conn.execute("DELETE FROM analises WHERE criado_em < ?", (now - self.ttl_seconds,))
+        count = self._conn.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM analises WHERE chave IN "
+                "(SELECT chave FROM analises ORDER BY ultimo_acesso ASC LIMIT ?)",
+                (excess,)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna hits, misses e número de entradas do cache"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM analises").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,196 @@
+"""
+Streaming da questão gerada, token a token
+
+O especialista roda normalmente (ou vem do cache); o gerador usa um LLM criado com
+streaming=True e um callback que coloca cada token numa fila. stream_question entrega
+esses tokens por um gerador síncrono e astream_question por um async iterator, para
+exibição no terminal ou numa interface web enquanto a questão é escrita.
+
+Ao fim do streaming, o texto completo passa pela mesma validação (parse_question) e pelo
+mesmo índice de duplicatas da geração normal; se for recusado, uma nova questão é gerada
+sem streaming (generate_validated) e entregue em seguida.
+"""
+
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Generator
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from llm_config import LLMConfig, LLMFactory
+from agents import (analyze_topic, build_agents, generate_from_analysis, generate_validated,
+                    get_specialist_analysis)
+from question_model import Questao, QuestionValidationError, parse_question
+
+# Marcador que o ReAct do CrewAI coloca antes da resposta final do agente
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+_RESET = object()
+_DONE = object()
+
+class TokenQueueHandler(BaseCallbackHandler):
+    """Callback do LangChain que publica os tokens gerados numa fila"""
+
+    def __init__(self, token_queue: "queue.Queue[Any]"):
+        self.token_queue = token_queue
+
+    def on_llm_start(self, serialized: Any, prompts: Any, **kwargs: Any) -> None:
+        self.token_queue.put(_RESET)
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, **kwargs: Any) -> None:
+        self.token_queue.put(_RESET)
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.token_queue.put(token)
+
+class FinalAnswerFilter:
+    """
+    Descarta o raciocínio do agente ('Thought: ...') e deixa passar só a resposta final
+
+    Enquanto o marcador 'Final Answer:' não aparece, o texto fica num buffer. Se a chamada
+    terminar sem o marcador, o buffer inteiro é tratado como resposta.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.buffer = ""
+        self.passing = False
+
+    def feed(self, token: str) -> str:
+        """Recebe um token e retorna o trecho que pode ser exibido"""
+        if self.passing:
+            return token
+        self.buffer += token
+        index = self.buffer.find(FINAL_ANSWER_MARKER)
+        if index < 0:
+            return ""
+        self.passing = True
+        return self.buffer[index + len(FINAL_ANSWER_MARKER):].lstrip()
+
+    def flush(self) -> str:
+        """Texto pendente quando a chamada termina sem o marcador"""
+        return "" if self.passing else self.buffer
+
+def create_streaming_llm(llm, handler: BaseCallbackHandler):
+    """
+    Cria uma cópia do LLM com streaming ativado e o callback de tokens
+
+    Args:
+        llm: LLM criado pelo LLMFactory (usado para descobrir provider e modelo)
+        handler: Callback que receberá os tokens
+
+    Returns:
+        Novo LLM com streaming, ou None se o provider não puder ser recriado (ex: router)
+    """
+    provider, model = LLMFactory.describe_llm(llm)
+    if provider not in LLMConfig.DEFAULT_CONFIGS:
+        return None
+
+    custom_config = {"streaming": True, "callbacks": [handler]}
+    if "model" in LLMConfig.DEFAULT_CONFIGS[provider]:
+        custom_config["model"] = model
+    return LLMFactory.create_llm(provider, custom_config)
+
+def stream_question(llm, prova: str, tema: str, nivel: str, area: str, cache=None,
+                    verbose: bool = False, dedup=None, tracker=None) -> Generator[str, None, Questao]:
+    """
+    Gera uma questão entregando o texto do gerador à medida que é escrito
+
+    Args:
+        llm: LLM criado pelo LLMFactory, usado pelo especialista
+        cache: SpecialistCache opcional para a análise do especialista
+        dedup: QuestionDedupIndex opcional; a questão transmitida é registrada nele
+        tracker: UsageTracker opcional; registra as chamadas do especialista e do gerador
+
+    Yields:
+        Trechos de texto da questão. Se o provider não suportar streaming, o texto
+        completo é entregue de uma vez ao final; se a questão transmitida for inválida ou
+        quase duplicada, um aviso e a questão gerada de novo
+
+    Returns:
+        Questao validada (valor de StopIteration)
+    """
+    agentes = None
+    if tracker is not None:
+        agentes = build_agents(llm, prova, tema, nivel, area, verbose=verbose, llms=tracker.instrument(llm))
+
+    if cache is not None:
+        analise = get_specialist_analysis(llm, prova, tema, nivel, area, cache, verbose=verbose, agentes=agentes)
+    else:
+        analise = analyze_topic(llm, prova, tema, nivel, area, verbose=verbose, agentes=agentes)
+
+    token_queue: "queue.Queue[Any]" = queue.Queue()
+    gerador_llm = create_streaming_llm(llm, TokenQueueHandler(token_queue)) or llm
+    gerador_agentes = None
+    if tracker is not None:
+        gerador_agentes = build_agents(gerador_llm, prova, tema, nivel, area, verbose=verbose,
+                                       llms=tracker.instrument(gerador_llm, roles=("gerador",)))
+    outcome = {}
+
+    def run_generator():
+        try:
+            outcome["resultado"] = generate_from_analysis(gerador_llm, prova, tema, nivel, area, analise,
+                                                          verbose=verbose, agentes=gerador_agentes)
+        except Exception as e:
+            outcome["erro"] = e
+        finally:
+            token_queue.put(_DONE)
+
+    threading.Thread(target=run_generator, name="stream-gerador", daemon=True).start()
+
+    answer_filter = FinalAnswerFilter()
+    streamed = False
+    while True:
+        item = token_queue.get()
+        if item is _DONE:
+            break
+        if item is _RESET:
+            # Nova chamada do agente: o que ficou no buffer era raciocínio intermediário
+            answer_filter.reset()
+            continue
+        text = answer_filter.feed(item)
+        if text:
+            streamed = True
+            yield text
+
+    if "erro" in outcome:
+        raise outcome["erro"]
+
+    if not streamed:
+        yield answer_filter.flush() or str(outcome.get("resultado", ""))
+
+    # O texto já exibido não pode ser desfeito: uma questão recusada é seguida da nova
+    try:
+        questao = parse_question(str(outcome.get("resultado", "")), prova=prova, tema=tema, nivel=nivel, area=area)
+        duplicada = dedup.check_and_add(questao.enunciado, list(questao.alternativas.values()), prova, tema) \
+            if dedup is not None else None
+        if duplicada is None:
+            return questao
+        aviso = f"quase duplicada (similaridade {duplicada['similaridade']})"
+    except QuestionValidationError as e:
+        aviso = f"fora do formato ({e})"
+
+    yield f"\n\n⚠️ Questão {aviso}; gerando de novo...\n\n"
+    questao = generate_validated(llm, prova, tema, nivel, area, analise, dedup, verbose=verbose, agentes=agentes)
+    yield str(questao)
+    return questao
+
+async def astream_question(llm, prova: str, tema: str, nivel: str, area: str, cache=None,
+                           verbose: bool = False, dedup=None, tracker=None) -> AsyncIterator[str]:
+    """
+    Versão assíncrona de stream_question, para servidores web
+
+    Yields:
+        Trechos de texto da questão
+    """
+    iterator = stream_question(llm, prova, tema, nivel, area, cache=cache, verbose=verbose, dedup=dedup,
+                               tracker=tracker)
+    done = object()
+    while True:
+        chunk = await asyncio.to_thread(next, iterator, done)
+        if chunk is done:
+            break
+        yield chunk
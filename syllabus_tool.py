@@ -0,0 +1,35 @@
+"""
+Ferramenta "Buscar no edital" dos agentes da CrewAI
+
+Fica separada de rag_retrieval para que a busca nos editais (usada também pelo motor direto)
+não dependa da CrewAI; só o motor "crew" importa este módulo.
+"""
+
+from typing import Any, Optional, Type
+
+from pydantic import BaseModel, Field
+
+try:
+    from crewai.tools import BaseTool
+except ImportError:  # crewai < 0.60
+    from crewai_tools import BaseTool
+
+from rag_retrieval import DEFAULT_TOP_K, format_context
+
+class SyllabusSearchInput(BaseModel):
+    consulta: str = Field(..., description="Assunto a buscar no edital (ex: 'tributação de fundos')")
+
+class SyllabusSearchTool(BaseTool):
+    """Ferramenta dos agentes para buscar trechos do edital da prova"""
+
+    name: str = "Buscar no edital"
+    description: str = ("Busca trechos do conteúdo programático do edital da prova. "
+                        "Use para confirmar o que o edital cobra sobre um assunto.")
+    args_schema: Type[BaseModel] = SyllabusSearchInput
+    retriever: Any = None
+    prova: Optional[str] = None
+    k: int = DEFAULT_TOP_K
+
+    def _run(self, consulta: str) -> str:
+        results = self.retriever.search(consulta, prova=self.prova, k=self.k)
+        return format_context(results) or "Nenhum trecho do edital encontrado."
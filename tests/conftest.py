@@ -0,0 +1,24 @@
+"""
+Configuração comum dos testes: módulos da raiz no path e nada gravado fora de tmp_path
+
+Os testes rodam offline, com o provider fake (fake_llm.py) e o motor direto.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# LLMConfig.DEFAULT_CONFIGS lê o fake na importação: definir antes de os testes importarem os módulos
+os.environ.update({"FAKE_LLM_LATENCY": "0", "FAKE_LLM_TOKENS_PER_S": "1000000", "FAKE_LLM_ERROR_RATE": "0"})
+
+@pytest.fixture(autouse=True)
+def ambiente_isolado(tmp_path, monkeypatch):
+    """Diretório de trabalho temporário (.cache/...) e pipeline sem rede nem CrewAI"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PIPELINE_ENGINE", "direct")
+    monkeypatch.setenv("QUESTION_BANK", "0")
+    monkeypatch.setenv("LLM_TRACE_PATH", "")
+    monkeypatch.delenv("LLM_CACHE_PATH", raising=False)
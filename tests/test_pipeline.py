@@ -0,0 +1,62 @@
+"""Especialista e gerador de ponta a ponta com o provider fake (sem rede e sem CrewAI)"""
+
+import pytest
+
+from agents import generate_question
+from llm_config import LLMFactory, LLMProvider
+from question_dedup import QuestionDedupIndex
+from streaming import stream_question
+
+COMBINACAO = ("CPA-20", "Mercado Financeiro", "Dificil", "Finanças")
+
+@pytest.fixture
+def dedup(tmp_path):
+    index = QuestionDedupIndex(str(tmp_path / "dedup.sqlite"))
+    yield index
+    index.close()
+
+def test_gera_questao_valida_e_registra_no_indice(dedup):
+    llm = LLMFactory.create_llm(LLMProvider.FAKE)
+
+    questao = generate_question(llm, *COMBINACAO, verbose=False, dedup=dedup)
+
+    assert questao.resposta_correta in "ABCD"
+    assert sorted(questao.alternativas) == ["A", "B", "C", "D"]
+    assert (questao.prova, questao.tema) == COMBINACAO[:2]
+    assert dedup.stats()["entries"] == 1
+
+def test_questoes_seguidas_sao_distintas(dedup):
+    llm = LLMFactory.create_llm(LLMProvider.FAKE)
+
+    enunciados = {generate_question(llm, *COMBINACAO, verbose=False, dedup=dedup).enunciado for _ in range(5)}
+
+    assert len(enunciados) == 5
+    assert dedup.stats()["duplicadas"] == 0
+
+def consume(trechos):
+    """Texto transmitido e a questão validada (valor de retorno do gerador)"""
+    texto = []
+    while True:
+        try:
+            texto.append(next(trechos))
+        except StopIteration as fim:
+            return "".join(texto), fim.value
+
+def test_stream_valida_e_registra_a_questao(dedup):
+    llm = LLMFactory.create_llm(LLMProvider.FAKE)
+
+    texto, questao = consume(stream_question(llm, *COMBINACAO, dedup=dedup))
+
+    assert questao.enunciado in texto
+    assert dedup.stats()["entries"] == 1
+
+def test_stream_duplicada_e_gerada_de_novo(dedup):
+    llm = LLMFactory.create_llm(LLMProvider.FAKE)
+    _, primeira = consume(stream_question(llm, *COMBINACAO, dedup=dedup))
+
+    # O gerador com streaming do fake é determinístico: a segunda transmissão repete a primeira
+    texto, segunda = consume(stream_question(llm, *COMBINACAO, dedup=dedup))
+
+    assert "quase duplicada" in texto
+    assert segunda.enunciado != primeira.enunciado
+    assert dedup.stats()["entries"] == 2
@@ -0,0 +1,74 @@
+from progress_journal import ProgressJournal, item_key
+
+def job(linha=0, item=0, provider="fake", **campos):
+    return {"indice": linha * 10 + item, "linha": linha, "item": item, "provider": provider,
+            "prova": "CPA-20", "tema": "Renda Fixa", "nivel": "Dificil", "area": "Finanças", **campos}
+
+def test_item_key_distingue_linha_provider_e_item():
+    chaves = {item_key(job()), item_key(job(linha=1)), item_key(job(provider="openai")), item_key(job(item=1))}
+    assert len(chaves) == 4
+    # Campos do resultado não mudam a chave
+    assert item_key({**job(), "status": "ok", "resultado": "..."}) == item_key(job())
+
+def test_resume_pula_concluidas_e_refaz_erros(tmp_path):
+    path = str(tmp_path / "lote.jsonl")
+    jobs = [job(item=0), job(item=1), job(item=2)]
+
+    journal = ProgressJournal(path)
+    journal.record_result({**jobs[0], "status": "ok", "resultado": "QUESTÃO: pronta"})
+    journal.record_result({**jobs[1], "status": "erro", "erro": "429"})
+    journal.close()
+
+    retomada = ProgressJournal(path, resume=True)
+    try:
+        pendentes, concluidas = retomada.pending(jobs)
+        assert concluidas == 1
+        assert [pendente["item"] for pendente in pendentes] == [1, 2]
+        assert retomada.completed(jobs[0])["resultado"] == "QUESTÃO: pronta"
+    finally:
+        retomada.close()
+
+def test_resume_reaproveita_analise_do_especialista(tmp_path):
+    path = str(tmp_path / "lote.jsonl")
+    journal = ProgressJournal(path)
+    cache = journal.wrap(None)
+    cache.set("chave-analise", "análise pronta", prova="CPA-20", tema="Renda Fixa", nivel="Dificil", area="Finanças")
+    journal.close()
+
+    retomada = ProgressJournal(path, resume=True)
+    try:
+        assert retomada.wrap(None).get("chave-analise") == "análise pronta"
+        assert retomada.reused_analyses == 1
+        assert retomada.has_analysis("CPA-20", "Renda Fixa", "Dificil", "Finanças")
+        assert not retomada.has_analysis("CPA-20", "Renda Variável", "Dificil", "Finanças")
+    finally:
+        retomada.close()
+
+def test_linha_truncada_e_ignorada(tmp_path):
+    path = tmp_path / "lote.jsonl"
+    journal = ProgressJournal(str(path))
+    journal.record_result({**job(), "status": "ok", "resultado": "QUESTÃO: pronta"})
+    journal.close()
+    # Queda no meio da escrita da entrada seguinte
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"tipo": "questao", "chave": ')
+
+    retomada = ProgressJournal(str(path), resume=True)
+    try:
+        assert retomada.completed(job()) is not None
+    finally:
+        retomada.close()
+
+def test_sem_resume_o_journal_recomeca(tmp_path):
+    path = str(tmp_path / "lote.jsonl")
+    journal = ProgressJournal(path)
+    journal.record_result({**job(), "status": "ok", "resultado": "QUESTÃO: pronta"})
+    journal.close()
+
+    ProgressJournal(path).close()
+
+    retomada = ProgressJournal(path, resume=True)
+    try:
+        assert retomada.completed(job()) is None
+    finally:
+        retomada.close()
@@ -0,0 +1,63 @@
+import pytest
+
+from question_dedup import QuestionDedupIndex, shingles
+
+ENUNCIADO = "Um investidor aplica R$ 100 mil em um CDB prefixado com vencimento em dois anos. Qual é o risco principal?"
+ALTERNATIVAS = ["Risco de crédito do emissor", "Risco de mercado pela marcação", "Risco de liquidez", "Risco cambial"]
+
+@pytest.fixture
+def index(tmp_path):
+    dedup = QuestionDedupIndex(str(tmp_path / "dedup.sqlite"))
+    yield dedup
+    dedup.close()
+
+def test_shingles_ignoram_acentos_caixa_e_ordem_das_alternativas():
+    assert shingles("Qual é o RISCO?", ["b", "a"]) == shingles("qual e o risco", ["a", "b"])
+    assert "qual e o" in shingles("Qual é o risco", [])
+
+def test_shingles_nao_cruzam_partes():
+    # Sem trigramas que juntem o fim do enunciado ao início de uma alternativa
+    assert "risco cdb lci" not in shingles("Qual o risco", ["CDB LCI"])
+
+def test_aceita_questao_nova_e_barra_quase_duplicada(index):
+    assert index.check_and_add(ENUNCIADO, ALTERNATIVAS, "CPA-20", "Renda Fixa") is None
+
+    parecida = ENUNCIADO.replace("dois anos", "2 anos")
+    duplicada = index.check_and_add(parecida, ALTERNATIVAS, "cpa-20 ", "Renda Fixa")
+
+    assert duplicada is not None
+    assert duplicada["enunciado"] == ENUNCIADO
+    assert duplicada["similaridade"] >= index.threshold
+    assert index.stats() == {"aceitas": 1, "duplicadas": 1, "entries": 1}
+
+def test_provas_diferentes_nao_colidem(index):
+    assert index.check_and_add(ENUNCIADO, ALTERNATIVAS, "CPA-20") is None
+    assert index.check_and_add(ENUNCIADO, ALTERNATIVAS, "CEA") is None
+
+def test_questao_diferente_e_aceita(index):
+    assert index.check_and_add(ENUNCIADO, ALTERNATIVAS, "CPA-20") is None
+    outra = "Qual é a tributação de um fundo de ações resgatado por pessoa física após um ano de aplicação?"
+    assert index.check_and_add(outra, ["15%", "20%", "22,5%", "Isento"], "CPA-20") is None
+
+def test_discard_libera_a_questao(index):
+    assert index.check_and_add(ENUNCIADO, ALTERNATIVAS, "CPA-20") is None
+
+    assert index.discard(ENUNCIADO, ALTERNATIVAS, "CPA-20") is True
+    assert index.stats()["entries"] == 0
+    # A versão corrigida de uma questão reprovada não é barrada como duplicata dela
+    assert index.check_and_add(ENUNCIADO, ALTERNATIVAS, "CPA-20") is None
+
+def test_discard_de_questao_ausente(index):
+    assert index.discard(ENUNCIADO, ALTERNATIVAS, "CPA-20") is False
+
+def test_indice_persiste_entre_aberturas(tmp_path):
+    path = str(tmp_path / "dedup.sqlite")
+    primeiro = QuestionDedupIndex(path)
+    primeiro.check_and_add(ENUNCIADO, ALTERNATIVAS, "CPA-20")
+    primeiro.close()
+
+    segundo = QuestionDedupIndex(path)
+    try:
+        assert segundo.check_and_add(ENUNCIADO, ALTERNATIVAS, "CPA-20") is not None
+    finally:
+        segundo.close()
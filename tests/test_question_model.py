@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from question_model import QuestionValidationError, parse_question, parse_questions, parse_review, split_questions
+
+QUESTAO = """**QUESTÃO:** Qual instrumento é isento de IR para pessoa física?
+
+A) CDB
+B) LCI
+C) Debênture comum
+D) Fundo DI
+
+RESPOSTA CORRETA: B) A LCI é isenta de imposto de renda para pessoa física.
+"""
+
+def test_parse_question_formato_texto():
+    questao = parse_question(QUESTAO, prova="CPA-20", tema="Tributação")
+
+    assert questao.enunciado == "Qual instrumento é isento de IR para pessoa física?"
+    assert questao.alternativas == {"A": "CDB", "B": "LCI", "C": "Debênture comum", "D": "Fundo DI"}
+    assert questao.resposta_correta == "B"
+    assert questao.justificativa.startswith("A LCI é isenta")
+    assert (questao.prova, questao.tema) == ("CPA-20", "Tributação")
+
+def test_parse_question_volta_ao_mesmo_texto():
+    questao = parse_question(QUESTAO)
+    assert parse_question(str(questao)) == questao
+
+def test_parse_question_json():
+    texto = json.dumps({"enunciado": "Qual?", "alternativas": {"a": "um", "b": "dois", "c": "três", "d": "quatro"},
+                        "resposta_correta": "c", "justificativa": "Porque sim."})
+    questao = parse_question(texto)
+    assert questao.resposta_correta == "C"
+    assert questao.alternativas["A"] == "um"
+
+@pytest.mark.parametrize("texto, problema", [
+    (QUESTAO.replace("D) Fundo DI\n", ""), "4 alternativas"),
+    (QUESTAO.replace("RESPOSTA CORRETA: B)", "RESPOSTA CORRETA: E)"), "resposta correta"),
+    (QUESTAO.replace("C) Debênture comum", "C) CDB"), "repetidas"),
+    (QUESTAO.split("RESPOSTA")[0], "resposta correta"),
+])
+def test_parse_question_invalida(texto, problema):
+    with pytest.raises(QuestionValidationError) as erro:
+        parse_question(texto)
+    assert any(problema in item for item in erro.value.problems)
+
+def test_split_questions_numeradas_com_separadores():
+    segunda = QUESTAO.replace("QUESTÃO:", "QUESTÃO 2:").replace("isento", "tributado")
+    texto = "Seguem as questões.\n\n" + QUESTAO.replace("QUESTÃO:", "QUESTÃO 1:") + "\n---\n" + segunda
+
+    blocos = split_questions(texto)
+
+    assert len(blocos) == 2
+    assert "isento" in blocos[0] and "tributado" in blocos[1]
+    assert not any("---" in bloco or "Seguem" in bloco for bloco in blocos)
+
+def test_split_questions_lista_json():
+    item = {"enunciado": "Qual?", "alternativas": {"A": "1", "B": "2", "C": "3", "D": "4"},
+            "resposta_correta": "A", "justificativa": "Explicação."}
+    blocos = split_questions(json.dumps([item, item, "lixo"]))
+    assert [json.loads(bloco) for bloco in blocos] == [item, item]
+
+def test_parse_questions_separa_validas_e_invalidas():
+    invalida = "QUESTÃO 2: Sem alternativas\n\nRESPOSTA CORRETA: A) nada"
+    questoes, problemas = parse_questions(QUESTAO.replace("QUESTÃO:", "QUESTÃO 1:") + "\n" + invalida)
+
+    assert len(questoes) == 1
+    assert len(problemas) == 1 and problemas[0].startswith("questão 2:")
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("APROVADA", (True, "")),
+    ("**Veredito:** aprovada, está ótima", (True, "")),
+    ("REPROVADA: alternativa B também está correta", (False, "alternativa B também está correta")),
+    ("Análise feita.\nREPROVADA\nO gabarito está errado.", (False, "O gabarito está errado.")),
+    ("REPROVADA", (False, "reprovada sem motivo informado")),
+    ("Não consegui avaliar.", (True, "")),
+])
+def test_parse_review(texto, esperado):
+    assert parse_review(texto) == esperado
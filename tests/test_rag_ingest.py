@@ -0,0 +1,27 @@
+from rag_ingest import chunk_text
+
+TEXTO = ("O investidor qualificado possui mais de um milhão em aplicações. "
+         "O investidor profissional possui mais de dez milhões. "
+         "Fundos de investimento seguem a Resolução CVM 175. ") * 4
+
+def test_trechos_respeitam_o_tamanho():
+    trechos = list(chunk_text(TEXTO, size=120, overlap=30))
+    assert len(trechos) > 1
+    assert all(len(trecho) <= 120 for trecho in trechos)
+
+def test_trechos_cobrem_todas_as_frases():
+    trechos = list(chunk_text(TEXTO, size=120, overlap=30))
+    for frase in ("investidor qualificado", "investidor profissional", "Resolução CVM 175"):
+        assert any(frase in trecho for trecho in trechos)
+
+def test_trecho_seguinte_repete_o_final_do_anterior():
+    trechos = list(chunk_text(TEXTO, size=120, overlap=40))
+    for anterior, seguinte in zip(trechos, trechos[1:]):
+        assert seguinte.split()[0] in anterior
+
+def test_frase_maior_que_o_trecho_e_cortada():
+    trechos = list(chunk_text("x" * 250, size=100, overlap=10))
+    assert [len(trecho) for trecho in trechos] == [100, 100, 70]
+
+def test_texto_vazio():
+    assert list(chunk_text("   \n\n ")) == []
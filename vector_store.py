@@ -0,0 +1,387 @@
+"""
+Armazenamento persistente dos trechos vetorizados dos editais (RAG)
+
+Os metadados (documentos, hash de cada página e texto dos trechos) ficam em SQLite; os
+vetores ficam numa matriz float32 append-only em disco, lida por memory-map. Cada trecho
+aponta para a sua linha na matriz. Trechos de páginas alteradas são desativados (e não
+apagados), para que a matriz nunca precise ser reescrita durante a ingestão; `compact`
+remove as linhas inativas quando for conveniente.
+
+A meta "versao" muda a cada escrita, para que buscas em outros processos (ex: o serviço)
+percebam uma nova ingestão; "compactacoes" muda quando as linhas da matriz são renumeradas.
+A meta "arquivo_vetores" indica a matriz em uso: a compactação grava uma matriz nova e troca
+o nome na mesma transação que renumera os trechos, de modo que metadados e vetores nunca
+fiquem de versões diferentes.
+"""
+
+import glob
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = os.path.join(".cache", "rag")
+METADATA_FILE = "metadados.sqlite"
+VECTORS_FILE = "vetores.f32"
+
+def normalize_prova(prova: str) -> str:
+    """Nome canônico da prova usado no filtro da busca (ex: 'cpa-20 ' → 'CPA-20')"""
+    return prova.strip().upper()
+
+class VectorStore:
+    """Trechos dos editais com seus vetores, páginas e documentos de origem"""
+
+    def __init__(self, directory: str = DEFAULT_INDEX_DIR):
+        """
+        Args:
+            directory: Diretório do índice (metadados SQLite + matriz de vetores)
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, METADATA_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documentos (
+                id INTEGER PRIMARY KEY,
+                caminho TEXT UNIQUE NOT NULL,
+                prova TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                paginas INTEGER NOT NULL,
+                atualizado_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS paginas (
+                documento_id INTEGER NOT NULL,
+                numero INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (documento_id, numero)
+            );
+            CREATE TABLE IF NOT EXISTS trechos (
+                id INTEGER PRIMARY KEY,
+                documento_id INTEGER NOT NULL,
+                prova TEXT NOT NULL,
+                pagina INTEGER NOT NULL,
+                ordem INTEGER NOT NULL,
+                texto TEXT NOT NULL,
+                linha INTEGER UNIQUE NOT NULL,
+                ativo INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS idx_trechos_pagina ON trechos (documento_id, pagina);
+            CREATE INDEX IF NOT EXISTS idx_trechos_prova ON trechos (prova, ativo);
+        """)
+        self._conn.commit()
+
+    def _vectors_path(self) -> str:
+        """Caminho da matriz em uso (chamar com o lock)"""
+        row = self._conn.execute("SELECT valor FROM meta WHERE chave = 'arquivo_vetores'").fetchone()
+        return os.path.join(self.directory, row[0] if row else VECTORS_FILE)
+
+    @property
+    def vectors_path(self) -> str:
+        """Caminho da matriz de vetores em uso (muda a cada compactação)"""
+        with self._lock:
+            return self._vectors_path()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT valor FROM meta WHERE chave = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def check_embeddings(self, model_id: str):
+        """
+        Garante que o índice só recebe vetores de um mesmo modelo de embeddings
+
+        Raises:
+            ValueError: Se o índice já tiver vetores de outro modelo
+        """
+        current = self.get_meta("embeddings")
+        if current is None:
+            self.set_meta("embeddings", model_id)
+        elif current != model_id:
+            raise ValueError(f"O índice em '{self.directory}' usa embeddings '{current}', não '{model_id}'. "
+                             "Use outro RAG_INDEX_DIR ou apague o índice para reingerir.")
+
+    def _bump_version(self, key: str = "versao"):
+        """Incrementa um contador em meta (dentro da transação corrente)"""
+        self._conn.execute(
+            "INSERT INTO meta (chave, valor) VALUES (?, '1') "
+            "ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1",
+            (key,)
+        )
+
+    @property
+    def version(self) -> str:
+        """Muda a cada escrita no índice"""
+        return self.get_meta("versao") or "0"
+
+    @property
+    def dimension(self) -> Optional[int]:
+        value = self.get_meta("dimensao")
+        return int(value) if value else None
+
+    def get_document(self, path: str) -> Optional[Dict[str, Any]]:
+        """Retorna id, prova, hash e número de páginas de um documento já ingerido"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, prova, hash, paginas FROM documentos WHERE caminho = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "prova": row[1], "hash": row[2], "paginas": row[3]}
+
+    def upsert_document(self, path: str, prova: str, file_hash: str, pages: int) -> int:
+        """
+        Registra (ou atualiza) um documento
+
+        Returns:
+            Id do documento
+        """
+        now = time.time()
+        prova = normalize_prova(prova)
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO documentos (caminho, prova, hash, paginas, atualizado_em) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(caminho) DO UPDATE SET
+                       prova = excluded.prova, hash = excluded.hash,
+                       paginas = excluded.paginas, atualizado_em = excluded.atualizado_em""",
+                (path, prova, file_hash, pages, now)
+            )
+            document_id = self._conn.execute(
+                "SELECT id FROM documentos WHERE caminho = ?", (path,)
+            ).fetchone()[0]
+            # A prova pode ter sido renomeada na reingestão
+            self._conn.execute("UPDATE trechos SET prova = ? WHERE documento_id = ?", (prova, document_id))
+            self._bump_version()
+            self._conn.commit()
+        return document_id
+
+    def page_hashes(self, document_id: int) -> Dict[int, str]:
+        """Hash do texto de cada página já ingerida do documento"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT numero, hash FROM paginas WHERE documento_id = ?", (document_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def remove_pages_after(self, document_id: int, last_page: int) -> int:
+        """
+        Desativa os trechos das páginas que deixaram de existir no documento
+
+        Returns:
+            Número de trechos desativados
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE trechos SET ativo = 0 WHERE documento_id = ? AND pagina > ? AND ativo = 1",
+                (document_id, last_page)
+            )
+            self._conn.execute("DELETE FROM paginas WHERE documento_id = ? AND numero > ?", (document_id, last_page))
+            self._bump_version()
+            self._conn.commit()
+        return cursor.rowcount
+
+    @property
+    def rows(self) -> int:
+        """Número de linhas gravadas na matriz de vetores (ativas ou não)"""
+        dimension = self.dimension
+        path = self.vectors_path
+        if not dimension or not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // (dimension * 4)
+
+    def add_pages(self, document_id: int, prova: str, pages: Dict[int, str],
+                  chunks: Sequence[Tuple[int, int, str]], vectors: np.ndarray):
+        """
+        Substitui os trechos das páginas informadas por novos trechos e vetores
+
+        Os vetores são anexados à matriz antes do commit dos metadados: se o processo cair
+        no meio, sobram apenas linhas órfãs, que nunca são referenciadas.
+
+        Args:
+            document_id: Documento de origem
+            prova: Prova do documento (usada para filtrar a busca)
+            pages: Número da página → hash do texto, para cada página processada
+            chunks: Tuplas (pagina, ordem, texto), na mesma ordem de `vectors`
+            vectors: Matriz (len(chunks), dimensão) já normalizada
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        prova = normalize_prova(prova)
+        with self._lock:
+            if len(chunks):
+                dimension = self._conn.execute("SELECT valor FROM meta WHERE chave = 'dimensao'").fetchone()
+                if dimension is None:
+                    self._conn.execute("INSERT INTO meta (chave, valor) VALUES ('dimensao', ?)", (str(vectors.shape[1]),))
+                elif int(dimension[0]) != vectors.shape[1]:
+                    raise ValueError(f"Dimensão dos vetores ({vectors.shape[1]}) diferente da do índice ({dimension[0]})")
+
+                with open(self._vectors_path(), "ab") as f:
+                    start = f.tell() // (vectors.shape[1] * 4)
+                    f.write(vectors.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            else:
+                start = 0
+
+            self._conn.executemany(
+                "UPDATE trechos SET ativo = 0 WHERE documento_id = ? AND pagina = ? AND ativo = 1",
+                [(document_id, number) for number in pages]
+            )
+            self._conn.executemany(
+                "INSERT INTO trechos (documento_id, prova, pagina, ordem, texto, linha) VALUES (?, ?, ?, ?, ?, ?)",
+                [(document_id, prova, page, order, text, start + i) for i, (page, order, text) in enumerate(chunks)]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO paginas (documento_id, numero, hash) VALUES (?, ?, ?)",
+                [(document_id, number, page_hash) for number, page_hash in pages.items()]
+            )
+            self._bump_version()
+            self._conn.commit()
+
+    def vectors(self) -> np.ndarray:
+        """Matriz de vetores mapeada em memória (somente leitura), indexada pela coluna `linha`"""
+        dimension = self.dimension
+        with self._lock:
+            path = self._vectors_path()
+        rows = os.path.getsize(path) // (dimension * 4) if dimension and os.path.exists(path) else 0
+        if not rows:
+            return np.zeros((0, dimension or 0), dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dimension))
+
+    def active_chunks(self, prova: Optional[str] = None) -> List[Tuple[int, str, str, int]]:
+        """
+        Trechos ativos, opcionalmente de uma única prova
+
+        Returns:
+            Lista de (linha, prova, texto, pagina)
+        """
+        query = "SELECT linha, prova, texto, pagina FROM trechos WHERE ativo = 1"
+        params: Tuple[Any, ...] = ()
+        if prova:
+            query += " AND prova = ?"
+            params = (normalize_prova(prova),)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY linha", params).fetchall()
+
+    def active_rows(self, prova: Optional[str] = None) -> np.ndarray:
+        """Linhas da matriz dos trechos ativos, opcionalmente de uma única prova"""
+        query = "SELECT linha FROM trechos WHERE ativo = 1"
+        params: Tuple[Any, ...] = ()
+        if prova:
+            query += " AND prova = ?"
+            params = (normalize_prova(prova),)
+        with self._lock:
+            rows = [row[0] for row in self._conn.execute(query, params)]
+        return np.array(sorted(rows), dtype=np.int64)
+
+    def get_chunks(self, rows: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Texto e origem dos trechos das linhas informadas"""
+        rows = [int(row) for row in rows]
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            result = self._conn.execute(
+                f"""SELECT t.linha, t.prova, t.pagina, t.texto, d.caminho
+                    FROM trechos t JOIN documentos d ON d.id = t.documento_id
+                    WHERE t.linha IN ({placeholders})""",
+                rows
+            ).fetchall()
+        return {row[0]: {"prova": row[1], "pagina": row[2], "texto": row[3], "documento": row[4]} for row in result}
+
+    def compact(self) -> int:
+        """
+        Reescreve a matriz só com os vetores dos trechos ativos
+
+        A matriz nova é gravada num arquivo próprio e passa a valer no commit que renumera os
+        trechos; se o processo cair antes, a matriz antiga continua em uso e o arquivo novo
+        é descartado na próxima compactação.
+
+        Returns:
+            Número de linhas removidas
+        """
+        with self._lock:
+            dimension = self._conn.execute("SELECT valor FROM meta WHERE chave = 'dimensao'").fetchone()
+            current = self._vectors_path()
+            if dimension is None or not os.path.exists(current):
+                return 0
+            dimension = int(dimension[0])
+            total = os.path.getsize(current) // (dimension * 4)
+            active = [row[0] for row in self._conn.execute(
+                "SELECT linha FROM trechos WHERE ativo = 1 ORDER BY linha"
+            )]
+            if total == len(active):
+                return 0
+
+            # Sobras de compactações interrompidas (arquivos que não são a matriz em uso)
+            self._remove_stale_vectors(current)
+            compactions = self._conn.execute("SELECT valor FROM meta WHERE chave = 'compactacoes'").fetchone()
+            name = f"vetores.{int(compactions[0]) + 1 if compactions else 1}.f32"
+
+            matrix = np.memmap(current, dtype=np.float32, mode="r", shape=(total, dimension))
+            with open(os.path.join(self.directory, name), "wb") as f:
+                for start in range(0, len(active), 4096):
+                    f.write(np.ascontiguousarray(matrix[active[start:start + 4096]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            del matrix
+
+            self._conn.execute("DELETE FROM trechos WHERE ativo = 0")
+            # Renumerar em duas etapas para não violar o UNIQUE da coluna linha
+            self._conn.execute("UPDATE trechos SET linha = -linha - 1")
+            self._conn.executemany(
+                "UPDATE trechos SET linha = ? WHERE linha = ?",
+                [(new, -old - 1) for new, old in enumerate(active)]
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('arquivo_vetores', ?)", (name,))
+            self._bump_version()
+            self._bump_version("compactacoes")
+            self._conn.commit()
+            self._remove_stale_vectors(self._vectors_path())
+        return total - len(active)
+
+    def _remove_stale_vectors(self, current: str):
+        """Apaga matrizes que não estão em uso (a anterior a uma compactação, ou uma interrompida)"""
+        for path in glob.glob(os.path.join(self.directory, "vetores*.f32")) + \
+                glob.glob(os.path.join(self.directory, VECTORS_FILE + ".tmp")):
+            if os.path.abspath(path) == os.path.abspath(current):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # Ex: no Windows, ainda mapeada por uma busca; fica para a próxima compactação
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Documentos, páginas, trechos ativos e linhas inativas da matriz"""
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documentos").fetchone()[0]
+            pages = self._conn.execute("SELECT COUNT(*) FROM paginas").fetchone()[0]
+            active = self._conn.execute("SELECT COUNT(*) FROM trechos WHERE ativo = 1").fetchone()[0]
+            provas = [row[0] for row in self._conn.execute("SELECT DISTINCT prova FROM documentos ORDER BY prova")]
+        return {
+            "documentos": documents,
+            "paginas": pages,
+            "trechos": active,
+            "linhas_inativas": max(0, self.rows - active),
+            "provas": provas,
+            "embeddings": self.get_meta("embeddings"),
+        }
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()